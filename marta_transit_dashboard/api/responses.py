@@ -0,0 +1,229 @@
+"""
+Response helpers for the Simple MARTA App API
+
+Every JSON view is built from one or more feed snapshots and encoded once
+per set of snapshot versions. Views that also read a tracker fed by the
+store (bus performance, delay trends, anomalies, delta logs) add its generation to
+those versions, because its listener may not have run yet when a new
+snapshot becomes visible. The strong ETag is derived from the versions,
+and the Cache-Control max-age is the time left until the poller
+refreshes those feeds, so browsers and reverse proxies can answer repeat
+requests themselves.
+"""
+
+import os
+import sys
+import time
+
+from flask import current_app, jsonify, request
+
+# Add parent directory to import path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.poller import FEED_FALLBACKS
+
+def current_snapshots(feeds):
+    """
+    Get a consistent set of snapshots for the given feeds
+
+    Args:
+        feeds (iterable): Feed names
+
+    Returns:
+        list: Snapshot per feed (None for feeds not yet published)
+    """
+    snapshots = current_app.extensions['marta']['store'].snapshot_set()
+    return [snapshots.get(feed) for feed in feeds]
+
+def tracker_generations(trackers):
+    """
+    Get the current generation of each tracker a view reads
+
+    Args:
+        trackers (iterable): Trackers, each named by its key in
+            app.extensions['marta'] (e.g. 'anomalies') or given directly
+            (e.g. a feed's DeltaLog)
+
+    Returns:
+        tuple: Generation per tracker
+    """
+    marta = current_app.extensions['marta']
+    return tuple(
+        (marta[tracker] if isinstance(tracker, str) else tracker).generation
+        for tracker in trackers
+    )
+
+def snapshot_etag(name, snapshots, generations=()):
+    """
+    Build the strong ETag for a view of the given snapshots
+
+    The store epoch is included so versions restarting from 1 after a
+    process restart never collide with tags browsers still hold.
+
+    Args:
+        name (str): View name, e.g. 'trains' or 'status'
+        snapshots (list): Snapshots the view is built from
+        generations (tuple, optional): Generations of the trackers it reads
+
+    Returns:
+        str: Unquoted entity tag
+    """
+    epoch = current_app.extensions['marta']['store'].epoch
+    versions = '.'.join([str(snapshot.version) for snapshot in snapshots] + [str(g) for g in generations])
+    return f"{epoch}-{name}-{versions}"
+
+def version_token(snapshot):
+    """
+    Opaque version token clients send back as ?since=
+
+    Args:
+        snapshot (Snapshot): Snapshot being served
+
+    Returns:
+        str: '<store epoch>-<version>'
+    """
+    epoch = current_app.extensions['marta']['store'].epoch
+    return f"{epoch}-{snapshot.version}"
+
+def parse_version_token(token):
+    """
+    Parse a token produced by version_token
+
+    Args:
+        token (str): Token from the client
+
+    Returns:
+        int: Snapshot version, or None if the token is malformed or from
+            another process (versions restart on every start)
+    """
+    epoch = current_app.extensions['marta']['store'].epoch
+    try:
+        token_epoch, version = (int(part) for part in token.split('-'))
+    except (AttributeError, ValueError):
+        return None
+    return version if token_epoch == epoch else None
+
+def choose_encoding(body):
+    """
+    Pick the best content coding of a body the client accepts
+
+    Args:
+        body (EncodedBody): Pre-encoded body
+
+    Returns:
+        str: 'br', 'gzip' or 'identity'
+    """
+    return request.accept_encodings.best_match(body.encodings(), default='identity')
+
+def snapshot_max_age(snapshots, now=None):
+    """
+    Seconds until the next poll of any of the given snapshots
+
+    Returns:
+        int: Cache lifetime in whole seconds; 0 for views that read no
+            snapshot, so clients revalidate them every time
+    """
+    now = now or time.time()
+    return int(min((snapshot.time_to_refresh(now) for snapshot in snapshots), default=0))
+
+def build_view(name, feeds, build, snapshots, memoize=False, trackers=()):
+    """
+    Build a view from a snapshot set
+
+    Memoized views are computed once per combination of snapshot versions
+    and tracker generations, and shared by every endpoint that serves them
+    (e.g. /api/status and the status section of /api/dashboard).
+
+    Args:
+        name (str): View name, also the memoization key
+        feeds (list): Feed names the view depends on
+        build (callable): Called with each feed's data, returns the payload
+        snapshots (list): Snapshot per feed (None for unpublished feeds)
+        memoize (bool, optional): Reuse the payload while versions match
+        trackers (tuple, optional): Trackers build reads, as accepted by
+            tracker_generations
+
+    Returns:
+        JSON-serializable payload
+    """
+    if any(snapshot is None for snapshot in snapshots):
+        # Fallback data is unversioned, so never memoize it
+        return build(*[
+            snapshot.data if snapshot is not None else FEED_FALLBACKS[feed]()
+            for feed, snapshot in zip(feeds, snapshots)
+        ])
+
+    data = [snapshot.data for snapshot in snapshots]
+    if not memoize:
+        return build(*data)
+
+    # Read before building, so a payload is never stored under a
+    # generation newer than the tracker state it saw
+    versions = tuple(snapshot.version for snapshot in snapshots) + tracker_generations(trackers)
+    views = current_app.extensions['marta']['views']
+    cached = views.get(name)
+    if cached is not None and cached[0] == versions:
+        return cached[1]
+
+    payload = build(*data)
+    views[name] = (versions, payload)
+    return payload
+
+def snapshot_response(name, feeds, build, snapshots=None, memoize=False, bodies=None, trackers=()):
+    """
+    Serve a JSON view of one or more feed snapshots with HTTP caching
+
+    The body is taken from the app's BodyCache, so each snapshot version is
+    serialized and compressed once and later requests only pick the stored
+    bytes matching Accept-Encoding. If a feed has not been published yet,
+    the view is built from cached data and marked as not cacheable.
+
+    Args:
+        name (str): View name used in the ETag
+        feeds (list): Feed names the view depends on
+        build (callable): Called with each feed's data, returns the payload
+        snapshots (list, optional): Snapshots already read by the caller
+        memoize (bool, optional): Reuse the built view while versions match
+        bodies (BodyCache, optional): Cache holding the encoded body.
+            Defaults to the app's shared cache of feed and view bodies.
+        trackers (tuple, optional): Trackers build reads, as accepted by
+            tracker_generations; their generations are part of the cache
+            key and the ETag
+
+    Returns:
+        flask.Response: JSON response (or 304 Not Modified)
+    """
+    if snapshots is None:
+        snapshots = current_snapshots(feeds)
+
+    if any(snapshot is None for snapshot in snapshots):
+        response = jsonify(build_view(name, feeds, build, snapshots, trackers=trackers))
+        response.cache_control.no_cache = True
+        return response
+
+    generations = tracker_generations(trackers)
+    versions = tuple(snapshot.version for snapshot in snapshots) + generations
+    if bodies is None:
+        bodies = current_app.extensions['marta']['bodies']
+    body = bodies.get(name, versions, lambda: build_view(name, feeds, build, snapshots, memoize, trackers))
+    encoding = choose_encoding(body)
+
+    # Each content coding is a different representation, so it gets its own tag
+    etag = snapshot_etag(name, snapshots, generations)
+    if encoding != 'identity':
+        etag = f"{etag}-{encoding}"
+
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.response_class(body.get(encoding), mimetype='application/json')
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+
+    response.vary.add('Accept-Encoding')
+    response.set_etag(etag)
+    if len(snapshots) == 1:
+        response.headers['X-Snapshot-Version'] = version_token(snapshots[0])
+    response.cache_control.public = True
+    response.cache_control.max_age = snapshot_max_age(snapshots)
+    return response
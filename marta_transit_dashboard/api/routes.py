@@ -2,22 +2,228 @@
 API routes for the Simple MARTA App
 """
 
-from flask import Blueprint, jsonify
+from flask import Blueprint, Response, jsonify, request, current_app
+import math
+import queue
 import sys
 import os
+import time
+from urllib.parse import quote
 
 # Add parent directory to import path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import the necessary modules
-from utils.weather import get_weather_data
-from utils.train_data import get_marta_train_data, get_train_status
-from utils.bus_data import get_bus_positions, get_bus_trips, get_bus_status
+from config.config import (
+    ARCHIVE_DEFAULT_WINDOW,
+    BBOX_PRECISION,
+    NEARBY_DEFAULT_LIMIT,
+    NEARBY_DEFAULT_RADIUS,
+    NEARBY_MAX_LIMIT,
+    NEARBY_MAX_RADIUS,
+    SSE_HEARTBEAT,
+    SSE_RETRY_MS,
+    STATION_ARRIVALS_DEFAULT_LIMIT,
+    STATION_ARRIVALS_MAX_LIMIT,
+    STATION_BATCH_MAX,
+    STOP_DEPARTURES_DEFAULT_LIMIT,
+    STOP_DEPARTURES_MAX_LIMIT
+)
+from utils.train_data import TRAIN_FIELDS, as_arrival_batch, get_train_status
+from utils.bus_data import VEHICLE_FIELDS, get_bus_status
 from utils.updates import get_recent_updates
+from utils.stations import stations
+from utils.persistence import cache_writer
+from utils.singleflight import upstream_flights
+from utils.upstream import upstream
+from utils.snapshots import to_payload
+from api.responses import (
+    build_view,
+    current_snapshots,
+    parse_version_token,
+    snapshot_response,
+    version_token
+)
 
 # Create a Blueprint for API routes
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
+# Trackers in app.extensions['marta'] read by the status and updates views
+STATUS_TRACKERS = ('bus_performance', 'delay_trends')
+UPDATES_TRACKERS = ('anomalies',)
+
+def _build_status(train_data):
+    """
+    Build the combined bus and train status view
+    
+    The bus figures and the train trend come from the trackers in
+    STATUS_TRACKERS, which key the view alongside the trains version.
+    
+    Args:
+        train_data (ArrivalBatch): Train snapshot data
+        
+    Returns:
+        dict: 'busStatus' and 'trainStatus'
+    """
+    marta = current_app.extensions['marta']
+    return {
+        'busStatus': get_bus_status(marta['bus_performance']),
+        'trainStatus': get_train_status(train_data, marta['delay_trends'])
+    }
+
+def _build_updates():
+    """
+    Build the service updates view from the tracker in UPDATES_TRACKERS
+    
+    Returns:
+        list: Service updates
+    """
+    return get_recent_updates(current_app.extensions['marta']['anomalies'])
+
+# Sections of /api/dashboard: name -> (view name, feeds, build, memoize, trackers)
+DASHBOARD_SECTIONS = {
+    'weather': ('weather', ['weather'], to_payload, False, ()),
+    'status': ('status', ['trains'], _build_status, True, STATUS_TRACKERS),
+    'updates': ('updates', [], _build_updates, True, UPDATES_TRACKERS),
+    'busPositions': ('bus_positions', ['bus_positions'], to_payload, False, ()),
+    'busTrips': ('bus_trips', ['bus_trips'], to_payload, False, ()),
+    'trains': ('trains', ['trains'], to_payload, False, ())
+}
+
+def _parse_bbox(text):
+    """
+    Parse a minLon,minLat,maxLon,maxLat bounding box
+    
+    The box is widened outwards to BBOX_PRECISION decimals, so nearby
+    viewports normalize to the same query.
+    
+    Args:
+        text (str): Parameter value, or None
+        
+    Returns:
+        tuple: (min_lon, min_lat, max_lon, max_lat), or None if text is None
+        
+    Raises:
+        ValueError: If the box is malformed
+    """
+    if text is None:
+        return None
+    try:
+        corners = [float(value) for value in text.split(',')]
+    except ValueError:
+        corners = []
+    if len(corners) != 4 or not all(math.isfinite(value) for value in corners):
+        raise ValueError('bbox must be minLon,minLat,maxLon,maxLat')
+    min_lon, min_lat, max_lon, max_lat = corners
+    if min_lon > max_lon or min_lat > max_lat:
+        raise ValueError('bbox minimums must not exceed its maximums')
+    scale = 10 ** BBOX_PRECISION
+    return (
+        math.floor(min_lon * scale) / scale,
+        math.floor(min_lat * scale) / scale,
+        math.ceil(max_lon * scale) / scale,
+        math.ceil(max_lat * scale) / scale
+    )
+
+def _parse_view_query(allowed_fields):
+    """
+    Parse and normalize the ?bbox= and ?fields= parameters
+    
+    Fields are matched case-insensitively and put in canonical order, so
+    equivalent queries share one cached body.
+    
+    Args:
+        allowed_fields (tuple): Field names the endpoint can project
+        
+    Returns:
+        tuple: (bbox as (min_lon, min_lat, max_lon, max_lat) or None,
+            tuple of field names or None)
+            
+    Raises:
+        ValueError: If either parameter is malformed
+    """
+    bbox = _parse_bbox(request.args.get('bbox'))
+    
+    fields = None
+    text = request.args.get('fields')
+    if text is not None:
+        known = {field.lower(): field for field in allowed_fields}
+        requested = {value.strip().lower() for value in text.split(',') if value.strip()}
+        unknown = sorted(requested - set(known))
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)} (expected {', '.join(allowed_fields)})")
+        fields = tuple(field for field in allowed_fields if field.lower() in requested)
+    
+    return bbox, fields
+
+def _view_query_name(feed, bbox, fields):
+    """
+    Cache and ETag name of a normalized bbox/fields query
+    
+    Returns:
+        str: e.g. 'trains-bbox-84.400,33.700,-84.300,33.800-fields-LINE+STATION'
+    """
+    name = feed
+    if bbox is not None:
+        name += '-bbox-' + ','.join(f"{value:.{BBOX_PRECISION}f}" for value in bbox)
+    if fields is not None:
+        name += '-fields-' + '+'.join(fields)
+    return name
+
+def _entity_feed_response(feed):
+    """
+    Serve a GTFS-RT feed in full, or as a delta when ?since= is given
+    
+    Args:
+        feed (str): 'bus_positions' or 'bus_trips'
+        
+    Returns:
+        flask.Response: Full payload, or a delta envelope for ?since= requests
+    """
+    since = request.args.get('since')
+    if since is None:
+        return snapshot_response(feed, [feed], to_payload)
+    
+    snapshots = current_snapshots([feed])
+    snapshot = snapshots[0]
+    # Only well-formed tokens of this process name a base version; every
+    # other value gets the same full envelope
+    base_version = parse_version_token(since)
+    # The log records a version after it becomes visible, so its
+    # generation is part of the body key and the ETag
+    log = current_app.extensions['marta']['deltas'][feed]
+    
+    def build(data):
+        delta = None
+        if snapshot is not None and base_version is not None:
+            delta = log.since(base_version, snapshot.version)
+        
+        if delta is None:
+            # Unknown, stale or too-far-behind version: send everything
+            payload = to_payload(data)
+            return {
+                'full': True,
+                'version': version_token(snapshot) if snapshot is not None else None,
+                'header': payload.get('header', {}),
+                'entity': payload.get('entity', [])
+            }
+        
+        header = getattr(data, 'header', None)
+        return {
+            'full': False,
+            'since': version_token(snapshot._replace(version=base_version)),
+            'version': version_token(snapshot),
+            'header': header if header is not None else data.get('header', {}),
+            'upserted': delta['upserted'],
+            'removed': delta['removed']
+        }
+    
+    return snapshot_response(
+        f"{feed}-since-{base_version if base_version is not None else 'none'}", [feed], build,
+        snapshots=snapshots, bodies=current_app.extensions['marta']['query_bodies'],
+        trackers=(log,)
+    )
+
 @api_bp.route('/weather')
 def weather():
     """
@@ -26,38 +232,347 @@ def weather():
     Returns:
         JSON: Weather data including temperature, condition, etc.
     """
-    return jsonify(get_weather_data())
+    return snapshot_response('weather', ['weather'], to_payload)
 
 @api_bp.route('/trains')
 def trains():
     """
     Get current train data
     
+    Query Parameters:
+        bbox (str, optional): minLon,minLat,maxLon,maxLat. Only trains
+            positioned inside the box are returned.
+        fields (str, optional): Comma-separated record fields to keep,
+            e.g. LINE,STATION,LATITUDE,LONGITUDE
+    
     Returns:
         JSON: Train data with position, status, etc.
     """
-    data = get_marta_train_data()
-    return jsonify(data)
+    try:
+        bbox, fields = _parse_view_query(TRAIN_FIELDS)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if bbox is None and fields is None:
+        return snapshot_response('trains', ['trains'], to_payload)
+    
+    def build(train_data):
+        batch = as_arrival_batch(train_data)
+        rows = batch.within(bbox) if bbox is not None else None
+        return batch.to_payload(rows, fields)
+    
+    return snapshot_response(
+        _view_query_name('trains', bbox, fields), ['trains'], build,
+        bodies=current_app.extensions['marta']['query_bodies']
+    )
 
 @api_bp.route('/buses/positions')
 def buses():
     """
     Get current bus position data
     
+    Query Parameters:
+        since (str, optional): X-Snapshot-Version of a previous response.
+            Only vehicles added, changed or removed since then are returned.
+        bbox (str, optional): minLon,minLat,maxLon,maxLat. Only vehicles
+            inside the box are returned.
+        fields (str, optional): Comma-separated vehicle fields to keep
+            (trip, vehicle, position, currentStatus, stopId, timestamp,
+            occupancyStatus)
+    
     Returns:
-        JSON: Bus position data
+        JSON: Bus position data, or a delta envelope when since is given
     """
-    return jsonify(get_bus_positions())
+    try:
+        bbox, fields = _parse_view_query(VEHICLE_FIELDS)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if bbox is None and fields is None:
+        return _entity_feed_response('bus_positions')
+    if request.args.get('since') is not None:
+        return jsonify({'error': 'since cannot be combined with bbox or fields'}), 400
+    
+    grid = current_app.extensions['marta']['spatial']
+    
+    def build(columns):
+        if bbox is not None:
+            columns = columns.take(grid.within(columns, bbox))
+        return columns.to_payload(fields)
+    
+    return snapshot_response(
+        _view_query_name('bus_positions', bbox, fields), ['bus_positions'], build,
+        bodies=current_app.extensions['marta']['query_bodies']
+    )
 
 @api_bp.route('/buses/trips')
 def bus_trips():
     """
     Get current bus trip update data
     
+    Query Parameters:
+        since (str, optional): X-Snapshot-Version of a previous response.
+            Only trips added, changed or removed since then are returned.
+        route (str, optional): Comma-separated route IDs. Only the trips
+            of those routes are returned.
+    
+    Returns:
+        JSON: Bus trip update data, or a delta envelope when since is given
+    """
+    text = request.args.get('route')
+    if text is None:
+        return _entity_feed_response('bus_trips')
+    if request.args.get('since') is not None:
+        return jsonify({'error': 'since cannot be combined with route'}), 400
+    
+    route_ids = tuple(sorted({value.strip() for value in text.split(',') if value.strip()}))
+    if not route_ids:
+        return jsonify({'error': 'route must list at least one route ID'}), 400
+    
+    def build(trips):
+        return {'header': trips.header, 'entity': trips.route_trips(route_ids)}
+    
+    return snapshot_response(
+        'bus_trips-route-' + '+'.join(quote(route_id, safe='') for route_id in route_ids),
+        ['bus_trips'], build,
+        bodies=current_app.extensions['marta']['query_bodies']
+    )
+
+@api_bp.route('/routes/<route_id>/trips')
+def route_trips(route_id):
+    """
+    Get the trip updates of one bus route
+    
+    Args:
+        route_id (str): GTFS route ID
+    
+    Returns:
+        JSON: {'routeId', 'trips': [trip update entities]}
+    """
+    def build(trips):
+        return {'routeId': route_id, 'trips': trips.route_trips((route_id,))}
+    
+    return snapshot_response(
+        f"route-{quote(route_id, safe='')}-trips", ['bus_trips'], build,
+        bodies=current_app.extensions['marta']['query_bodies']
+    )
+
+@api_bp.route('/stops/<stop_id>/departures')
+def stop_departures(stop_id):
+    """
+    Get the predicted bus departures at one stop
+    
+    Args:
+        stop_id (str): GTFS stop ID
+    
+    Query Parameters:
+        limit (int, optional): Maximum number of departures, at most
+            STOP_DEPARTURES_MAX_LIMIT
+    
     Returns:
-        JSON: Bus trip update data
+        JSON: {'stopId', 'departures': [{'tripId', 'routeId', 'vehicle',
+            'stopSequence', 'time', 'delay', 'arrival', 'departure'}]},
+            soonest first
     """
-    return jsonify(get_bus_trips())
+    try:
+        limit = int(request.args.get('limit', STOP_DEPARTURES_DEFAULT_LIMIT))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    if limit <= 0:
+        return jsonify({'error': 'limit must be positive'}), 400
+    limit = min(limit, STOP_DEPARTURES_MAX_LIMIT)
+    
+    def build(trips):
+        return {'stopId': stop_id, 'departures': trips.departures(stop_id, limit)}
+    
+    return snapshot_response(
+        f"stop-{quote(stop_id, safe='')}-departures-{limit}", ['bus_trips'], build,
+        bodies=current_app.extensions['marta']['query_bodies']
+    )
+
+@api_bp.route('/buses/clusters')
+def bus_clusters():
+    """
+    Get bus position clusters for a map zoom level
+    
+    Query Parameters:
+        zoom (int): Map zoom level; levels past CLUSTER_MAX_ZOOM get that level
+        bbox (str, optional): minLon,minLat,maxLon,maxLat. Only clusters
+            whose centroid is inside the box are returned.
+    
+    Returns:
+        JSON: {'zoom', 'clusters': [{'lat', 'lon', 'count', 'routes'}]},
+            largest cluster first
+    """
+    try:
+        zoom = int(request.args.get('zoom', ''))
+    except ValueError:
+        return jsonify({'error': 'zoom is required and must be an integer'}), 400
+    try:
+        bbox = _parse_bbox(request.args.get('bbox'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    index = current_app.extensions['marta']['clusters']
+    zoom = min(max(zoom, 0), index.max_zoom)
+    
+    def build(columns):
+        return {'zoom': zoom, 'clusters': index.clusters(columns, zoom, bbox)}
+    
+    return snapshot_response(
+        _view_query_name(f"bus_clusters-z{zoom}", bbox, None), ['bus_positions'], build,
+        bodies=current_app.extensions['marta']['query_bodies']
+    )
+
+@api_bp.route('/buses/near')
+def buses_near():
+    """
+    Get the buses closest to a point
+    
+    Query Parameters:
+        lat (float): Latitude of the point
+        lon (float): Longitude of the point
+        radius (float, optional): Search radius in meters, at most NEARBY_MAX_RADIUS
+        limit (int, optional): Maximum number of buses, at most NEARBY_MAX_LIMIT
+    
+    Returns:
+        JSON: {'lat', 'lon', 'radius', 'version', 'vehicles'}, nearest first,
+            each vehicle entity with its 'distance' in meters
+    """
+    try:
+        lat = float(request.args['lat'])
+        lon = float(request.args['lon'])
+        radius = float(request.args.get('radius', NEARBY_DEFAULT_RADIUS))
+        limit = int(request.args.get('limit', NEARBY_DEFAULT_LIMIT))
+    except (KeyError, ValueError):
+        return jsonify({'error': 'lat and lon are required; lat, lon and radius must be numbers and limit an integer'}), 400
+    
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180) or radius <= 0 or limit <= 0:
+        return jsonify({'error': 'lat/lon out of range, or radius/limit not positive'}), 400
+    radius = min(radius, NEARBY_MAX_RADIUS)
+    limit = min(limit, NEARBY_MAX_LIMIT)
+    
+    grid = current_app.extensions['marta']['spatial']
+    matches, distances, version = grid.nearest(lat, lon, radius, limit)
+    snapshot = current_snapshots(['bus_positions'])[0]
+    vehicles = []
+    if matches is not None:
+        for entity, distance in zip(matches.to_payload()['entity'], distances):
+            entity['distance'] = round(distance, 1)
+            vehicles.append(entity)
+    
+    response = jsonify({
+        'lat': lat,
+        'lon': lon,
+        'radius': radius,
+        # Token of the indexed version, usable as ?since= on /api/buses/positions
+        'version': version_token(snapshot._replace(version=version)) if version is not None else None,
+        'vehicles': vehicles
+    })
+    response.cache_control.no_cache = True
+    return response
+
+def _station_limit():
+    """
+    Parse ?limit= for the station arrival boards
+    
+    Returns:
+        int: Limit, capped at STATION_ARRIVALS_MAX_LIMIT
+        
+    Raises:
+        ValueError: If the limit is not a positive integer
+    """
+    limit = int(request.args.get('limit', STATION_ARRIVALS_DEFAULT_LIMIT))
+    if limit <= 0:
+        raise ValueError(limit)
+    return min(limit, STATION_ARRIVALS_MAX_LIMIT)
+
+@api_bp.route('/stations')
+def station_list():
+    """
+    Get the rail station registry
+    
+    Returns:
+        JSON: {'stations': [{'id', 'name', 'mapName', 'lines', 'lat', 'lon', 'aliases'}]}
+    """
+    return jsonify({'stations': stations.all()})
+
+@api_bp.route('/stations/<station>/arrivals')
+def station_arrivals(station):
+    """
+    Get the predicted arrivals at one rail station
+    
+    Args:
+        station (str): Station id, name or alias, e.g. five-points
+    
+    Query Parameters:
+        limit (int, optional): Maximum number of arrivals, at most
+            STATION_ARRIVALS_MAX_LIMIT
+    
+    Returns:
+        JSON: {'station': {...}, 'arrivals': [train records]}, soonest first
+    """
+    station_id = stations.resolve(station)
+    if station_id is None:
+        return jsonify({'error': f"Unknown station: {station}"}), 404
+    try:
+        limit = _station_limit()
+    except ValueError:
+        return jsonify({'error': 'limit must be a positive integer'}), 400
+    
+    board = current_app.extensions['marta']['stations']
+    
+    def build(train_data):
+        return {'station': stations.get(station_id), 'arrivals': board.arrivals(train_data, station_id, limit)}
+    
+    return snapshot_response(
+        f"station-{station_id}-arrivals-{limit}", ['trains'], build,
+        bodies=current_app.extensions['marta']['query_bodies']
+    )
+
+@api_bp.route('/stations/arrivals')
+def stations_arrivals():
+    """
+    Get the predicted arrivals at several rail stations in one request
+    
+    Query Parameters:
+        ids (str): Comma-separated station ids, names or aliases
+        limit (int, optional): Maximum number of arrivals per station
+    
+    Returns:
+        JSON: {'stations': [{'station': {...}, 'arrivals': [...]}]}, in
+            request order
+    """
+    names = [name.strip() for name in request.args.get('ids', '').split(',') if name.strip()]
+    if not names:
+        return jsonify({'error': 'ids must list at least one station'}), 400
+    if len(names) > STATION_BATCH_MAX:
+        return jsonify({'error': f"At most {STATION_BATCH_MAX} stations per request"}), 400
+    
+    station_ids = []
+    for name in names:
+        station_id = stations.resolve(name)
+        if station_id is None:
+            return jsonify({'error': f"Unknown station: {name}"}), 404
+        if station_id not in station_ids:
+            station_ids.append(station_id)
+    try:
+        limit = _station_limit()
+    except ValueError:
+        return jsonify({'error': 'limit must be a positive integer'}), 400
+    
+    board = current_app.extensions['marta']['stations']
+    
+    def build(train_data):
+        return {'stations': [
+            {'station': stations.get(station_id), 'arrivals': board.arrivals(train_data, station_id, limit)}
+            for station_id in station_ids
+        ]}
+    
+    return snapshot_response(
+        f"stations-{'+'.join(station_ids)}-arrivals-{limit}", ['trains'], build,
+        bodies=current_app.extensions['marta']['query_bodies']
+    )
 
 @api_bp.route('/status')
 def status():
@@ -67,20 +582,199 @@ def status():
     Returns:
         JSON: Status information for buses and trains
     """
-    train_status = get_train_status()
-    bus_status = get_bus_status()
-    
-    return jsonify({
-        'busStatus': bus_status,
-        'trainStatus': train_status
-    })
+    return snapshot_response(
+        'status', ['trains'], _build_status, memoize=True, trackers=STATUS_TRACKERS
+    )
 
 @api_bp.route('/updates')
 def updates():
     """
     Get service updates
     
+    The updates come from the anomaly detector alone, so the view is keyed
+    by its generation rather than by feed versions.
+    
     Returns:
         JSON: Recent service updates
     """
-    return jsonify(get_recent_updates()) 
\ No newline at end of file
+    return snapshot_response('updates', [], _build_updates, memoize=True, trackers=UPDATES_TRACKERS)
+
+@api_bp.route('/dashboard')
+def dashboard():
+    """
+    Get every dashboard section in one response
+    
+    All sections are built from the same consistent snapshot set, and the
+    status and updates views are shared with their own endpoints.
+    
+    Query Parameters:
+        sections (str, optional): Comma-separated subset of weather, status,
+            updates, busPositions, busTrips and trains. Defaults to all.
+    
+    Returns:
+        JSON: Object keyed by section name
+    """
+    requested = request.args.get('sections')
+    if requested:
+        names = [name.strip() for name in requested.split(',') if name.strip()]
+        unknown = [name for name in names if name not in DASHBOARD_SECTIONS]
+        if unknown:
+            return jsonify({'error': f"Unknown sections: {', '.join(unknown)}"}), 400
+        # Canonical order, so equivalent requests share one ETag
+        names = [name for name in DASHBOARD_SECTIONS if name in names]
+    else:
+        names = list(DASHBOARD_SECTIONS)
+    
+    feeds = []
+    trackers = []
+    for name in names:
+        for feed in DASHBOARD_SECTIONS[name][1]:
+            if feed not in feeds:
+                feeds.append(feed)
+        for tracker in DASHBOARD_SECTIONS[name][4]:
+            if tracker not in trackers:
+                trackers.append(tracker)
+    snapshots = current_snapshots(feeds)
+    by_feed = dict(zip(feeds, snapshots))
+    
+    def build(*data):
+        payload = {}
+        for name in names:
+            view, view_feeds, view_build, memoize, view_trackers = DASHBOARD_SECTIONS[name]
+            view_snapshots = [by_feed[feed] for feed in view_feeds]
+            payload[name] = build_view(view, view_feeds, view_build, view_snapshots, memoize, view_trackers)
+        return payload
+    
+    return snapshot_response(
+        f"dashboard-{'+'.join(names)}", feeds, build, snapshots=snapshots, trackers=tuple(trackers)
+    )
+
+@api_bp.route('/stream')
+def stream():
+    """
+    Push new train, bus and weather snapshots as Server-Sent Events
+    
+    Each event is named after its feed ('trains', 'bus_positions',
+    'bus_trips', 'weather'), carries the same JSON as the matching endpoint
+    and uses the snapshot version as its id. The latest event of every feed
+    is sent right after connecting.
+    
+    Returns:
+        Response: text/event-stream response
+    """
+    broadcaster = current_app.extensions['marta']['broadcaster']
+    
+    def generate():
+        subscription = broadcaster.subscribe()
+        try:
+            yield f"retry: {SSE_RETRY_MS}\n\n".encode('utf-8')
+            while True:
+                try:
+                    yield subscription.get(timeout=SSE_HEARTBEAT)
+                except queue.Empty:
+                    yield b': keep-alive\n\n'
+        finally:
+            broadcaster.unsubscribe(subscription)
+    
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@api_bp.route('/history/<feed>')
+def history(feed):
+    """
+    Stream archived snapshots of a feed as newline-delimited JSON
+    
+    Args:
+        feed (str): 'trains', 'bus_positions' or 'bus_trips'
+    
+    Query Parameters:
+        start (float, optional): Earliest fetch time, Unix seconds.
+            Defaults to ARCHIVE_DEFAULT_WINDOW seconds before end.
+        end (float, optional): Latest fetch time, Unix seconds. Defaults to now.
+    
+    Returns:
+        Response: One {"timestamp": ..., "data": ...} object per line
+    """
+    archive = current_app.extensions['marta']['archive']
+    if feed not in archive.feeds:
+        return jsonify({'error': f"Feed is not archived: {feed}"}), 404
+    
+    try:
+        end = float(request.args.get('end', time.time()))
+        start = float(request.args.get('start', end - ARCHIVE_DEFAULT_WINDOW))
+    except ValueError:
+        return jsonify({'error': 'start and end must be Unix timestamps'}), 400
+    
+    def generate():
+        # Archived blocks are already JSON, so they are framed, not re-encoded
+        for timestamp, raw in archive.read_range(feed, start, end):
+            yield b'{"timestamp":' + repr(timestamp).encode('ascii') + b',"data":' + raw + b'}\n'
+    
+    return Response(generate(), mimetype='application/x-ndjson')
+
+@api_bp.route('/analytics/delays')
+def delay_analytics():
+    """
+    Average train delay by hour of day from the Parquet history
+    
+    Query Parameters:
+        line (str, optional): Rail line, e.g. BLUE. Defaults to all lines.
+        start (float, optional): Earliest poll time, Unix seconds.
+            Defaults to 30 days before end.
+        end (float, optional): Latest poll time, Unix seconds. Defaults to now.
+    
+    Returns:
+        JSON: {'line', 'start', 'end', 'hours': [{'hour', 'meanDelay', 'count'}]}
+    """
+    history_store = current_app.extensions['marta']['history']
+    if history_store is None:
+        return jsonify({'error': 'Parquet history is disabled (pyarrow is not installed)'}), 503
+    
+    try:
+        end = float(request.args.get('end', time.time()))
+        start = float(request.args.get('start', end - 30 * 24 * 3600))
+    except ValueError:
+        return jsonify({'error': 'start and end must be Unix timestamps'}), 400
+    
+    line = request.args.get('line')
+    if line:
+        line = line.upper()
+    
+    return jsonify({
+        'line': line,
+        'start': start,
+        'end': end,
+        'hours': history_store.delay_by_hour(line, start, end)
+    })
+
+@api_bp.route('/metrics')
+def metrics():
+    """
+    Get internal counters for monitoring upstream load
+    
+    Returns:
+        JSON: Per-feed coalescing counters, upstream latency histograms,
+            stream subscribers, response body caches, cache file writer,
+            archive, Parquet history, spatial index, cluster, delay trend,
+            anomaly detector and poller counters
+    """
+    history_store = current_app.extensions['marta']['history']
+    response = jsonify({
+        'upstream': upstream_flights.stats(),
+        'http': upstream.stats(),
+        'stream': current_app.extensions['marta']['broadcaster'].stats(),
+        'bodies': current_app.extensions['marta']['bodies'].stats(),
+        'queryBodies': current_app.extensions['marta']['query_bodies'].stats(),
+        'persistence': cache_writer.stats(),
+        'archive': current_app.extensions['marta']['archive'].stats(),
+        'history': history_store.stats() if history_store is not None else None,
+        'spatial': current_app.extensions['marta']['spatial'].stats(),
+        'clusters': current_app.extensions['marta']['clusters'].stats(),
+        'delayTrends': current_app.extensions['marta']['delay_trends'].stats(),
+        'anomalies': current_app.extensions['marta']['anomalies'].stats(),
+        'poller': current_app.extensions['marta']['poller'].stats()
+    })
+    response.cache_control.no_store = True
+    return response
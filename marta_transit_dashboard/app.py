@@ -2,6 +2,7 @@
 Main application module for the Simple MARTA App
 """
 
+import atexit
 import os
 import sys
 from flask import Flask
@@ -15,6 +16,7 @@ from config.config import (
     DEBUG, 
     PORT, 
     HOST, 
+    QUERY_CACHE_SIZE,
     TEMPLATES_AUTO_RELOAD,
     STATIC_DIR,
     TEMPLATES_DIR,
@@ -22,11 +24,28 @@ from config.config import (
 from api.routes import api_bp
 from routes import web_bp
 from utils.map import ensure_map_exists
+from utils.snapshots import SnapshotStore
+from utils.poller import FeedPoller
+from utils.persistence import cache_writer
+from utils.deltas import DeltaLog
+from utils.broadcast import EventBroadcaster
+from utils.encoding import BodyCache
+from utils.archive import SnapshotArchive
+from utils.history import HAS_PYARROW, HistoryStore
+from utils.spatial import SpatialGrid
+from utils.clusters import ClusterIndex
+from utils.bus_status import BusPerformance
+from utils.delay_trends import DelayTrends
+from utils.anomalies import AnomalyDetector
+from utils.stations import StationBoard
 
-def create_app():
+def create_app(start_poller=True):
     """
     Create and configure the Flask application
     
+    Args:
+        start_poller (bool, optional): Start the background feed poller
+        
     Returns:
         Flask: Configured Flask application
     """
@@ -42,6 +61,64 @@ def create_app():
     app.register_blueprint(api_bp)
     app.register_blueprint(web_bp)
     
+    # Snapshot store and the background poller that keeps it fresh
+    store = SnapshotStore()
+    app.extensions['marta'] = {
+        'store': store,
+        'poller': FeedPoller(store),
+        'deltas': {},
+        'views': {},
+        'bodies': BodyCache()
+    }
+    bodies = app.extensions['marta']['bodies']
+    app.extensions['marta']['broadcaster'] = EventBroadcaster(epoch=store.epoch, bodies=bodies)
+    
+    # Encode each new snapshot once, then push the same bytes to /api/stream
+    store.subscribe(bodies.on_publish)
+    store.subscribe(app.extensions['marta']['broadcaster'].on_publish)
+    
+    # Keep a compressed history of the raw feeds, reusing the same bytes
+    app.extensions['marta']['archive'] = SnapshotArchive(bodies=bodies)
+    store.subscribe(app.extensions['marta']['archive'].on_publish)
+    
+    # Typed Parquet history for analytics (needs pyarrow)
+    app.extensions['marta']['history'] = HistoryStore() if HAS_PYARROW else None
+    if app.extensions['marta']['history'] is not None:
+        store.subscribe(app.extensions['marta']['history'].on_publish)
+    
+    # Grid index over bus positions backing /api/buses/near and ?bbox=
+    app.extensions['marta']['spatial'] = SpatialGrid()
+    store.subscribe(app.extensions['marta']['spatial'].on_publish)
+    
+    # Per-zoom marker clusters backing /api/buses/clusters
+    app.extensions['marta']['clusters'] = ClusterIndex()
+    store.subscribe(app.extensions['marta']['clusters'].on_publish)
+    
+    # Per-station arrival index backing /api/stations/.../arrivals
+    app.extensions['marta']['stations'] = StationBoard()
+    store.subscribe(app.extensions['marta']['stations'].on_publish)
+    
+    # Incremental bus on-time performance behind /api/status, fed the trip diffs
+    app.extensions['marta']['bus_performance'] = BusPerformance()
+    
+    # Rolling per-line train delay windows behind trainStatus.trend
+    app.extensions['marta']['delay_trends'] = DelayTrends()
+    store.subscribe(app.extensions['marta']['delay_trends'].on_publish)
+    
+    # Streaming delay and gap anomalies behind /api/updates
+    app.extensions['marta']['anomalies'] = AnomalyDetector()
+    store.subscribe(app.extensions['marta']['anomalies'].on_publish)
+    
+    # Viewport queries get their own body cache so they never evict feed bodies
+    app.extensions['marta']['query_bodies'] = BodyCache(QUERY_CACHE_SIZE)
+    
+    # Entity-level diff history backing ?since= on the bus endpoints
+    for feed in ('bus_positions', 'bus_trips'):
+        delta_log = DeltaLog(feed)
+        store.subscribe(delta_log.on_publish)
+        app.extensions['marta']['deltas'][feed] = delta_log
+    app.extensions['marta']['deltas']['bus_trips'].subscribe(app.extensions['marta']['bus_performance'].on_diff)
+    
     # Ensure static and template directories exist
     os.makedirs(STATIC_DIR, exist_ok=True)
     os.makedirs(TEMPLATES_DIR, exist_ok=True)
@@ -58,8 +135,36 @@ def create_app():
         from utils.templates import create_css_template
         create_css_template()
     
+    if start_poller:
+        start_background_tasks(app)
+        atexit.register(stop_background_tasks, app)
+    
     return app
 
+def start_background_tasks(app):
+    """
+    Start the background services attached to the app
+    
+    Args:
+        app (Flask): Application created by create_app
+    """
+    app.extensions['marta']['poller'].start()
+
+def stop_background_tasks(app):
+    """
+    Stop the background services attached to the app
+    
+    Args:
+        app (Flask): Application created by create_app
+    """
+    app.extensions['marta']['poller'].stop()
+    
+    # Let queued cache writes reach disk before the process exits
+    cache_writer.flush()
+    app.extensions['marta']['archive'].close()
+    if app.extensions['marta']['history'] is not None:
+        app.extensions['marta']['history'].close()
+
 def run_app():
     """
     Run the Flask application
@@ -67,8 +172,10 @@ def run_app():
     # Ensure the map image exists
     ensure_map_exists()
     
-    # Create and run the app
-    app = create_app()
+    # Create and run the app. With the debug reloader the parent process
+    # only watches files, so only the serving child should start polling.
+    serving = not DEBUG or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'
+    app = create_app(start_poller=serving)
     print(f"Starting the Simple MARTA Transit App on http://{HOST}:{PORT}")
     app.run(debug=DEBUG, port=PORT, host=HOST)
 
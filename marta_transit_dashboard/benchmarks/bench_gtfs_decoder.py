@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark the direct GTFS-RT decoder against the MessageToJson path
+
+Builds synthetic MARTA-sized feeds and times, per poll:
+  - legacy:  MessageToJson -> json.loads -> json.dumps (cache write)
+  - decoder: VehiclePositionColumns.from_feed -> to_payload, or
+             decode_trip_updates -> json.dumps (cache write)
+
+Usage:
+    python benchmarks/bench_gtfs_decoder.py [--vehicles N] [--trips N] [--stops N] [--repeat N]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import timeit
+
+# Add parent directory to import path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.transit import gtfs_realtime_pb2
+from google.protobuf.json_format import MessageToJson
+
+from utils.bus_data import VehiclePositionColumns
+from utils.gtfs_decoder import decode_trip_updates
+
+def build_vehicle_feed(count):
+    """
+    Build a synthetic VehiclePositions feed
+    """
+    feed = gtfs_realtime_pb2.FeedMessage()
+    feed.header.gtfs_realtime_version = '2.0'
+    feed.header.timestamp = 1745300000
+    for i in range(count):
+        entity = feed.entity.add()
+        entity.id = str(i)
+        vehicle = entity.vehicle
+        vehicle.trip.trip_id = f'{9000000 + i}'
+        vehicle.trip.route_id = str(random.randint(1, 200))
+        vehicle.trip.start_date = '20250422'
+        vehicle.vehicle.id = str(1000 + i)
+        vehicle.vehicle.label = str(1000 + i)
+        vehicle.position.latitude = 33.75 + random.uniform(-0.3, 0.3)
+        vehicle.position.longitude = -84.39 + random.uniform(-0.4, 0.4)
+        vehicle.position.bearing = random.uniform(0, 360)
+        vehicle.position.speed = random.uniform(0, 20)
+        vehicle.timestamp = 1745300000 - random.randint(0, 60)
+        vehicle.occupancy_status = random.randint(0, 4)
+    return feed
+
+def build_trip_feed(count, stops):
+    """
+    Build a synthetic TripUpdates feed
+    """
+    feed = gtfs_realtime_pb2.FeedMessage()
+    feed.header.gtfs_realtime_version = '2.0'
+    feed.header.timestamp = 1745300000
+    for i in range(count):
+        entity = feed.entity.add()
+        entity.id = str(i)
+        update = entity.trip_update
+        update.trip.trip_id = f'{9000000 + i}'
+        update.trip.route_id = str(random.randint(1, 200))
+        update.vehicle.id = str(1000 + i)
+        update.timestamp = 1745300000
+        for seq in range(stops):
+            stop = update.stop_time_update.add()
+            stop.stop_sequence = seq
+            stop.stop_id = str(100000 + random.randint(0, 9000))
+            delay = random.randint(-120, 900)
+            stop.arrival.delay = delay
+            stop.arrival.time = 1745300000 + seq * 90 + delay
+            stop.departure.delay = delay
+            stop.departure.time = 1745300000 + seq * 90 + delay
+    return feed
+
+def columnar_vehicle_positions(feed):
+    return VehiclePositionColumns.from_feed(feed).to_payload()
+
+def legacy_path(feed):
+    data = json.loads(MessageToJson(feed))
+    return json.dumps(data)
+
+def decoder_path(decode, feed):
+    return json.dumps(decode(feed))
+
+def report(name, feed, decode, repeat):
+    legacy = min(timeit.repeat(lambda: legacy_path(feed), number=1, repeat=repeat))
+    direct = min(timeit.repeat(lambda: decoder_path(decode, feed), number=1, repeat=repeat))
+    legacy_bytes = len(legacy_path(feed))
+    direct_bytes = len(decoder_path(decode, feed))
+    print(f"{name}: {len(feed.entity)} entities")
+    print(f"  MessageToJson path: {legacy * 1000:8.1f} ms  {legacy_bytes / 1024:8.0f} KiB")
+    print(f"  direct decoder:     {direct * 1000:8.1f} ms  {direct_bytes / 1024:8.0f} KiB")
+    print(f"  speedup:            {legacy / direct:8.1f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--vehicles', type=int, default=1500)
+    parser.add_argument('--trips', type=int, default=1500)
+    parser.add_argument('--stops', type=int, default=30)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    random.seed(42)
+    report('VehiclePositions', build_vehicle_feed(args.vehicles), columnar_vehicle_positions, args.repeat)
+    report('TripUpdates', build_trip_feed(args.trips, args.stops), decode_trip_updates, args.repeat)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark nearest-bus and viewport queries on the spatial grid against linear scans
+
+Builds synthetic vehicle position snapshots of growing fleet size and
+times, per snapshot:
+  - scan:    haversine distance to every vehicle, then sort
+  - grid:    SpatialGrid.nearest (covering cells only)
+  - bbox:    SpatialGrid.within on a ~2 km viewport vs a full bbox mask
+  - update:  SpatialGrid.update of a snapshot with 10% of the vehicles moved
+
+Usage:
+    python benchmarks/bench_spatial_index.py [--sizes N,N,...] [--radius M] [--queries N]
+"""
+
+import argparse
+import os
+import random
+import sys
+import timeit
+
+import numpy as np
+
+# Add parent directory to import path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.bus_data import VehiclePositionColumns
+from utils.spatial import SpatialGrid, haversine_m
+from bench_gtfs_decoder import build_vehicle_feed
+
+def linear_nearest(columns, lat, lon, radius, limit):
+    distances = haversine_m(lat, lon, columns.rows['lat'], columns.rows['lon'])
+    inside = np.flatnonzero(distances <= radius)
+    order = inside[np.argsort(distances[inside], kind='stable')][:limit]
+    return columns.take(order), distances[order].tolist()
+
+def moved(columns, share):
+    rows = columns.rows.copy()
+    picked = np.random.rand(len(rows)) < share
+    rows['lat'][picked] += np.random.uniform(-0.005, 0.005, picked.sum())
+    rows['lon'][picked] += np.random.uniform(-0.005, 0.005, picked.sum())
+    return VehiclePositionColumns(rows, columns.dictionaries, columns.header)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', default='500,5000,50000')
+    parser.add_argument('--radius', type=float, default=500)
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    random.seed(42)
+    np.random.seed(42)
+    for size in (int(value) for value in args.sizes.split(',')):
+        columns = VehiclePositionColumns.from_feed(build_vehicle_feed(size))
+        grid = SpatialGrid()
+        grid.update(columns)
+        points = [(33.75 + random.uniform(-0.3, 0.3), -84.39 + random.uniform(-0.4, 0.4))
+                  for _ in range(args.queries)]
+
+        # Both paths must agree before timing them
+        for lat, lon in points[:20]:
+            _, expected = linear_nearest(columns, lat, lon, args.radius, args.limit)
+            _, actual, _ = grid.nearest(lat, lon, args.radius, args.limit)
+            assert np.allclose(expected, actual), (lat, lon)
+
+        scan = timeit.timeit(
+            lambda: [linear_nearest(columns, lat, lon, args.radius, args.limit) for lat, lon in points], number=1)
+        indexed = timeit.timeit(
+            lambda: [grid.nearest(lat, lon, args.radius, args.limit) for lat, lon in points], number=1)
+        boxes = [(lon - 0.01, lat - 0.01, lon + 0.01, lat + 0.01) for lat, lon in points]
+        for bbox in boxes[:20]:
+            assert np.array_equal(grid.within(columns, bbox), np.flatnonzero(columns.bbox_mask(*bbox))), bbox
+        masked = timeit.timeit(lambda: [np.flatnonzero(columns.bbox_mask(*bbox)) for bbox in boxes], number=1)
+        windowed = timeit.timeit(lambda: [grid.within(columns, bbox) for bbox in boxes], number=1)
+        next_columns = moved(columns, 0.1)
+        update = timeit.timeit(lambda: grid.update(next_columns), number=1)
+
+        print(f"{size} vehicles, {args.radius:.0f} m radius")
+        print(f"  linear scan per query:        {scan / len(points) * 1e6:8.1f} us")
+        print(f"  grid index per query:         {indexed / len(points) * 1e6:8.1f} us")
+        print(f"  bbox mask per viewport:       {masked / len(boxes) * 1e6:8.1f} us")
+        print(f"  grid bbox per viewport:       {windowed / len(boxes) * 1e6:8.1f} us")
+        print(f"  grid update (10% moved):      {update * 1000:8.2f} ms")
+
+if __name__ == '__main__':
+    main()
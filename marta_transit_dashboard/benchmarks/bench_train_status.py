@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark the vectorized train status engine against the per-record loop
+
+Builds synthetic rail snapshots of growing size from the cached
+/traindata records and times, per snapshot:
+  - legacy:     the original Python loop over DELAY strings
+  - vectorized: ArrivalBatch parse plus status_from_columns
+  - columns:    status_from_columns on already-parsed delay columns
+  - ingest:     ArrivalBatch, the once-per-poll parse that produces them
+
+Usage:
+    python benchmarks/bench_train_status.py [--sizes N,N,...] [--repeat N]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import timeit
+
+# Add parent directory to import path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import TRAIN_CACHE_FILE
+from utils.train_data import ArrivalBatch
+from utils.train_status import status_from_columns
+
+LINES = ('RED', 'GOLD', 'BLUE', 'GREEN')
+DIRECTIONS = ('N', 'S', 'E', 'W')
+
+def build_snapshot(count):
+    if os.path.exists(TRAIN_CACHE_FILE):
+        with open(TRAIN_CACHE_FILE, 'r') as f:
+            templates = json.load(f)
+    else:
+        templates = [{'STATION': 'FIVE POINTS STATION', 'WAITING_SECONDS': '120'}]
+
+    snapshot = []
+    for i in range(count):
+        record = dict(templates[i % len(templates)])
+        record['LINE'] = random.choice(LINES)
+        record['DIRECTION'] = random.choice(DIRECTIONS)
+        record['DELAY'] = f"T{int(random.expovariate(1 / 120)) - 30}S"
+        snapshot.append(record)
+    return snapshot
+
+def legacy_status(train_data):
+    delays_by_line = {}
+    for train in train_data:
+        if 'DELAY' in train and train['DELAY'].startswith('T'):
+            try:
+                delay_value = int(train['DELAY'][1:-1])
+                if abs(delay_value) > 300:
+                    delays_by_line.setdefault(train['LINE'], []).append(abs(delay_value))
+            except ValueError:
+                pass
+    return {line: round(sum(delays) / len(delays) / 60) for line, delays in delays_by_line.items()}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', default='200,2000,20000,50000')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    random.seed(42)
+    for size in (int(value) for value in args.sizes.split(',')):
+        snapshot = build_snapshot(size)
+        legacy = min(timeit.repeat(lambda: legacy_status(snapshot), number=1, repeat=args.repeat))
+        vectorized = min(timeit.repeat(lambda: status_from_columns(ArrivalBatch(snapshot).columns), number=1, repeat=args.repeat))
+        columns = ArrivalBatch(snapshot).columns
+        analytics = min(timeit.repeat(lambda: status_from_columns(columns), number=1, repeat=args.repeat))
+        print(f"{size} arrivals")
+        print(f"  per-record loop (status only):        {legacy * 1000:8.1f} ms")
+        print(f"  vectorized (parse + status + dist.):  {vectorized * 1000:8.1f} ms")
+        ingest = min(timeit.repeat(lambda: ArrivalBatch(snapshot), number=1, repeat=args.repeat))
+        print(f"  on parsed columns (status + dist.):   {analytics * 1000:8.1f} ms")
+        print(f"  ArrivalBatch parse (once per poll):   {ingest * 1000:8.1f} ms")
+
+if __name__ == '__main__':
+    main()
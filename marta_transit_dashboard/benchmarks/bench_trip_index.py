@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark indexed trip-update lookups against scanning the feed
+
+Builds a synthetic TripUpdates feed and times:
+  - build:   TripUpdateIndex, once per ingested snapshot
+  - route:   trips of one route, scan vs index
+  - stop:    departures at one stop, scan vs index
+
+Usage:
+    python benchmarks/bench_trip_index.py [--trips N] [--stops N] [--repeat N]
+"""
+
+import argparse
+import os
+import random
+import sys
+import timeit
+
+# Add parent directory to import path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.bus_data import TripUpdateIndex
+from utils.gtfs_decoder import decode_trip_updates
+from bench_gtfs_decoder import build_trip_feed
+
+def scan_route(data, route_id):
+    return [
+        entity for entity in data['entity']
+        if entity['tripUpdate'].get('trip', {}).get('routeId') == route_id
+    ]
+
+def scan_stop(data, stop_id, limit):
+    departures = []
+    for entity in data['entity']:
+        for stop in entity['tripUpdate'].get('stopTimeUpdate', ()):
+            if stop.get('stopId') == stop_id:
+                event = stop.get('departure') or stop.get('arrival') or {}
+                departures.append((int(event.get('time', 0)), entity['id']))
+    return sorted(departures)[:limit]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--trips', type=int, default=1500)
+    parser.add_argument('--stops', type=int, default=30)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    random.seed(42)
+    data = decode_trip_updates(build_trip_feed(args.trips, args.stops))
+    index = TripUpdateIndex(data)
+    route_id = random.choice(list(index.by_route))
+    stop_id = random.choice(list(index.by_stop))
+
+    build = min(timeit.repeat(lambda: TripUpdateIndex(data), number=1, repeat=args.repeat))
+    route_scan = min(timeit.repeat(lambda: scan_route(data, route_id), number=10, repeat=args.repeat)) / 10
+    route_index = min(timeit.repeat(lambda: index.route_trips((route_id,)), number=10, repeat=args.repeat)) / 10
+    stop_scan = min(timeit.repeat(lambda: scan_stop(data, stop_id, 20), number=10, repeat=args.repeat)) / 10
+    stop_index = min(timeit.repeat(lambda: index.departures(stop_id, 20), number=10, repeat=args.repeat)) / 10
+
+    updates = sum(len(entity['tripUpdate'].get('stopTimeUpdate', ())) for entity in data['entity'])
+    print(f"{args.trips} trips, {updates} stop time updates")
+    print(f"  index build (once per snapshot):  {build * 1000:8.2f} ms")
+    print(f"  route trips, scan:                {route_scan * 1e6:8.1f} us")
+    print(f"  route trips, index:               {route_index * 1e6:8.1f} us")
+    print(f"  stop departures, scan:            {stop_scan * 1e6:8.1f} us")
+    print(f"  stop departures, index:           {stop_index * 1e6:8.1f} us")
+
+if __name__ == '__main__':
+    main()
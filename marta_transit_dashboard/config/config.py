@@ -14,6 +14,15 @@ MARTA_BUS_TRIPS_URL = "https://gtfs-rt.itsmarta.com/TMGTFSRealTimeWebService/tri
 WEATHER_API_URL = "https://api.open-meteo.com/v1/forecast"
 ATLANTA_LATITUDE = 33.749
 ATLANTA_LONGITUDE = -84.388
+ATLANTA_TIMEZONE = 'America/New_York'  # Zone of the rail feed's EVENT_TIME and NEXT_ARR
+
+# Upstream HTTP client settings
+UPSTREAM_CONNECT_TIMEOUT = 3.05  # Seconds to establish a connection
+UPSTREAM_READ_TIMEOUT = 10  # Seconds to wait for response data
+UPSTREAM_MAX_RETRIES = 2  # Extra attempts after a transient failure
+UPSTREAM_RETRY_BACKOFF = 0.5  # Base backoff in seconds, doubled per attempt with full jitter
+UPSTREAM_POOL_MAXSIZE = 10  # Keep-alive connections kept per upstream host
+UPSTREAM_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)  # Histogram bounds in seconds
 
 # File paths
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -41,4 +50,101 @@ DEBUG = True
 PORT = 5001
 HOST = '0.0.0.0'
 TEMPLATES_AUTO_RELOAD = True
-CACHE_EXPIRATION = 3600  # 1 hour 
\ No newline at end of file
+CACHE_EXPIRATION = 3600  # 1 hour
+
+# Background poller settings (TTLs are the longest wait between fetches of a publishing feed)
+FEED_TTLS = {
+    'trains': 30,         # 30 seconds
+    'bus_positions': 30,  # 30 seconds
+    'bus_trips': 60,      # 1 minute
+    'weather': 900        # 15 minutes
+}
+INGEST_WORKERS = 3  # Poller threads that parse responses and publish snapshots
+POLLER_ERROR_BACKOFF = 30  # Seconds to wait before retrying a feed that raised
+DELTA_HISTORY = 20  # Consecutive snapshot diffs kept per feed for ?since= requests
+
+# Adaptive poll scheduling (feeds with a header.timestamp or EVENT_TIME)
+SCHEDULE_ALPHA = 0.3  # EWMA weight of each observed publish interval
+SCHEDULE_MARGIN = 2  # Seconds after the expected publish to fetch
+SCHEDULE_MIN_DELAY = 1  # Shortest wait between fetches of one feed
+SCHEDULE_RETRY_DELAY = 2  # First retry after a fetch found nothing new; doubles while the feed stalls
+SCHEDULE_MAX_BACKOFF = 300  # Longest wait for a stalled feed
+
+# Server-Sent Events settings
+SSE_QUEUE_SIZE = 16  # Messages buffered per /api/stream client before dropping the oldest
+SSE_HEARTBEAT = 15  # Seconds between keep-alive comments on an idle stream
+SSE_RETRY_MS = 5000  # Client reconnect delay sent in the stream's retry: field
+
+# Response encoding settings
+BODY_CACHE_SIZE = 256  # Encoded response bodies kept (one per view and snapshot version)
+COMPRESS_MIN_SIZE = 1024  # Bodies smaller than this (bytes) are only served uncompressed
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # Only used when the brotli package is installed
+
+# Cache persistence settings
+PERSISTENCE_LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)  # Seconds per cache file write
+
+# Snapshot archive settings
+ARCHIVE_DIR = os.path.join(BASE_DIR, 'archive')
+ARCHIVE_FEEDS = ('trains', 'bus_positions', 'bus_trips')
+ARCHIVE_SEGMENT_MAX_BYTES = 64 * 1024 * 1024  # Start a new segment file past 64 MB
+ARCHIVE_SEGMENT_MAX_AGE = 3600  # ... or after 1 hour
+ARCHIVE_RETENTION = 7 * 24 * 3600  # Delete segments older than 7 days
+ARCHIVE_COMPRESSION_LEVEL = 6  # zlib level per block
+ARCHIVE_DEFAULT_WINDOW = 3600  # Seconds of history returned when no start is given
+
+# Parquet history settings (requires pyarrow)
+HISTORY_DIR = os.path.join(BASE_DIR, 'history')
+HISTORY_FLUSH_INTERVAL = 600  # Seconds of polls buffered per Parquet file
+HISTORY_ROW_GROUP_SIZE = 16384  # Rows per row group; smaller groups prune more precisely
+
+# Train status thresholds
+DELAY_AFFECTED_THRESHOLD = 300  # Seconds late (or early) before a line counts as delayed
+DELAY_MAJOR_THRESHOLD = 600  # Average delay on any line that makes the status Major Delays
+
+# Rolling train delay trend settings (trainStatus.trend in /api/status)
+DELAY_TREND_WINDOWS = (300, 900, 3600)  # Rolling windows in seconds
+DELAY_TREND_BUCKET = 60  # Seconds per bucket; windows advance one bucket at a time
+DELAY_TREND_THRESHOLD = 60  # Seconds the 5 minute mean must move from the 60 minute mean to count as rising or falling
+
+# Delay anomaly detection settings (/api/updates)
+ANOMALY_ALPHA = 0.1  # EWMA weight of each new observation
+ANOMALY_WARMUP = 10  # Observations a series needs before it is scored; until then only delays of DELAY_MAJOR_THRESHOLD are flagged
+ANOMALY_Z_THRESHOLD = 3.0  # Standard deviations above the usual value that count as unusual
+ANOMALY_MIN_EXCESS = 180  # ... and seconds above it, so small absolute changes are never reported
+ANOMALY_NOISE_FLOOR = 60  # Seconds of spread assumed even for very steady series
+ANOMALY_UPDATE_TTL = 900  # Seconds an update stays listed after its anomaly was last seen
+ANOMALY_MAX_UPDATES = 10
+
+# Spatial index settings
+SPATIAL_CELL_SIZE = 0.01  # Grid cell edge in degrees (about 1.1 km x 0.9 km in Atlanta)
+NEARBY_DEFAULT_RADIUS = 500  # Meters searched by /api/buses/near when no radius is given
+NEARBY_MAX_RADIUS = 5000
+NEARBY_DEFAULT_LIMIT = 10  # Vehicles returned by /api/buses/near when no limit is given
+NEARBY_MAX_LIMIT = 100
+
+# Viewport query settings (?bbox= and ?fields= on the position endpoints)
+BBOX_PRECISION = 3  # Decimals bbox corners are widened to, so nearby viewports share a cache entry
+QUERY_CACHE_SIZE = 512  # Encoded bodies kept per normalized query, apart from the feed bodies
+
+# Vehicle clustering settings (/api/buses/clusters)
+CLUSTER_MAX_ZOOM = 16  # Finest zoom level clustered; deeper zooms get this level
+CLUSTER_CELL_PIXELS = 64  # Cluster cell edge in screen pixels (power of two)
+CLUSTER_ROUTE_MIX = 3  # Routes listed per cluster, most vehicles first
+
+# Stop departure settings (/api/stops/<id>/departures)
+STOP_DEPARTURES_DEFAULT_LIMIT = 20
+STOP_DEPARTURES_MAX_LIMIT = 100
+
+# Bus on-time performance settings
+BUS_EARLY_THRESHOLD = 60  # Seconds ahead of schedule before a trip counts as early
+BUS_LATE_THRESHOLD = 300  # Seconds behind schedule before a trip counts as late
+BUS_PERFORMANCE_WINDOW = 3600  # Rolling window of the on-time percentages (seconds)
+BUS_PERFORMANCE_BUCKET = 60  # Seconds per window sample; one trip updates snapshot per bucket counts
+BUS_MINOR_DELAY_PERCENT = 85  # On-time share below which buses show Minor Delays
+BUS_MAJOR_DELAY_PERCENT = 70  # ... and below which they show Major Delays
+
+# Station arrival board settings (/api/stations/...)
+STATION_ARRIVALS_DEFAULT_LIMIT = 10  # Arrivals per station when no limit is given
+STATION_ARRIVALS_MAX_LIMIT = 50
+STATION_BATCH_MAX = 40  # Stations per /api/stations/arrivals request
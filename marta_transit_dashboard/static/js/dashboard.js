@@ -55,7 +55,8 @@ const busMap = L.map('busPositionsMap', {
     minZoom: 9,
     maxZoom: 14
 }).setView([33.749, -84.388], 10);
-let busMarkers = [];
+// Server-side clusters of the bus fleet for the current viewport
+const busClusterLayer = L.layerGroup().addTo(busMap);
 
 // Add OpenStreetMap tile layer
 L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', {
@@ -184,6 +185,39 @@ const stationAliases = {
     'WEST END': ['WEST END STATION']
 };
 
+// Station names, ids and aliases to map station names, from /api/stations
+let stationMapNames = {};
+
+// Normalize a station name the way the server does (utils/stations.py)
+function normalizeStationName(name) {
+    const words = (name || '').toUpperCase().split(/[^A-Z0-9]+/).filter(word => word);
+    if (words.length > 1 && words[words.length - 1] === 'STATION') {
+        words.pop();
+    }
+    return words.join(' ');
+}
+
+// Load the station registry once
+async function loadStations() {
+    const data = await fetchData('stations');
+    if (!data) return;
+    
+    stationMapNames = {};
+    data.stations.forEach(station => {
+        [station.id, station.name, station.mapName, ...station.aliases].forEach(name => {
+            const key = normalizeStationName(name);
+            if (!(key in stationMapNames)) {
+                stationMapNames[key] = station.mapName;
+            }
+        });
+    });
+}
+
+// Map station name for a feed station name such as "FIVE POINTS STATION"
+function stationMapName(name) {
+    return stationMapNames[normalizeStationName(name)] || name;
+}
+
 // Function to check if a destination matches a station name
 function matchesStationName(destination, stationName) {
     if (!destination || !stationName) return false;
@@ -328,10 +362,58 @@ function createTrainIcon(line) {
     });
 }
 
-// Update the UI with fetched data
-async function updateUI() {
-    // Update weather
-    const weather = await fetchData('weather');
+// Custom icon for a cluster of buses, sized by vehicle count
+function createClusterIcon(count) {
+    const size = count < 10 ? 28 : count < 100 ? 34 : 42;
+    
+    return L.divIcon({
+        className: 'bus-cluster-icon',
+        html: `<div style="background-color: rgba(0, 97, 170, 0.85); color: white; width: ${size}px; height: ${size}px; line-height: ${size - 4}px; border-radius: 50%; border: 2px solid white; text-align: center; font-weight: bold;">${count}</div>`,
+        iconSize: [size, size],
+        iconAnchor: [size / 2, size / 2]
+    });
+}
+
+// Draw the bus clusters for the current map zoom and viewport
+async function refreshBusClusters() {
+    const bounds = busMap.getBounds();
+    const bbox = [bounds.getWest(), bounds.getSouth(), bounds.getEast(), bounds.getNorth()]
+        .map(value => value.toFixed(3))
+        .join(',');
+    const data = await fetchData(`buses/clusters?zoom=${busMap.getZoom()}&bbox=${bbox}`);
+    
+    busClusterLayer.clearLayers();
+    if (!data || !data.clusters) {
+        return;
+    }
+    
+    data.clusters.forEach(cluster => {
+        const latLng = L.latLng(cluster.lat, cluster.lon);
+        const routes = cluster.routes.map(route => `${route.route} (${route.count})`).join(', ') || 'Unknown';
+        let marker;
+        if (cluster.count === 1) {
+            marker = L.marker(latLng);
+            marker.bindPopup(`
+                <strong>Bus</strong><br>
+                Route: ${cluster.routes.length ? cluster.routes[0].route : 'Unknown'}<br>
+                Position: ${cluster.lat.toFixed(4)}, ${cluster.lon.toFixed(4)}
+            `);
+        } else {
+            marker = L.marker(latLng, { icon: createClusterIcon(cluster.count) });
+            marker.bindPopup(`
+                <strong>${cluster.count} buses</strong><br>
+                Top routes: ${routes}
+            `);
+        }
+        busClusterLayer.addLayer(marker);
+    });
+}
+
+// Re-cluster whenever the bus map is panned or zoomed
+busMap.on('moveend', refreshBusClusters);
+
+// Render the weather card
+function renderWeather(weather) {
     if (weather) {
         document.getElementById('temperature').textContent = `${weather.temperature}°F`;
         document.getElementById('conditions').textContent = weather.condition;
@@ -339,9 +421,10 @@ async function updateUI() {
         document.getElementById('humidity').textContent = weather.humidity;
         document.getElementById('city').textContent = weather.city;
     }
+}
 
-    // Update transit status
-    const status = await fetchData('status');
+// Render the bus and train status cards
+function renderStatus(status) {
     if (status) {
         // Bus status
         document.getElementById('busStatus').textContent = status.busStatus.status;
@@ -351,6 +434,12 @@ async function updateUI() {
         document.getElementById('trainStatus').textContent = status.trainStatus.status;
         document.getElementById('trainDetails').textContent = status.trainStatus.details;
         
+        // Smoothed status over the last 15 minutes, once the window has data
+        const trend = status.trainStatus.trend && status.trainStatus.trend.windows['15m'];
+        if (trend && trend.arrivals > 0) {
+            document.getElementById('trainDetails').textContent += ` (last 15 min: ${trend.status})`;
+        }
+        
         // Set status colors
         const busStatusEl = document.getElementById('busStatus');
         const trainStatusEl = document.getElementById('trainStatus');
@@ -362,6 +451,8 @@ async function updateUI() {
             busStatusEl.classList.add('text-success');
         } else if (status.busStatus.status === 'Minor Delays') {
             busStatusEl.classList.add('text-warning');
+        } else if (status.busStatus.status === 'No Data') {
+            busStatusEl.classList.add('text-muted');
         } else {
             busStatusEl.classList.add('text-danger');
         }
@@ -374,9 +465,10 @@ async function updateUI() {
             trainStatusEl.classList.add('text-danger');
         }
     }
+}
 
-    // Update recent updates
-    const updates = await fetchData('updates');
+// Render the recent updates list
+function renderUpdates(updates) {
     if (updates && updates.length > 0) {
         const updatesList = document.getElementById('recentUpdates');
         updatesList.innerHTML = '';
@@ -401,62 +493,17 @@ async function updateUI() {
             updatesList.appendChild(listItem);
         });
     }
-
-    // Update simple transit views
-    updateTransitViews();
 }
 
-async function updateTransitViews() {
-    // Update bus positions view
-    const busData = await fetchData('buses/positions');
+// Render bus clusters and detail cards
+function renderBusPositions(busData) {
     const busPositionsDiv = document.getElementById('busPositions');
     busPositionsDiv.innerHTML = '';
     
-    // Clear previous bus markers from the map
-    busMarkers.forEach(marker => busMap.removeLayer(marker));
-    busMarkers = [];
+    // The map draws server-side clusters rather than one marker per bus
+    refreshBusClusters();
     
     if (busData && busData.entity && busData.entity.length > 0) {
-        // Show all buses on the map
-        busData.entity.forEach(entity => {
-            const bus = entity.vehicle;
-            if (bus && bus.position) {
-                // Only create markers for buses within Atlanta bounds
-                const busLatLng = L.latLng(bus.position.latitude, bus.position.longitude);
-                if (atlantaBounds.contains(busLatLng)) {
-                    // Create a marker for the bus
-                    const routeId = bus.trip?.routeId || 'Unknown';
-                    const busLabel = bus.vehicle?.label || 'Unknown';
-                    
-                    const marker = L.marker(busLatLng);
-                    marker.bindPopup(`
-                        <strong>Bus ${busLabel}</strong><br>
-                        Route: ${routeId}<br>
-                        Position: ${bus.position.latitude.toFixed(4)}, ${bus.position.longitude.toFixed(4)}
-                    `);
-                    marker.addTo(busMap);
-                    busMarkers.push(marker);
-                }
-            }
-        });
-        
-        // If we have buses on the map, adjust the view to show all of them
-        if (busMarkers.length > 0) {
-            // Create a feature group for buses within Atlanta bounds
-            const validMarkers = busMarkers.filter(marker => {
-                const latlng = marker.getLatLng();
-                return atlantaBounds.contains(latlng);
-            });
-            
-            if (validMarkers.length > 0) {
-                const group = new L.featureGroup(validMarkers);
-                busMap.fitBounds(group.getBounds().pad(0.1));
-            } else {
-                // If no valid markers, reset to Atlanta center
-                busMap.setView([33.749, -84.388], 10);
-            }
-        }
-        
         // Show up to 6 buses in detail cards
         const maxBuses = Math.min(6, busData.entity.length);
         let busesShown = 0;
@@ -490,9 +537,10 @@ async function updateTransitViews() {
     } else {
         busPositionsDiv.innerHTML = '<p class="col-12 text-center">No bus position data available</p>';
     }
-    
-    // Add bus trip updates
-    const tripData = await fetchData('buses/trips');
+}
+
+// Render bus trip update cards
+function renderTripUpdates(tripData) {
     const busTripUpdatesDiv = document.getElementById('busTripUpdates');
     busTripUpdatesDiv.innerHTML = '';
     
@@ -538,9 +586,10 @@ async function updateTransitViews() {
     } else {
         busTripUpdatesDiv.innerHTML = '<p class="col-12 text-center">No trip update data available</p>';
     }
+}
 
-    // Update train positions view
-    const trainData = await fetchData('trains');
+// Render train markers and cards
+function renderTrains(trainData) {
     const trainPositionsDiv = document.getElementById('trainPositions');
     
     trainPositionsDiv.innerHTML = '';
@@ -555,7 +604,7 @@ async function updateTransitViews() {
         
         // Create train markers on the map
         trainData.forEach(train => {
-            const station = train.STATION;
+            const station = stationMapName(train.STATION);
             if (station && trainStations[station]) {
                 // Get station coordinates
                 const stationCoords = [trainStations[station].lat, trainStations[station].lng];
@@ -587,7 +636,7 @@ async function updateTransitViews() {
         
         // If we have an active filter, apply it, otherwise show all trains
         if (activeStationFilter) {
-            updateTrainList(activeStationFilter);
+            showStationArrivals(activeStationFilter);
             
             // Re-add the filter notice
             const filterInfo = document.createElement('div');
@@ -611,6 +660,28 @@ async function updateTransitViews() {
     }
 }
 
+// Refresh the views derived from the live feeds
+async function updateStatusAndUpdates() {
+    const data = await fetchData('dashboard?sections=status,updates');
+    if (data) {
+        renderStatus(data.status);
+        renderUpdates(data.updates);
+    }
+}
+
+// Update the UI with fetched data (polling fallback), in one round trip
+async function updateUI() {
+    const data = await fetchData('dashboard');
+    if (data) {
+        renderWeather(data.weather);
+        renderStatus(data.status);
+        renderUpdates(data.updates);
+        renderBusPositions(data.busPositions);
+        renderTripUpdates(data.busTrips);
+        renderTrains(data.trains);
+    }
+}
+
 // Toggle between bus and train views
 document.getElementById('showBuses').addEventListener('click', function() {
     document.getElementById('busView').style.display = 'block';
@@ -637,31 +708,7 @@ document.getElementById('showTrains').addEventListener('click', function() {
 // Handle refresh buttons
 document.getElementById('refreshBtn').addEventListener('click', updateUI);
 document.getElementById('refreshUpdates').addEventListener('click', async function() {
-    const updates = await fetchData('updates');
-    if (updates && updates.length > 0) {
-        const updatesList = document.getElementById('recentUpdates');
-        updatesList.innerHTML = '';
-        
-        updates.forEach(update => {
-            const listItem = document.createElement('li');
-            listItem.className = 'list-group-item';
-            
-            const dot = document.createElement('span');
-            dot.className = 'status-dot';
-            
-            if (update.type === 'on-time') {
-                dot.classList.add('status-on-time');
-            } else if (update.type === 'delayed') {
-                dot.classList.add('status-delayed');
-            } else {
-                dot.classList.add('status-disrupted');
-            }
-            
-            listItem.appendChild(dot);
-            listItem.appendChild(document.createTextNode(' ' + update.message));
-            updatesList.appendChild(listItem);
-        });
-    }
+    renderUpdates(await fetchData('updates'));
 });
 
 // Filter trains by station
@@ -678,11 +725,11 @@ function filterTrainsByDestination(stationName) {
             });
         } else {
             // Reset other stations to default style if they don't have a train
-            const hasTrainAtStation = allTrainData.some(train => train.STATION === name);
+            const hasTrainAtStation = allTrainData.some(train => stationMapName(train.STATION) === name);
             
             marker.setStyle({
                 fillColor: hasTrainAtStation ? 
-                    lineColors[allTrainData.find(t => t.STATION === name)?.LINE] || '#FFFFFF' : 
+                    lineColors[allTrainData.find(t => stationMapName(t.STATION) === name)?.LINE] || '#FFFFFF' : 
                     '#FFFFFF',
                 fillOpacity: 1,
                 radius: 6
@@ -691,7 +738,7 @@ function filterTrainsByDestination(stationName) {
     }
     
     // Update train list to only show trains with this next station
-    updateTrainList(stationName);
+    showStationArrivals(stationName);
     
     // Show filter indicator
     const trainPositionsDiv = document.getElementById('trainPositions');
@@ -723,11 +770,11 @@ function resetTrainFilter() {
     
     // Reset all station markers to default style
     for (const [name, marker] of Object.entries(trainStationMarkers)) {
-        const hasTrainAtStation = allTrainData.some(train => train.STATION === name);
+        const hasTrainAtStation = allTrainData.some(train => stationMapName(train.STATION) === name);
         
         marker.setStyle({
             fillColor: hasTrainAtStation ? 
-                lineColors[allTrainData.find(t => t.STATION === name)?.LINE] || '#FFFFFF' : 
+                lineColors[allTrainData.find(t => stationMapName(t.STATION) === name)?.LINE] || '#FFFFFF' : 
                 '#FFFFFF',
             fillOpacity: 1,
             radius: 6
@@ -741,8 +788,17 @@ function resetTrainFilter() {
     document.querySelectorAll('.filter-notice').forEach(el => el.remove());
 }
 
+// Show the arrivals board of one station from the station index
+async function showStationArrivals(stationName) {
+    const data = await fetchData(`stations/${encodeURIComponent(stationName)}/arrivals?limit=50`);
+    
+    // The filter may have changed while the board was loading
+    if (activeStationFilter !== stationName) return;
+    updateTrainList(stationName, data ? data.arrivals : null);
+}
+
 // Update train list with filtered or unfiltered data
-function updateTrainList(destinationFilter = null) {
+function updateTrainList(destinationFilter = null, stationTrains = null) {
     const trainPositionsDiv = document.getElementById('trainPositions');
     
     // Remove existing train cards but keep filter notice if present
@@ -751,9 +807,9 @@ function updateTrainList(destinationFilter = null) {
         .forEach(el => el.remove());
     
     // Filter trains if a station is specified
-    const filteredTrains = destinationFilter 
+    const filteredTrains = stationTrains || (destinationFilter 
         ? allTrainData.filter(train => matchesStationName(train.STATION, destinationFilter))
-        : allTrainData;
+        : allTrainData);
         
     // For debugging - log the mismatch to console
     if (destinationFilter && filteredTrains.length === 0) {
@@ -813,8 +869,6 @@ function updateTrainList(destinationFilter = null) {
     }
 }
 
-// Initial data load
-updateUI();
 
 // Debug function to log train destinations
 function debugTrainDestinations() {
@@ -842,5 +896,51 @@ function debugTrainDestinations() {
 // Call debug function after data is loaded
 setTimeout(debugTrainDestinations, 2000);
 
-// Refresh data every 30 seconds
-setInterval(updateUI, 30000);
+// Polling fallback, used while the event stream is unavailable
+let pollTimer = null;
+
+function startPolling() {
+    if (pollTimer === null) {
+        updateUI();
+        // Refresh data every 30 seconds
+        pollTimer = setInterval(updateUI, 30000);
+    }
+}
+
+function stopPolling() {
+    if (pollTimer !== null) {
+        clearInterval(pollTimer);
+        pollTimer = null;
+    }
+}
+
+// Receive new snapshots from the server as they are published
+function startEventStream() {
+    if (!window.EventSource) {
+        return false;
+    }
+
+    const source = new EventSource('/api/stream');
+
+    source.addEventListener('weather', event => renderWeather(JSON.parse(event.data)));
+    source.addEventListener('bus_positions', event => renderBusPositions(JSON.parse(event.data)));
+    source.addEventListener('bus_trips', event => {
+        renderTripUpdates(JSON.parse(event.data));
+        updateStatusAndUpdates();
+    });
+    source.addEventListener('trains', event => {
+        renderTrains(JSON.parse(event.data));
+        updateStatusAndUpdates();
+    });
+
+    // The browser reconnects on its own; poll while the stream is down
+    source.onopen = stopPolling;
+    source.onerror = startPolling;
+    return true;
+}
+
+// Initial data load
+loadStations();
+if (!startEventStream()) {
+    startPolling();
+}
@@ -0,0 +1,46 @@
+"""
+Shared test fixtures for the Simple MARTA App
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+# Add parent directory to import path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from config.config import TRAIN_CACHE_FILE
+
+@pytest.fixture
+def app(tmp_path):
+    """
+    App with its store primed from the cache files and no background poller
+
+    The archive and Parquet history write under tmp_path instead of the
+    source tree.
+    """
+    app = create_app(start_poller=False)
+    marta = app.extensions['marta']
+    marta['archive'].directory = str(tmp_path / 'archive')
+    if marta['history'] is not None:
+        marta['history'].directory = str(tmp_path / 'history')
+    marta['poller'].prime()
+    yield app
+    marta['archive'].close()
+    if marta['history'] is not None:
+        marta['history'].close()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def train_records():
+    """
+    Raw rail poll records from the bundled cache file
+    """
+    with open(TRAIN_CACHE_FILE) as f:
+        return json.load(f)
@@ -0,0 +1,174 @@
+"""
+Tests for EWMA scoring and delay anomaly detection
+"""
+
+import math
+import time
+
+import numpy as np
+import pytest
+
+from config.config import (
+    ANOMALY_NOISE_FLOOR,
+    ANOMALY_UPDATE_TTL,
+    ANOMALY_WARMUP,
+    DELAY_MAJOR_THRESHOLD
+)
+from utils.anomalies import AnomalyDetector, EwmaSeries, group_means, group_minimums
+from utils.snapshots import SnapshotStore
+
+def trips(**route_delays):
+    """Trip updates feed with one trip per route (routeId=delay in seconds)"""
+    return {
+        'header': {'timestamp': 1000},
+        'entity': [
+            {'id': route, 'tripUpdate': {'trip': {'routeId': route}, 'delay': delay}}
+            for route, delay in route_delays.items()
+        ]
+    }
+
+def arrival(line, station, delay, waiting=120):
+    """Rail feed record as the train API returns it"""
+    return {
+        'DESTINATION': 'Airport', 'DIRECTION': 'S', 'EVENT_TIME': '04/22/2025 12:18:03 AM',
+        'IS_REALTIME': 'true', 'LINE': line, 'NEXT_ARR': '12:20:07 AM', 'STATION': station,
+        'TRAIN_ID': '101', 'WAITING_SECONDS': str(waiting), 'WAITING_TIME': '2 min',
+        'DELAY': f'T{delay}S', 'LATITUDE': '33.75', 'LONGITUDE': '-84.39'
+    }
+
+def warmed_up(detector, delay=60):
+    """Feed every route a steady delay until it has a baseline"""
+    start = time.time() - ANOMALY_WARMUP
+    for i in range(ANOMALY_WARMUP):
+        detector.observe_trips(trips(**{'10': delay, '20': delay}), start + i)
+    return start + ANOMALY_WARMUP
+
+def test_series_are_not_scored_during_warmup():
+    series = EwmaSeries(warmup=3)
+
+    scores = [series.observe(['a'], np.array([100.0]))[0][0] for _ in range(3)]
+    z, mean, _ = series.observe(['a'], np.array([100.0]))
+
+    assert all(math.isnan(score) for score in scores)
+    assert z[0] == 0 and mean[0] == 100
+
+def test_z_score_uses_the_baseline_from_before_the_update():
+    series = EwmaSeries(alpha=0.5, warmup=1)
+    series.observe(['a'], np.array([0.0]))
+
+    z, mean, std = series.observe(['a'], np.array([600.0]))
+
+    assert mean[0] == 0 and std[0] == 0
+    assert z[0] == pytest.approx(600 / ANOMALY_NOISE_FLOOR)
+    assert series.mean[0] == 300
+    assert series.var[0] == pytest.approx(0.5 * 0.5 * 600 ** 2)
+
+def test_series_are_scored_independently():
+    series = EwmaSeries(warmup=1)
+    series.observe(['a', 'b'], np.array([0.0, 1000.0]))
+
+    z, mean, _ = series.observe(['b', 'a'], np.array([1000.0, 0.0]))
+
+    assert list(mean) == [1000, 0]
+    assert list(z) == [0, 0]
+
+def test_series_storage_grows_past_the_initial_capacity():
+    series = EwmaSeries(warmup=1)
+    keys = [f'route-{i}' for i in range(40)]
+    values = np.arange(40, dtype=float)
+
+    series.observe(keys, values)
+    z, mean, _ = series.observe(keys, values)
+
+    assert len(series) == 40
+    assert list(mean) == list(values)
+    assert not np.isnan(z).any()
+
+def test_group_means_skip_missing_labels_and_values():
+    labels, means = group_means(['RED', None, 'GOLD', 'RED', 'GOLD'], np.array([60.0, 999.0, np.nan, 120.0, 30.0]))
+
+    assert labels == ['RED', 'GOLD']
+    assert list(means) == [90, 30]
+
+def test_group_minimums_drop_labels_without_values():
+    labels, minimums = group_minimums([('RED', 'A'), ('RED', 'A'), ('RED', 'B')], np.array([300.0, 120.0, np.nan]))
+
+    assert labels == [('RED', 'A')]
+    assert list(minimums) == [120]
+
+def test_major_delay_is_reported_before_a_baseline_exists():
+    detector = AnomalyDetector()
+
+    detector.observe_trips(trips(**{'10': DELAY_MAJOR_THRESHOLD, '20': DELAY_MAJOR_THRESHOLD - 1}), time.time())
+
+    [update] = detector.updates()
+    assert update['type'] == 'disrupted'
+    assert update['message'] == f"Route 10 buses running {round(DELAY_MAJOR_THRESHOLD / 60)} minutes late"
+    assert update['usual'] is None and update['zScore'] is None
+
+def test_unusual_delay_is_reported_against_its_baseline():
+    detector = AnomalyDetector()
+    now = warmed_up(detector)
+
+    detector.observe_trips(trips(**{'10': 60, '20': 420}), now)
+
+    [update] = detector.updates()
+    assert update['kind'] == 'route' and update['type'] == 'delayed'
+    assert update['value'] == 420 and update['usual'] == 60
+    assert update['zScore'] > 3
+
+def test_small_excess_is_not_reported_even_with_a_high_z_score():
+    detector = AnomalyDetector()
+    now = warmed_up(detector)
+
+    detector.observe_trips(trips(**{'10': 60, '20': 220}), now)
+
+    assert detector.updates()[0]['type'] == 'on-time'
+
+def test_persisting_anomaly_stays_one_entry_and_keeps_its_start():
+    detector = AnomalyDetector()
+    now = warmed_up(detector)
+
+    detector.observe_trips(trips(**{'10': 60, '20': 900}), now)
+    detector.observe_trips(trips(**{'10': 60, '20': 1800}), now + 1)
+
+    [update] = detector.updates()
+    assert update['since'] == now and update['updated'] == now + 1
+    assert update['value'] == 1800
+
+def test_updates_expire_after_the_ttl():
+    detector = AnomalyDetector()
+    detector.observe_trips(trips(**{'10': 900}), 1000.0)
+    generation = detector._generation
+
+    detector._expire(1000.0 + ANOMALY_UPDATE_TTL + 1)
+
+    assert detector._updates[0]['type'] == 'on-time'
+    assert detector._generation == generation + 1
+
+def test_gaps_are_never_reported_without_a_baseline():
+    detector = AnomalyDetector()
+
+    detector.observe_trains([arrival('RED', 'FIVE POINTS STATION', 0, waiting=3600)], 1000.0)
+
+    assert detector.updates()[0]['type'] == 'on-time'
+    assert detector.stats()['series']['gap'] == 1
+
+def test_rail_delays_are_scored_per_line_and_station():
+    detector = AnomalyDetector()
+
+    detector.observe_trains([arrival('RED', 'FIVE POINTS STATION', 900)], time.time())
+
+    assert sorted(update['kind'] for update in detector.updates()) == ['line', 'station']
+
+def test_primed_snapshots_are_not_observed():
+    store = SnapshotStore()
+    detector = AnomalyDetector()
+    store.subscribe(detector.on_publish)
+
+    store.publish('bus_trips', trips(**{'10': 900}), ttl=0, primed=True)
+    assert detector.stats()['observations'] == 0
+
+    store.publish('bus_trips', trips(**{'10': 900}), ttl=60)
+    assert detector.stats()['observations'] == 1
+    assert detector.updates()[0]['type'] == 'disrupted'
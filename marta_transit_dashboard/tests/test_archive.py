@@ -0,0 +1,77 @@
+"""
+Tests for the segmented snapshot archive
+"""
+
+import os
+
+from utils.archive import INDEX_ENTRY, SnapshotArchive, list_segments
+from utils.snapshots import SnapshotStore
+
+def blocks(archive, feed='trains', start=None, end=None):
+    return [(timestamp, raw) for timestamp, raw in archive.read_range(feed, start, end)]
+
+def test_read_range_returns_blocks_in_the_range(tmp_path):
+    archive = SnapshotArchive(str(tmp_path))
+    for i in range(10):
+        archive.append('trains', f'{{"poll":{i}}}'.encode(), 1000.0 + i)
+
+    assert blocks(archive, start=1003, end=1005) == [
+        (1003.0, b'{"poll":3}'), (1004.0, b'{"poll":4}'), (1005.0, b'{"poll":5}')
+    ]
+    assert len(blocks(archive)) == 10
+    assert blocks(archive, start=2000) == []
+    assert blocks(archive, 'bus_trips') == []
+    archive.close()
+
+def test_segments_rotate_by_age_and_reads_span_them(tmp_path):
+    archive = SnapshotArchive(str(tmp_path), max_segment_age=10, retention=10 ** 9)
+    for i in range(25):
+        archive.append('trains', str(i).encode(), 1000.0 + i)
+
+    assert len(list_segments(archive.feed_directory('trains'))) == 3
+    assert [raw for _, raw in blocks(archive, start=1008, end=1012)] == [b'8', b'9', b'10', b'11', b'12']
+    archive.close()
+
+def test_segments_rotate_by_size(tmp_path):
+    archive = SnapshotArchive(str(tmp_path), max_segment_bytes=1, retention=10 ** 9)
+    for i in range(4):
+        archive.append('trains', str(i).encode(), 1000.0 + i)
+
+    assert len(list_segments(archive.feed_directory('trains'))) == 4
+    assert [raw for _, raw in blocks(archive)] == [b'0', b'1', b'2', b'3']
+    archive.close()
+
+def test_rotation_deletes_segments_past_retention(tmp_path):
+    archive = SnapshotArchive(str(tmp_path), max_segment_age=10, retention=20)
+    for i in range(60):
+        archive.append('trains', str(i).encode(), 1000.0 + i)
+
+    remaining = blocks(archive)
+    assert remaining[0][0] >= 1060 - 20 - 10
+    assert remaining[-1] == (1059.0, b'59')
+    archive.close()
+
+def test_partial_index_entry_is_ignored(tmp_path):
+    archive = SnapshotArchive(str(tmp_path))
+    archive.append('trains', b'first', 1000.0)
+    archive.append('trains', b'second', 1001.0)
+    archive.close()
+
+    _, segment = list_segments(archive.feed_directory('trains'))[0]
+    with open(segment[:-len('.seg')] + '.idx', 'ab') as f:
+        f.write(b'\x00' * (INDEX_ENTRY.size - 1))
+
+    assert blocks(archive) == [(1000.0, b'first'), (1001.0, b'second')]
+
+def test_listener_archives_live_snapshots_only(tmp_path):
+    store = SnapshotStore()
+    archive = SnapshotArchive(str(tmp_path), feeds=['trains'])
+    store.subscribe(archive.on_publish)
+
+    store.publish('trains', [{'LINE': 'RED'}], ttl=0, primed=True)
+    store.publish('trains', [{'LINE': 'RED'}], ttl=10)
+    store.publish('weather', {'temperature': 70}, ttl=10)
+
+    assert [raw for _, raw in blocks(archive)] == [b'[{"LINE":"RED"}]']
+    assert not os.path.exists(archive.feed_directory('weather'))
+    archive.close()
@@ -0,0 +1,66 @@
+"""
+Tests for the Server-Sent Events broadcaster behind /api/stream
+"""
+
+import json
+
+from utils.broadcast import EventBroadcaster, format_event
+from utils.snapshots import SnapshotStore
+
+def parse_event(message):
+    """Split one wire-format SSE message into its fields"""
+    fields = dict(line.split(': ', 1) for line in message.decode('utf-8').strip().split('\n'))
+    fields['data'] = json.loads(fields['data'])
+    return fields
+
+def test_format_event():
+    assert format_event('trains', b'[]', '7-3') == b'id: 7-3\nevent: trains\ndata: []\n\n'
+    assert format_event('weather', b'{}') == b'event: weather\ndata: {}\n\n'
+
+def test_snapshots_reach_every_subscriber():
+    store = SnapshotStore()
+    broadcaster = EventBroadcaster(epoch=store.epoch)
+    store.subscribe(broadcaster.on_publish)
+    subscriptions = [broadcaster.subscribe(), broadcaster.subscribe()]
+
+    store.publish('weather', {'temperature': 72})
+
+    for subscription in subscriptions:
+        event = parse_event(subscription.get_nowait())
+        assert event == {'id': f'{store.epoch}-1', 'event': 'weather', 'data': {'temperature': 72}}
+    assert broadcaster.stats() == {'subscribers': 2, 'published': 1, 'dropped': 0}
+
+def test_new_subscribers_start_with_the_latest_event_per_feed():
+    broadcaster = EventBroadcaster()
+    broadcaster.publish('weather', b'first')
+    broadcaster.publish('weather', b'second')
+    broadcaster.publish('trains', b'trains')
+
+    subscription = broadcaster.subscribe()
+
+    assert sorted(subscription.get_nowait() for _ in range(2)) == [b'second', b'trains']
+    assert subscription.empty()
+
+def test_slow_subscribers_lose_their_oldest_messages():
+    broadcaster = EventBroadcaster(max_queue=2)
+    subscription = broadcaster.subscribe()
+
+    for message in (b'1', b'2', b'3'):
+        broadcaster.publish('trains', message)
+
+    assert [subscription.get_nowait() for _ in range(2)] == [b'2', b'3']
+    assert broadcaster.stats()['dropped'] == 1
+
+def test_stream_endpoint(app, client):
+    broadcaster = app.extensions['marta']['broadcaster']
+    response = client.get('/api/stream')
+    chunks = iter(response.response)
+
+    assert response.mimetype == 'text/event-stream'
+    assert next(chunks).startswith(b'retry: ')
+    assert parse_event(next(chunks))['event'] in ('trains', 'bus_positions', 'bus_trips', 'weather')
+    assert broadcaster.stats()['subscribers'] == 1
+
+    response.close()
+
+    assert broadcaster.stats()['subscribers'] == 0
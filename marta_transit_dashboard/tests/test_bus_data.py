@@ -0,0 +1,132 @@
+"""
+Tests for the columnar bus position store and the trip update index
+"""
+
+from google.transit import gtfs_realtime_pb2
+
+from utils.bus_data import TripUpdateIndex, VehiclePositionColumns
+
+def vehicle_feed():
+    """VehiclePositions feed with one fully populated vehicle and one without a position"""
+    feed = gtfs_realtime_pb2.FeedMessage()
+    feed.header.gtfs_realtime_version = '2.0'
+    feed.header.timestamp = 1745300000
+
+    entity = feed.entity.add()
+    entity.id = 'e1'
+    vehicle = entity.vehicle
+    vehicle.trip.trip_id = '9000001'
+    vehicle.trip.route_id = '110'
+    vehicle.vehicle.id = '1401'
+    vehicle.vehicle.label = '1401'
+    vehicle.position.latitude = 33.75
+    vehicle.position.longitude = -84.375
+    vehicle.position.bearing = 90.0
+    vehicle.position.speed = 8.5
+    vehicle.current_status = gtfs_realtime_pb2.VehiclePosition.STOPPED_AT
+    vehicle.stop_id = '907933'
+    vehicle.timestamp = 1745299990
+    vehicle.occupancy_status = gtfs_realtime_pb2.VehiclePosition.FEW_SEATS_AVAILABLE
+
+    entity = feed.entity.add()
+    entity.id = 'e2'
+    entity.vehicle.vehicle.id = '1402'
+    entity.vehicle.trip.route_id = '39'
+    return feed
+
+def test_from_feed_keeps_every_served_vehicle_field():
+    payload = VehiclePositionColumns.from_feed(vehicle_feed()).to_payload()
+
+    assert payload['header'] == {'gtfsRealtimeVersion': '2.0', 'timestamp': '1745300000'}
+    assert payload['entity'][0] == {'id': 'e1', 'vehicle': {
+        'trip': {'tripId': '9000001', 'routeId': '110'},
+        'vehicle': {'id': '1401', 'label': '1401'},
+        'position': {'latitude': 33.75, 'longitude': -84.375, 'bearing': 90.0, 'speed': 8.5},
+        'currentStatus': 'STOPPED_AT',
+        'stopId': '907933',
+        'timestamp': '1745299990',
+        'occupancyStatus': 'FEW_SEATS_AVAILABLE'
+    }}
+
+def test_vehicles_without_a_position_are_kept():
+    columns = VehiclePositionColumns.from_feed(vehicle_feed())
+
+    assert len(columns) == 2
+    assert columns.to_payload()['entity'][1] == {'id': 'e2', 'vehicle': {'trip': {'routeId': '39'}, 'vehicle': {'id': '1402'}}}
+    assert columns.bounds() == (-84.375, 33.75, -84.375, 33.75)
+
+def test_cache_file_round_trip_matches_the_feed():
+    columns = VehiclePositionColumns.from_feed(vehicle_feed())
+
+    restored = VehiclePositionColumns.from_feed_dict(columns.to_payload())
+
+    assert restored == columns
+    assert restored.to_payload() == columns.to_payload()
+
+def test_fields_project_each_vehicle():
+    payload = VehiclePositionColumns.from_feed(vehicle_feed()).to_payload(['currentStatus', 'stopId'])
+
+    assert payload['entity'][0] == {'id': 'e1', 'vehicle': {'currentStatus': 'STOPPED_AT', 'stopId': '907933'}}
+    assert payload['entity'][1] == {'id': 'e2', 'vehicle': {}}
+
+def test_filters_by_route_and_bbox():
+    columns = VehiclePositionColumns.from_feed(vehicle_feed())
+
+    assert len(columns.filter(routes=['39'])) == 1
+    assert len(columns.filter(bbox=(-84.4, 33.7, -84.3, 33.8))) == 1
+    assert len(columns.filter(bbox=(-84.3, 33.7, -84.2, 33.8))) == 0
+    assert columns.count_by_route() == {'110': 1, '39': 1}
+    assert columns.occupancy_counts() == {'FEW_SEATS_AVAILABLE': 1}
+
+def trip_updates():
+    """Trip updates feed at 1745300000: three trips sharing stop 907933, one without times"""
+    def trip(trip_id, route, stops, vehicle=None):
+        update = {'trip': {'tripId': trip_id, 'routeId': route}, 'stopTimeUpdate': [
+            {'stopSequence': sequence, 'stopId': stop_id, 'departure': {'time': str(time), 'delay': 60}}
+            if time is not None else {'stopSequence': sequence, 'stopId': stop_id}
+            for sequence, (stop_id, time) in enumerate(stops, 1)
+        ]}
+        if vehicle:
+            update['vehicle'] = {'id': vehicle}
+        return {'id': trip_id, 'tripUpdate': update}
+
+    return TripUpdateIndex({'header': {'timestamp': '1745300000'}, 'entity': [
+        trip('T1', '110', [('907933', 1745300600), ('907934', 1745300700)], vehicle='1401'),
+        trip('T2', '39', [('907933', 1745299900), ('907935', 1745300100)]),
+        trip('T3', '110', [('907933', 1745300300)]),
+        trip('T4', '2', [('907933', None)])
+    ]})
+
+def test_trips_by_route_and_id():
+    index = trip_updates()
+
+    assert [entity['id'] for entity in index.route_trips(['110'])] == ['T1', 'T3']
+    assert [entity['id'] for entity in index.route_trips(['39', '110', '110'])] == ['T1', 'T2', 'T3']
+    assert index.route_trips(['999']) == []
+    assert index.trip('T2')['tripUpdate']['trip']['routeId'] == '39'
+    assert index.trip('T9') is None
+
+def test_departures_are_upcoming_and_soonest_first():
+    index = trip_updates()
+
+    departures = index.departures('907933')
+
+    # T2 left before the feed timestamp; T4 has no predicted time
+    assert [departure['tripId'] for departure in departures] == ['T3', 'T1', 'T4']
+    assert departures[1] == {
+        'tripId': 'T1', 'routeId': '110', 'vehicle': '1401', 'stopSequence': 1, 'time': 1745300600,
+        'delay': 60, 'arrival': None, 'departure': {'time': '1745300600', 'delay': 60}
+    }
+    assert [departure['tripId'] for departure in index.departures('907933', limit=1)] == ['T3']
+    assert index.departures('000000') == []
+
+def test_trip_index_endpoints(app, client):
+    app.extensions['marta']['store'].publish('bus_trips', trip_updates(), ttl=30)
+
+    route = client.get('/api/routes/110/trips').json
+    stop = client.get('/api/stops/907933/departures?limit=2').json
+
+    assert route['routeId'] == '110' and [entity['id'] for entity in route['trips']] == ['T1', 'T3']
+    assert stop['stopId'] == '907933' and [departure['tripId'] for departure in stop['departures']] == ['T3', 'T1']
+    assert client.get('/api/stops/907933/departures?limit=0').status_code == 400
+    assert client.get('/api/stops/907933/departures?limit=soon').status_code == 400
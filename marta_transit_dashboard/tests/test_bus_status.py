@@ -0,0 +1,86 @@
+"""
+Tests for the incremental bus on-time performance tracker
+"""
+
+import utils.bus_status as bus_status
+from utils.bus_status import BusPerformance, trip_delay
+from utils.deltas import DeltaLog
+from utils.snapshots import SnapshotStore
+
+def trips(**delays):
+    """Trip updates feed with one trip per keyword (id=trip-level delay)"""
+    return {
+        'header': {'timestamp': '1745300000'},
+        'entity': [
+            {'id': trip_id, 'tripUpdate': {'trip': {'tripId': trip_id, 'routeId': '110'}, 'delay': delay}}
+            for trip_id, delay in delays.items()
+        ]
+    }
+
+def tracked():
+    store = SnapshotStore()
+    log = DeltaLog('bus_trips')
+    performance = BusPerformance()
+    store.subscribe(log.on_publish)
+    log.subscribe(performance.on_diff)
+    return store, performance
+
+def counted(monkeypatch):
+    """Record the trips classified through trip_delay"""
+    calls = []
+    def counting(update, feed_time=0):
+        calls.append(update['trip']['tripId'])
+        return original(update, feed_time)
+    original = bus_status.trip_delay
+    monkeypatch.setattr(bus_status, 'trip_delay', counting)
+    return calls
+
+def test_stop_delay_falls_back_to_the_departure():
+    update = {'stopTimeUpdate': [
+        {'arrival': {'time': '1745299000'}, 'departure': {'delay': 30, 'time': '1745299000'}},
+        {'arrival': {'time': '1745300100'}, 'departure': {'delay': 420, 'time': '1745300120'}},
+        {'arrival': {'delay': 600, 'time': '1745300500'}}
+    ]}
+
+    assert trip_delay(update, 1745300000) == 420
+    assert trip_delay(update, 1745400000) == 30
+    assert trip_delay({'stopTimeUpdate': [{'arrival': {'time': '1'}}]}) is None
+    assert trip_delay({'delay': -90, 'stopTimeUpdate': [{'arrival': {'delay': 600}}]}) == -90
+
+def test_only_changed_trips_are_reclassified(monkeypatch):
+    store, performance = tracked()
+    calls = counted(monkeypatch)
+    store.publish('bus_trips', trips(a=0, b=0, c=900))
+    calls.clear()
+
+    store.publish('bus_trips', trips(a=0, b=900, d=-300))
+
+    assert sorted(calls) == ['b', 'd']
+    assert performance.status()['trips'] == 3
+    assert performance._current == {'110': [1, 1, 1]}
+
+def test_primed_snapshot_is_skipped_and_the_next_one_classified_in_full(monkeypatch):
+    store, performance = tracked()
+    calls = counted(monkeypatch)
+    store.publish('bus_trips', trips(a=0, b=0), primed=True)
+
+    assert calls == [] and performance.generation == 0
+
+    store.publish('bus_trips', trips(a=0, b=900))
+
+    assert sorted(calls) == ['a', 'b']
+    assert performance._current == {'110': [0, 1, 1]}
+
+def test_window_percentages():
+    performance = BusPerformance(window=120, bucket=60)
+
+    performance.update(trips(a=0, b=0, c=0, d=900), 0)
+    performance.update(trips(a=0, b=900, c=900, d=900), 60)
+    status = performance.status()
+
+    assert status['onTime'] == 50.0 and status['late'] == 50.0
+    assert status['trips'] == 4 and status['status'] == 'Major Delays'
+
+    performance.update(trips(a=0, b=0, c=0, d=0), 180)
+
+    assert performance.status()['onTime'] == 100.0
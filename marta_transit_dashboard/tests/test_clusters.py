@@ -0,0 +1,84 @@
+"""
+Tests for the per-zoom bus marker clusters behind /api/buses/clusters
+"""
+
+import random
+from collections import Counter
+
+import numpy as np
+
+from utils.bus_data import VehiclePositionColumns
+from utils.clusters import ClusterIndex, mercator_pixels
+
+def fleet(count=1500, seed=11):
+    """Columns of count vehicles on a few routes around Atlanta, plus one without a position"""
+    rng = random.Random(seed)
+    entities = [
+        {'id': str(i), 'vehicle': {
+            'trip': {'routeId': rng.choice(['110', '39', '2', '21', '15'])},
+            'position': {'latitude': 33.75 + rng.gauss(0, 0.05), 'longitude': -84.39 + rng.gauss(0, 0.05)}
+        }}
+        for i in range(count)
+    ]
+    entities.append({'id': 'parked', 'vehicle': {'trip': {'routeId': '110'}}})
+    return VehiclePositionColumns.from_feed_dict({'header': {}, 'entity': entities})
+
+def test_every_level_matches_direct_binning():
+    columns = fleet()
+    index = ClusterIndex(max_zoom=14, cell_pixels=64)
+    index.update(columns, version=1)
+    located = columns.rows[~np.isnan(columns.rows['lat'])]
+
+    for zoom in (0, 6, 11, 14):
+        x, y = mercator_pixels(located['lat'], located['lon'], zoom)
+        expected = Counter(zip((x // 64).astype(int).tolist(), (y // 64).astype(int).tolist()))
+        clusters = index.clusters(columns, zoom)
+
+        assert sorted(cluster['count'] for cluster in clusters) == sorted(expected.values())
+        assert sum(cluster['count'] for cluster in clusters) == len(located)
+    assert index.stats()['clusters'][0] == 1
+
+def test_cluster_centroid_and_route_mix():
+    columns = fleet(300)
+    index = ClusterIndex(route_mix=2)
+    index.update(columns)
+    located = columns.rows[~np.isnan(columns.rows['lat'])]
+
+    cluster, = index.clusters(columns, 0)
+
+    assert cluster['count'] == 300
+    assert np.isclose(cluster['lat'], located['lat'].mean()) and np.isclose(cluster['lon'], located['lon'].mean())
+    top = Counter(columns.column('route')[~np.isnan(columns.rows['lat'])].tolist()).most_common(2)
+    assert [(route['route'], route['count']) for route in cluster['routes']] == top
+
+def test_clusters_are_largest_first_and_filtered_by_centroid():
+    columns = fleet()
+    index = ClusterIndex()
+    index.update(columns)
+    bbox = (-84.40, 33.74, -84.38, 33.76)
+
+    clusters = index.clusters(columns, 14, bbox)
+
+    counts = [cluster['count'] for cluster in clusters]
+    assert counts == sorted(counts, reverse=True)
+    assert all(bbox[0] <= cluster['lon'] <= bbox[2] and bbox[1] <= cluster['lat'] <= bbox[3] for cluster in clusters)
+    assert len(clusters) < len(index.clusters(columns, 14))
+
+def test_other_snapshots_are_clustered_on_the_spot():
+    index = ClusterIndex()
+    index.update(fleet())
+    other = fleet(50, seed=12)
+
+    assert sum(cluster['count'] for cluster in index.clusters(other, 10)) == 50
+    assert index.stats()['builds'] == 1
+
+def test_clusters_endpoint(app, client):
+    app.extensions['marta']['store'].publish('bus_positions', fleet(200), ttl=30)
+    max_zoom = app.extensions['marta']['clusters'].max_zoom
+
+    response = client.get('/api/buses/clusters?zoom=99').json
+
+    assert response['zoom'] == max_zoom
+    assert sum(cluster['count'] for cluster in response['clusters']) == 200
+    assert client.get('/api/buses/clusters').status_code == 400
+    assert client.get('/api/buses/clusters?zoom=3&bbox=1,2').status_code == 400
@@ -0,0 +1,37 @@
+"""
+Tests for the aggregated /api/dashboard endpoint
+"""
+
+SECTIONS = ['weather', 'status', 'updates', 'busPositions', 'busTrips', 'trains']
+
+def test_every_section_matches_its_own_endpoint(client):
+    dashboard = client.get('/api/dashboard').json
+
+    assert sorted(dashboard) == sorted(SECTIONS)
+    assert dashboard['trains'] == client.get('/api/trains').json
+    assert dashboard['weather'] == client.get('/api/weather').json
+    assert dashboard['status'] == client.get('/api/status').json
+    assert dashboard['updates'] == client.get('/api/updates').json
+    assert dashboard['busPositions'] == client.get('/api/buses/positions').json
+
+def test_sections_subset_shares_one_etag_in_any_order(client):
+    first = client.get('/api/dashboard?sections=trains,weather')
+    second = client.get('/api/dashboard?sections=weather, trains')
+
+    assert sorted(first.json) == ['trains', 'weather']
+    assert first.headers['ETag'] == second.headers['ETag']
+    assert client.get('/api/dashboard?sections=weather').headers['ETag'] != first.headers['ETag']
+
+def test_new_snapshot_of_an_included_feed_changes_the_etag(app, client, train_records):
+    etag = client.get('/api/dashboard?sections=trains').headers['ETag']
+    unrelated = client.get('/api/dashboard?sections=weather').headers['ETag']
+
+    app.extensions['marta']['store'].publish('trains', train_records[1:], ttl=30)
+
+    assert client.get('/api/dashboard?sections=trains', headers={'If-None-Match': etag}).status_code == 200
+    assert client.get('/api/dashboard?sections=weather', headers={'If-None-Match': unrelated}).status_code == 304
+
+def test_unknown_sections_are_rejected(client):
+    response = client.get('/api/dashboard?sections=trains,ferries')
+
+    assert response.status_code == 400 and 'ferries' in response.json['error']
@@ -0,0 +1,91 @@
+"""
+Tests for the rolling per-line train delay trends
+"""
+
+import random
+
+import numpy as np
+
+from utils.delay_trends import DelayTrends
+from utils.snapshots import SnapshotStore
+from utils.train_data import as_arrival_batch
+
+def poll(delays):
+    """Rail poll columns from (line, direction, delay seconds) triples"""
+    return as_arrival_batch([
+        {'LINE': line, 'DIRECTION': direction, 'DELAY': f'T{delay}S', 'STATION': 'FIVE POINTS STATION'}
+        for line, direction, delay in delays
+    ]).columns
+
+def expected_stats(delays):
+    delays = np.array(delays, dtype=float)
+    return {
+        'count': len(delays),
+        'mean': round(float(delays.mean()), 1),
+        'stddev': round(float(delays.std()), 1),
+        'late': round(100 * float((np.abs(delays) > 300).mean()), 1)
+    }
+
+def test_running_totals_match_a_rescan_of_each_window():
+    rng = random.Random(4)
+    trends = DelayTrends(windows=(300, 900), bucket=60)
+    history = []
+
+    timestamp = 0
+    for _ in range(60):
+        timestamp += rng.choice([20, 45, 60, 130])
+        delays = [(rng.choice(['RED', 'BLUE']), rng.choice(['N', 'S']), rng.randint(-60, 900)) for _ in range(20)]
+        trends.update(poll(delays), timestamp)
+        history.append((timestamp // 60, delays))
+
+    key = timestamp // 60
+    for label, seconds in (('5m', 300), ('15m', 900)):
+        recent = [delay for bucket, delays in history if bucket > key - seconds // 60 for delay in delays]
+        for group in trends.trend()['lines']:
+            group_delays = [d for line, direction, d in recent if (line, direction) == (group['line'], group['direction'])]
+            assert group['windows'][label] == expected_stats(group_delays)
+
+def test_polls_in_one_bucket_share_it():
+    trends = DelayTrends(windows=(300,), bucket=60)
+
+    trends.update(poll([('RED', 'N', 30)]), 0)
+    trends.update(poll([('RED', 'N', 90), ('GOLD', 'S', 10)]), 30)
+    trends.update(poll([('RED', 'N', 60)]), 60)
+
+    assert trends.stats() == {'polls': 3, 'groups': 2, 'buckets': {'5m': 2}}
+    red = next(group for group in trends.trend()['lines'] if group['line'] == 'RED')
+    assert red['windows']['5m']['count'] == 3 and red['windows']['5m']['mean'] == 60.0
+
+def test_old_buckets_leave_the_window():
+    trends = DelayTrends(windows=(300,), bucket=60)
+    trends.update(poll([('RED', 'N', 900)]), 0)
+    trends.update(poll([('RED', 'N', 0)]), 300)
+
+    window = trends.trend()['windows']['5m']
+
+    assert window['arrivals'] == 1 and window['status'] == 'On Time'
+
+def test_rising_delays_and_window_status():
+    trends = DelayTrends(windows=(300, 3600), bucket=60)
+    for minute in range(50):
+        trends.update(poll([('BLUE', 'E', 0)] * 5), minute * 60)
+    for minute in range(50, 55):
+        trends.update(poll([('BLUE', 'E', 900)] * 5), minute * 60)
+
+    trend = trends.trend()
+
+    assert trend['lines'][0]['trend'] == 'rising'
+    assert trend['windows']['5m']['status'] == 'Major Delays'
+    assert trend['windows']['5m']['arrivals'] == 25 and trend['windows']['60m']['arrivals'] == 275
+    assert trend['lines'][0]['windows']['60m']['late'] == round(100 * 25 / 275, 1)
+
+def test_primed_snapshots_are_skipped(train_records):
+    store = SnapshotStore()
+    trends = DelayTrends()
+    store.subscribe(trends.on_publish)
+
+    store.publish('trains', train_records, primed=True)
+    assert trends.generation == 0
+
+    store.publish('trains', train_records[1:])
+    assert trends.generation == 1 and trends.stats()['polls'] == 1
@@ -0,0 +1,153 @@
+"""
+Tests for the entity diff log behind ?since=
+"""
+
+from utils.bus_data import VehiclePositionColumns
+from utils.deltas import DeltaLog
+from utils.snapshots import SnapshotStore, to_payload
+
+def feed(**entities):
+    """GTFS-RT shaped feed with one entity per keyword (id=value)"""
+    return {'header': {}, 'entity': [{'id': entity_id, 'value': value} for entity_id, value in entities.items()]}
+
+def fleet(**changes):
+    """Ten entities a..j with value 0, plus the given changes (None removes)"""
+    entities = {name: 0 for name in 'abcdefghij'}
+    entities.update(changes)
+    return feed(**{entity_id: value for entity_id, value in entities.items() if value is not None})
+
+def positions(**latitudes):
+    """Columnar positions of ten vehicles a..j at latitude 33.75, plus the given changes (None removes)"""
+    vehicles = {name: 33.75 for name in 'abcdefghij'}
+    vehicles.update(latitudes)
+    return VehiclePositionColumns.from_feed_dict({'header': {}, 'entity': [
+        {'id': entity_id, 'vehicle': {'trip': {'routeId': '110'}, 'position': {'latitude': latitude, 'longitude': -84.375}}}
+        for entity_id, latitude in vehicles.items() if latitude is not None
+    ]})
+
+def tracked(max_diffs=20, feed='bus_trips'):
+    store = SnapshotStore()
+    log = DeltaLog(feed, max_diffs)
+    store.subscribe(log.on_publish)
+    return store, log
+
+def test_since_merges_every_diff_up_to_the_served_version():
+    store, log = tracked()
+    store.publish('bus_trips', fleet())
+    store.publish('bus_trips', fleet(a=1))
+    store.publish('bus_trips', fleet(a=2, b=None))
+    store.publish('bus_trips', fleet(a=2, b=None, k=5))
+
+    delta = log.since(1, 4)
+
+    assert sorted(entity['id'] for entity in delta['upserted']) == ['a', 'k']
+    assert {entity['id']: entity['value'] for entity in delta['upserted']}['a'] == 2
+    assert delta['removed'] == ['b']
+
+def test_since_from_a_middle_version():
+    store, log = tracked()
+    store.publish('bus_trips', fleet())
+    store.publish('bus_trips', fleet(a=1))
+    store.publish('bus_trips', fleet(a=1, c=3))
+
+    assert log.since(2, 3) == {'upserted': [{'id': 'c', 'value': 3}], 'removed': []}
+
+def test_entity_removed_then_restored_is_an_upsert():
+    store, log = tracked()
+    store.publish('bus_trips', fleet())
+    store.publish('bus_trips', fleet(a=None))
+    store.publish('bus_trips', fleet(a=7))
+
+    assert log.since(1, 3) == {'upserted': [{'id': 'a', 'value': 7}], 'removed': []}
+
+def test_columnar_snapshots_are_diffed_on_their_arrays():
+    store, log = tracked(feed='bus_positions')
+    store.publish('bus_positions', positions())
+    store.publish('bus_positions', positions(a=33.875, b=None, k=33.5))
+
+    delta = log.since(1, 2)
+
+    assert sorted(entity['id'] for entity in delta['upserted']) == ['a', 'k']
+    assert delta['upserted'][0] == to_payload(positions(a=33.875))['entity'][0]
+    assert delta['removed'] == ['b']
+
+def test_columnar_diff_matches_the_entity_diff():
+    old = positions(c=None)
+    new = VehiclePositionColumns.from_feed_dict({'header': {}, 'entity': [
+        dict(entity, vehicle=dict(entity['vehicle'], trip={'routeId': '39'})) if entity['id'] in 'de' else entity
+        for entity in to_payload(positions(a=33.625, j=None))['entity']
+    ]})
+    old_entities = {entity['id']: entity for entity in to_payload(old)['entity']}
+
+    upserted, removed = new.changes_since(old)
+
+    assert upserted == {
+        entity['id']: entity for entity in to_payload(new)['entity'] if old_entities.get(entity['id']) != entity
+    }
+    assert sorted(upserted) == ['a', 'c', 'd', 'e'] and removed == ['j']
+
+def test_same_version_is_an_empty_delta():
+    store, log = tracked()
+    store.publish('bus_trips', fleet())
+
+    assert log.since(1, 1) == {'upserted': [], 'removed': []}
+
+def test_unknown_or_evicted_versions_need_a_full_snapshot():
+    store, log = tracked(max_diffs=2)
+    store.publish('bus_trips', fleet())
+    for value in range(1, 4):
+        store.publish('bus_trips', fleet(a=value))
+
+    assert log.since(1, 4) is None
+    assert log.since(2, 4) is not None
+    assert log.since(9, 4) is None
+    assert log.since(4, 9) is None
+
+def test_large_deltas_need_a_full_snapshot():
+    store, log = tracked()
+    store.publish('bus_trips', fleet())
+    store.publish('bus_trips', fleet(**{name: 1 for name in 'abcdef'}))
+
+    assert log.since(1, 2) is None
+
+def test_missed_version_breaks_the_chain():
+    store, log = tracked()
+    store.publish('bus_trips', fleet())
+    store.publish('bus_trips', fleet(a=1))
+    store._listeners.remove(log.on_publish)
+    store.publish('bus_trips', fleet(a=2))
+    store.subscribe(log.on_publish)
+    store.publish('bus_trips', fleet(a=3))
+
+    assert log.since(1, 4) is None
+    assert log.since(3, 4) is None
+
+def test_since_requests_share_normalized_query_bodies(app, client):
+    marta = app.extensions['marta']
+    epoch = marta['store'].epoch
+    feed_bodies = marta['bodies'].stats()['size']
+
+    for since in ('garbage', 'other-garbage', '1-2-3'):
+        response = client.get(f'/api/buses/trips?since={since}')
+        assert response.status_code == 200 and response.json['full']
+    delta = client.get(f'/api/buses/trips?since={epoch}-001').json
+
+    assert delta['full'] is False and delta['since'] == f'{epoch}-1'
+    assert marta['query_bodies'].stats()['size'] == 2
+    assert marta['bodies'].stats()['size'] == feed_bodies
+
+def test_since_request_before_the_log_records_the_version_is_not_cached(app, client):
+    marta = app.extensions['marta']
+    store, log = marta['store'], marta['deltas']['bus_trips']
+    previous = store.publish('bus_trips', fleet(), ttl=60)
+    base = client.get('/api/buses/trips').headers['X-Snapshot-Version']
+    store._listeners.remove(log.on_publish)
+    snapshot = store.publish('bus_trips', fleet(a=1), ttl=60)
+
+    early = client.get(f'/api/buses/trips?since={base}')
+    log.on_publish(previous, snapshot)
+    late = client.get(f'/api/buses/trips?since={base}', headers={'If-None-Match': early.headers['ETag']})
+
+    assert early.json['full'] is True
+    assert late.status_code == 200 and late.json['full'] is False
+    assert late.json['upserted'] == [{'id': 'a', 'value': 1}]
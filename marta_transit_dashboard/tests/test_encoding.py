@@ -0,0 +1,56 @@
+"""
+Tests for pre-encoded response bodies and content negotiation
+"""
+
+import gzip
+import json
+
+from utils.encoding import BodyCache, EncodedBody
+
+def test_small_bodies_are_only_served_uncompressed():
+    body = EncodedBody.from_payload({'status': 'On Time'})
+
+    assert body.encodings() == ['identity']
+    assert json.loads(body.get('identity')) == {'status': 'On Time'}
+
+def test_large_bodies_are_compressed_once():
+    payload = [{'STATION': 'FIVE POINTS STATION', 'WAITING_SECONDS': str(i)} for i in range(200)]
+    body = EncodedBody.from_payload(payload)
+
+    assert 'gzip' in body.encodings() and body.encodings()[-1] == 'identity'
+    assert json.loads(gzip.decompress(body.get('gzip'))) == payload
+    assert len(body.get('gzip')) < len(body.get('identity'))
+
+def test_body_cache_encodes_each_version_once_and_evicts_the_oldest():
+    cache = BodyCache(max_size=2)
+    builds = []
+    def build(value):
+        return lambda: builds.append(value) or {'value': value}
+
+    first = cache.get('trains', (1,), build(1))
+    assert cache.get('trains', (1,), build(1)) is first
+    cache.get('trains', (2,), build(2))
+    cache.get('weather', (1,), build(3))
+    cache.get('trains', (1,), build(4))
+
+    assert builds == [1, 2, 3, 4]
+    assert {key: value for key, value in cache.stats().items() if key in ('size', 'hits', 'misses')} == {
+        'size': 2, 'hits': 1, 'misses': 4
+    }
+
+def test_accept_encoding_picks_the_stored_representation(client):
+    identity = client.get('/api/trains', headers={'Accept-Encoding': 'identity'})
+    compressed = client.get('/api/trains', headers={'Accept-Encoding': 'gzip, deflate'})
+
+    assert 'Content-Encoding' not in identity.headers
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(compressed.data)) == identity.json
+    assert compressed.headers['ETag'] == identity.headers['ETag'][:-1] + '-gzip"'
+    assert 'Accept-Encoding' in compressed.headers['Vary']
+
+def test_etag_of_another_coding_is_not_a_match(client):
+    identity = client.get('/api/trains', headers={'Accept-Encoding': 'identity'})
+
+    response = client.get('/api/trains', headers={'Accept-Encoding': 'gzip', 'If-None-Match': identity.headers['ETag']})
+
+    assert response.status_code == 200 and response.headers['Content-Encoding'] == 'gzip'
@@ -0,0 +1,60 @@
+"""
+Tests for the direct GTFS-RT decoder
+"""
+
+import json
+
+from google.protobuf.json_format import MessageToJson
+from google.transit import gtfs_realtime_pb2
+
+from utils.gtfs_decoder import decode_header, decode_trip_updates
+
+def trip_updates_feed():
+    """TripUpdates feed using every field the decoder keeps, plus one vehicle entity"""
+    feed = gtfs_realtime_pb2.FeedMessage()
+    feed.header.gtfs_realtime_version = '2.0'
+    feed.header.incrementality = gtfs_realtime_pb2.FeedHeader.FULL_DATASET
+    feed.header.timestamp = 1745300000
+
+    entity = feed.entity.add()
+    entity.id = 't1'
+    update = entity.trip_update
+    update.trip.trip_id = '9000001'
+    update.trip.route_id = '110'
+    update.trip.direction_id = 1
+    update.trip.schedule_relationship = gtfs_realtime_pb2.TripDescriptor.SCHEDULED
+    update.vehicle.id = '1401'
+    update.vehicle.label = '1401'
+    update.timestamp = 1745299990
+    update.delay = 120
+    stop = update.stop_time_update.add()
+    stop.stop_sequence = 4
+    stop.stop_id = '907933'
+    stop.arrival.delay = 120
+    stop.arrival.time = 1745300120
+    stop.departure.time = 1745300150
+    stop = update.stop_time_update.add()
+    stop.stop_id = '907934'
+    stop.schedule_relationship = gtfs_realtime_pb2.TripUpdate.StopTimeUpdate.SKIPPED
+
+    entity = feed.entity.add()
+    entity.id = 't2'
+    entity.trip_update.trip.trip_id = '9000002'
+
+    entity = feed.entity.add()
+    entity.id = 'v1'
+    entity.vehicle.vehicle.id = '1402'
+    return feed
+
+def test_trip_updates_match_message_to_json():
+    feed = trip_updates_feed()
+    expected = json.loads(MessageToJson(feed))
+    expected['entity'] = [entity for entity in expected['entity'] if 'tripUpdate' in entity]
+
+    assert decode_trip_updates(feed) == expected
+
+def test_header_omits_unset_fields():
+    feed = gtfs_realtime_pb2.FeedMessage()
+    feed.header.gtfs_realtime_version = '2.0'
+
+    assert decode_header(feed) == {'gtfsRealtimeVersion': '2.0'}
@@ -0,0 +1,74 @@
+"""
+Tests for the Parquet history store
+"""
+
+import pytest
+
+pa = pytest.importorskip('pyarrow')
+
+import utils.history as history
+from utils.history import HistoryStore, train_table
+from utils.train_data import as_arrival_batch
+
+# 2025-04-22 12:00:00 UTC (08:00 in Atlanta)
+POLL = 1745323200
+
+def arrival(line, delay, event_time='04/22/2025 08:10:00 AM'):
+    """Rail feed record as the train API returns it"""
+    return {
+        'DESTINATION': 'Airport', 'DIRECTION': 'S', 'EVENT_TIME': event_time, 'IS_REALTIME': 'true',
+        'LINE': line, 'NEXT_ARR': '08:12:00 AM', 'STATION': 'FIVE POINTS STATION', 'TRAIN_ID': '101',
+        'WAITING_SECONDS': '120', 'WAITING_TIME': '2 min', 'DELAY': f'T{delay}S',
+        'LATITUDE': '33.75', 'LONGITUDE': '-84.39'
+    }
+
+def poll(*records, at=POLL):
+    """One rail poll as a history table"""
+    return train_table(as_arrival_batch(list(records)), at)
+
+def test_scan_filters_by_line_and_poll_time(tmp_path):
+    store = HistoryStore(str(tmp_path), flush_interval=60)
+    store.append('train_arrivals', poll(arrival('RED', 60), arrival('BLUE', 600)), POLL)
+    store.append('train_arrivals', poll(arrival('RED', 120), at=POLL + 30), POLL + 30)
+    store.flush()
+
+    assert store.stats() == {'bufferedRows': 0, 'filesWritten': 1, 'rowsWritten': 3}
+    assert store.scan('train_arrivals', where={'line': 'RED'}, columns=['delay']).column('delay').to_pylist() == [60, 120]
+    assert store.scan('train_arrivals', start=POLL + 10, columns=['delay']).column('delay').to_pylist() == [120]
+    assert store.scan('train_arrivals', where={'line': ['BLUE', 'GOLD']}).num_rows == 1
+    assert store.scan('bus_positions').num_rows == 0
+
+def test_buffer_is_written_once_it_spans_the_flush_interval(tmp_path):
+    store = HistoryStore(str(tmp_path), flush_interval=60)
+    store.append('train_arrivals', poll(arrival('RED', 60)), POLL)
+    store.append('train_arrivals', poll(arrival('RED', 60)), POLL + 60)
+
+    assert store.stats() == {'bufferedRows': 1, 'filesWritten': 1, 'rowsWritten': 1}
+
+def test_parquet_is_written_outside_the_lock(tmp_path, monkeypatch):
+    store = HistoryStore(str(tmp_path), flush_interval=60)
+    held = []
+    write_table = history.pq.write_table
+    def checking(*args, **kwargs):
+        held.append(store._lock.locked())
+        return write_table(*args, **kwargs)
+    monkeypatch.setattr(history.pq, 'write_table', checking)
+
+    store.append('train_arrivals', poll(arrival('RED', 60)), POLL)
+    store.append('train_arrivals', poll(arrival('RED', 60)), POLL + 60)
+    store.flush()
+
+    assert held == [False, False]
+
+def test_delay_by_hour_uses_atlanta_time(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    store.append('train_arrivals', poll(
+        arrival('RED', 60), arrival('RED', 180), arrival('BLUE', 600, '04/22/2025 09:05:00 AM')
+    ), POLL)
+    store.flush()
+
+    assert store.delay_by_hour() == [
+        {'hour': 8, 'meanDelay': 120.0, 'count': 2},
+        {'hour': 9, 'meanDelay': 600.0, 'count': 1}
+    ]
+    assert store.delay_by_hour(line='BLUE') == [{'hour': 9, 'meanDelay': 600.0, 'count': 1}]
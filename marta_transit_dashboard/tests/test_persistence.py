@@ -0,0 +1,70 @@
+"""
+Tests for write-behind, atomic cache persistence
+"""
+
+import json
+import os
+import threading
+
+import pytest
+
+from utils.persistence import CacheWriter, write_atomic
+
+def test_write_atomic_replaces_the_file(tmp_path):
+    path = tmp_path / 'cache' / 'train_data.json'
+
+    write_atomic(str(path), b'[1]')
+    write_atomic(str(path), b'[2]')
+
+    assert path.read_bytes() == b'[2]'
+    assert os.listdir(tmp_path / 'cache') == ['train_data.json']
+
+def test_failed_write_keeps_the_old_file(tmp_path):
+    path = tmp_path / 'train_data.json'
+    write_atomic(str(path), b'[1]')
+
+    with pytest.raises(TypeError):
+        write_atomic(str(path), 'not bytes')
+
+    assert path.read_bytes() == b'[1]'
+    assert os.listdir(tmp_path) == ['train_data.json']
+
+def test_queued_writes_to_one_path_are_coalesced(tmp_path):
+    writer = CacheWriter()
+    busy = threading.Event()
+    release = threading.Event()
+    built = []
+
+    def blocking():
+        busy.set()
+        release.wait(5)
+        return {'feed': 'weather'}
+
+    def payload(value):
+        def build():
+            built.append(value)
+            return {'version': value}
+        return build
+
+    writer.submit(str(tmp_path / 'weather.json'), blocking)
+    busy.wait(5)
+    for value in (1, 2, 3):
+        writer.submit(str(tmp_path / 'trains.json'), payload(value))
+    release.set()
+
+    assert writer.flush()
+    assert json.loads((tmp_path / 'trains.json').read_text()) == {'version': 3}
+    assert json.loads((tmp_path / 'weather.json').read_text()) == {'feed': 'weather'}
+    assert built == [3]
+    stats = writer.stats()
+    assert (stats['submitted'], stats['coalesced'], stats['written'], stats['queueDepth']) == (4, 2, 2, 0)
+
+def test_unserializable_payload_is_counted_as_an_error(tmp_path, capsys):
+    writer = CacheWriter()
+
+    writer.submit(str(tmp_path / 'bad.json'), {'value': object()})
+
+    assert writer.flush()
+    assert writer.stats()['errors'] == 1
+    assert not (tmp_path / 'bad.json').exists()
+    assert 'bad.json' in capsys.readouterr().out
@@ -0,0 +1,119 @@
+"""
+Tests for feed sources and the asyncio ingest engine
+"""
+
+import itertools
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from utils.ingest import FeedSource, fetch_source
+from utils.poller import FeedPoller
+from utils.snapshots import SnapshotStore
+
+@pytest.fixture
+def server():
+    """Local HTTP server answering /feed with a JSON body and anything else with 404"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = b'[1, 2, 3]'
+            self.send_response(200 if self.path.startswith('/feed') else 404)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}"
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+def test_source_needs_a_url_and_parser_or_a_loader():
+    with pytest.raises(ValueError):
+        FeedSource('trains', list, url='http://example.invalid/feed')
+
+    FeedSource('weather', dict, load=dict)
+
+def test_fetch_source_parses_the_body_or_falls_back(server, capsys):
+    parse = lambda content: [int(value) for value in content.strip(b'[]').split(b',')]
+
+    assert fetch_source(FeedSource('trains', list, url=server.url + '/feed', parse=parse)) == [1, 2, 3]
+    assert fetch_source(FeedSource('trains', lambda: ['cached'], url=server.url + '/missing', parse=parse)) == ['cached']
+    assert 'Error fetching trains' in capsys.readouterr().out
+
+def test_unavailable_or_failing_loads_use_the_fallback():
+    def broken():
+        raise RuntimeError('client library error')
+
+    assert fetch_source(FeedSource('weather', lambda: 'cached', load=broken)) == 'cached'
+    assert fetch_source(FeedSource('weather', lambda: 'cached', load=lambda: 'live', available=False)) == 'cached'
+
+def test_slow_feed_does_not_hold_up_the_others():
+    release = threading.Event()
+    counter = itertools.count()
+
+    def slow():
+        release.wait(5)
+        return 'slow'
+
+    store = SnapshotStore()
+    poller = FeedPoller(store, sources={
+        'slow': FeedSource('slow', lambda: 'cached', load=slow),
+        'fast': FeedSource('fast', lambda: -1, load=lambda: next(counter))
+    }, ttls={'slow': 60, 'fast': 0.01}, workers=2)
+    poller.start()
+    try:
+        assert wait_for(lambda: poller.stats()['feeds']['fast']['fetches'] >= 3)
+        assert store.get('slow').primed and store.get('slow').data == 'cached'
+        assert not store.get('fast').primed and store.get('fast').data >= 2
+
+        release.set()
+        assert wait_for(lambda: store.get('slow').data == 'slow')
+    finally:
+        release.set()
+        poller.stop()
+    assert not poller.running
+
+def test_failed_fetch_keeps_the_last_good_snapshot(capsys):
+    def broken():
+        raise RuntimeError('upstream down')
+
+    store = SnapshotStore()
+    poller = FeedPoller(store, sources={'trains': FeedSource('trains', lambda: ['cached'], load=broken)},
+                        ttls={'trains': 0.01})
+    poller.start()
+    try:
+        assert wait_for(lambda: poller.stats()['feeds']['trains']['errors'] == 1)
+    finally:
+        poller.stop()
+
+    stats = poller.stats()['feeds']['trains']
+    assert stats['fetches'] == 1 and stats['lastSuccess'] is None
+    assert store.get('trains').data == ['cached'] and store.get('trains').primed
+    assert 'Error polling trains: upstream down' in capsys.readouterr().out
+
+def test_refresh_publishes_with_the_feed_ttl():
+    store = SnapshotStore()
+    poller = FeedPoller(store, sources={'weather': FeedSource('weather', dict, load=lambda: {'temp': 71})},
+                        ttls={'weather': 600})
+
+    snapshot = poller.refresh('weather')
+
+    assert snapshot.data == {'temp': 71} and store.get('weather') is snapshot
+    assert snapshot.expires_at - snapshot.fetched_at == pytest.approx(600)
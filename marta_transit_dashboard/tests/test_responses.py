@@ -0,0 +1,46 @@
+"""
+Tests for snapshot ETags, conditional GET and Cache-Control
+"""
+
+def test_matching_etag_is_not_modified(app, client, train_records):
+    app.extensions['marta']['store'].publish('trains', train_records[1:], ttl=30)
+    first = client.get('/api/trains', headers={'Accept-Encoding': 'identity'})
+
+    repeat = client.get('/api/trains', headers={'Accept-Encoding': 'identity', 'If-None-Match': first.headers['ETag']})
+
+    assert first.status_code == 200 and first.headers['ETag']
+    assert repeat.status_code == 304 and repeat.data == b''
+    assert repeat.headers['ETag'] == first.headers['ETag']
+
+def test_new_snapshot_changes_the_etag(app, client, train_records):
+    store = app.extensions['marta']['store']
+    old = client.get('/api/trains').headers['ETag']
+    snapshot = store.publish('trains', train_records[1:], ttl=30)
+
+    response = client.get('/api/trains', headers={'If-None-Match': old})
+
+    assert response.status_code == 200 and response.headers['ETag'] != old
+    assert response.headers['X-Snapshot-Version'] == f"{store.epoch}-{snapshot.version}"
+
+def test_max_age_runs_until_the_next_poll(app, client, train_records):
+    assert client.get('/api/trains').cache_control.max_age == 0
+
+    app.extensions['marta']['store'].publish('trains', train_records[1:], ttl=30)
+    cache_control = client.get('/api/trains').cache_control
+
+    assert cache_control.public and 0 < cache_control.max_age <= 30
+
+def test_tracker_generation_is_part_of_the_etag(app, client):
+    first = client.get('/api/status')
+    app.extensions['marta']['bus_performance'].generation += 1
+
+    assert client.get('/api/status', headers={'If-None-Match': first.headers['ETag']}).status_code == 200
+
+def test_unpublished_feed_is_served_uncached(app, client):
+    store = app.extensions['marta']['store']
+    store._snapshots = {feed: snapshot for feed, snapshot in store._snapshots.items() if feed != 'weather'}
+
+    response = client.get('/api/weather')
+
+    assert response.status_code == 200
+    assert response.cache_control.no_cache and 'ETag' not in response.headers
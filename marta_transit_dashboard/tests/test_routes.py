@@ -0,0 +1,58 @@
+"""
+Tests for the ?bbox= and ?fields= viewport queries on the position endpoints
+"""
+
+from utils.bus_data import VehiclePositionColumns
+
+def fleet():
+    """Columns of three vehicles: two downtown, one in Decatur"""
+    return VehiclePositionColumns.from_feed_dict({'header': {'timestamp': '1745300000'}, 'entity': [
+        {'id': entity_id, 'vehicle': {
+            'trip': {'routeId': route}, 'vehicle': {'id': entity_id},
+            'position': {'latitude': lat, 'longitude': lon}, 'timestamp': '1745299990'
+        }}
+        for entity_id, route, lat, lon in [
+            ('a', '110', 33.75, -84.39), ('b', '39', 33.76, -84.38), ('c', '2', 33.77, -84.29)
+        ]
+    ]})
+
+def test_bus_positions_inside_the_box_with_projected_fields(app, client):
+    app.extensions['marta']['store'].publish('bus_positions', fleet(), ttl=30)
+
+    payload = client.get('/api/buses/positions?bbox=-84.40,33.74,-84.37,33.77&fields=trip,Position').json
+
+    assert [entity['id'] for entity in payload['entity']] == ['a', 'b']
+    assert payload['entity'][0]['vehicle'] == {
+        'trip': {'routeId': '110'}, 'position': {'latitude': 33.75, 'longitude': -84.39}
+    }
+    assert payload['header'] == {'timestamp': '1745300000'}
+
+def test_trains_inside_the_box_with_projected_fields(client, train_records):
+    located = [record for record in train_records if record.get('LATITUDE') and record.get('LONGITUDE')]
+    lat, lon = float(located[0]['LATITUDE']), float(located[0]['LONGITUDE'])
+
+    records = client.get(f'/api/trains?bbox={lon},{lat},{lon},{lat}&fields=station,line').json
+
+    assert {'LINE': located[0]['LINE'], 'STATION': located[0]['STATION']} in records
+    assert all(set(record) <= {'LINE', 'STATION'} for record in records)
+    assert len(records) < len(train_records)
+
+def test_equivalent_queries_share_one_cached_body(app, client):
+    marta = app.extensions['marta']
+    marta['store'].publish('bus_positions', fleet(), ttl=30)
+    feed_bodies = marta['bodies'].stats()['size']
+
+    first = client.get('/api/buses/positions?bbox=-84.4,33.74,-84.37,33.77&fields=position,trip')
+    second = client.get('/api/buses/positions?bbox=-84.40,33.740,-84.370,33.770&fields=trip, position')
+
+    assert first.headers['ETag'] == second.headers['ETag']
+    assert marta['query_bodies'].stats()['size'] == 1
+    assert marta['bodies'].stats()['size'] == feed_bodies
+
+def test_malformed_queries_are_rejected(client):
+    for query in ('bbox=1,2,3', 'bbox=a,b,c,d', 'bbox=-84.3,33.7,-84.4,33.8', 'bbox=nan,0,1,1', 'fields=trip,color'):
+        response = client.get(f'/api/buses/positions?{query}')
+        assert response.status_code == 400 and response.json['error']
+
+    assert client.get('/api/trains?fields=PLATFORM').status_code == 400
+    assert client.get('/api/buses/positions?since=1-1&fields=trip').status_code == 400
@@ -0,0 +1,100 @@
+"""
+Tests for adaptive poll scheduling
+"""
+
+import pytest
+
+from config.config import (
+    SCHEDULE_MARGIN,
+    SCHEDULE_MAX_BACKOFF,
+    SCHEDULE_MIN_DELAY,
+    SCHEDULE_RETRY_DELAY
+)
+from utils.ingest import FeedSource
+from utils.poller import FeedPoller
+from utils.schedule import FeedSchedule
+from utils.snapshots import SnapshotStore
+
+def test_feeds_without_timestamps_keep_their_ttl():
+    schedule = FeedSchedule(30)
+
+    assert schedule.observe(None, now=1000) == 30
+    assert schedule.observe(None, now=1030) == 30
+    assert schedule.interval is None
+
+def test_first_publish_is_probed_not_polled_on_the_ttl():
+    schedule = FeedSchedule(30)
+
+    assert schedule.observe(1000, now=1001) == SCHEDULE_RETRY_DELAY
+
+def test_fetch_lands_just_after_the_next_expected_publish():
+    schedule = FeedSchedule(60)
+    schedule.observe(1000, now=1001)
+    delay = schedule.observe(1010, now=1011)
+
+    assert schedule.interval == 10
+    assert delay == pytest.approx(1010 + 10 + SCHEDULE_MARGIN - 1011)
+
+def test_unchanged_fetches_back_off_exponentially_up_to_the_cap():
+    schedule = FeedSchedule(60)
+    schedule.observe(1000, now=1001)
+    schedule.observe(1010, now=1011)
+
+    delays = [schedule.observe(1010, now=1012 + i) for i in range(12)]
+
+    assert delays[:3] == [SCHEDULE_RETRY_DELAY, 2 * SCHEDULE_RETRY_DELAY, 4 * SCHEDULE_RETRY_DELAY]
+    assert all(later >= earlier for earlier, later in zip(delays, delays[1:]))
+    assert delays[-1] == SCHEDULE_MAX_BACKOFF
+    assert schedule.unchanged == 12
+
+def test_new_data_resets_the_backoff():
+    schedule = FeedSchedule(60)
+    schedule.observe(1000, now=1001)
+    schedule.observe(1010, now=1011)
+    for i in range(5):
+        schedule.observe(1010, now=1012 + i)
+
+    schedule.observe(1020, now=1021)
+
+    assert schedule.unchanged == 0
+    assert schedule.observe(1020, now=1022) == SCHEDULE_RETRY_DELAY
+
+def test_a_gap_spanning_a_stall_at_most_doubles_the_interval():
+    schedule = FeedSchedule(600, alpha=1.0)
+    schedule.observe(1000, now=1000)
+    schedule.observe(1010, now=1010)
+
+    schedule.observe(1500, now=1500)
+
+    assert schedule.interval == 20
+
+def test_delay_is_clamped_between_min_delay_and_ttl():
+    schedule = FeedSchedule(15)
+    schedule.observe(1000, now=1000)
+    schedule.observe(1100, now=1100)
+
+    assert schedule.observe(1200, now=1200) == 15
+    assert schedule.observe(1300, now=1500) == SCHEDULE_MIN_DELAY
+
+def test_stats_report_freshness():
+    schedule = FeedSchedule(60)
+    schedule.observe(1000, now=1003)
+
+    stats = schedule.stats()
+
+    assert stats['freshness'] == 3
+    assert stats['meanFreshness'] == 3
+    assert stats['sourceTime'] == 1000
+    assert stats['nextDelay'] == SCHEDULE_RETRY_DELAY
+
+def test_poller_uses_the_schedule_as_snapshot_ttl():
+    published = iter([{'time': 1000}, {'time': 1000}])
+    source = FeedSource('demo', fallback=dict, load=lambda: next(published), timestamp=lambda data: data['time'])
+    poller = FeedPoller(SnapshotStore(), sources={'demo': source}, ttls={'demo': 60})
+
+    first = poller.refresh('demo')
+    second = poller.refresh('demo')
+
+    assert first.expires_at - first.fetched_at == pytest.approx(SCHEDULE_RETRY_DELAY)
+    assert second.expires_at - second.fetched_at == pytest.approx(SCHEDULE_RETRY_DELAY)
+    assert poller.stats()['feeds']['demo']['schedule']['unchanged'] == 1
@@ -0,0 +1,75 @@
+"""
+Tests for upstream request coalescing
+"""
+
+import threading
+import time
+
+import pytest
+
+from utils.singleflight import SingleFlight
+
+def concurrent(flight, fn, callers=8):
+    """Call fn through flight from several threads while the first call is held open"""
+    release = threading.Event()
+    results = []
+    errors = []
+
+    def held():
+        release.wait(5)
+        return fn()
+
+    def call():
+        try:
+            results.append(flight.do('trains', held))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    # Every caller has either started the fetch or is waiting on it
+    while flight.stats().get('trains', {}).get('calls', 0) < callers:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    return results, errors
+
+def test_concurrent_callers_share_one_fetch():
+    flight = SingleFlight()
+    fetches = []
+    shared = {'trains': []}
+
+    results, errors = concurrent(flight, lambda: fetches.append(1) or shared)
+
+    assert errors == [] and len(fetches) == 1
+    assert len(results) == 8 and all(result is shared for result in results)
+    assert flight.stats()['trains'] == {'calls': 8, 'executions': 1, 'coalesced': 7, 'inFlight': False}
+
+def test_errors_reach_every_waiting_caller():
+    flight = SingleFlight()
+
+    def failing():
+        raise ConnectionError('upstream down')
+
+    results, errors = concurrent(flight, failing, callers=4)
+
+    assert results == [] and len(errors) == 4
+    assert all(isinstance(error, ConnectionError) for error in errors)
+
+def test_sequential_calls_fetch_again():
+    flight = SingleFlight()
+    values = iter([1, 2])
+
+    assert flight.do('weather', lambda: next(values)) == 1
+    assert flight.do('weather', lambda: next(values)) == 2
+    assert flight.stats()['weather']['executions'] == 2
+
+def test_failed_call_is_not_cached():
+    flight = SingleFlight()
+
+    with pytest.raises(ValueError):
+        flight.do('trains', int, 'not a number')
+
+    assert flight.do('trains', int, '5') == 5
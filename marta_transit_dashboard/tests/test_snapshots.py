@@ -0,0 +1,81 @@
+"""
+Tests for the versioned snapshot store
+"""
+
+from utils.snapshots import SnapshotStore
+
+def test_versions_move_only_when_data_changes():
+    store = SnapshotStore()
+    first = store.publish('trains', [1], ttl=10)
+    same = store.publish('trains', [1], ttl=10)
+    changed = store.publish('trains', [2], ttl=10)
+
+    assert (first.version, same.version, changed.version) == (1, 1, 2)
+    assert same.fetched_at >= first.fetched_at
+    assert store.get('trains') is changed
+
+def test_listeners_run_in_order_for_new_versions_only():
+    store = SnapshotStore()
+    calls = []
+    store.subscribe(lambda previous, snapshot: calls.append(('a', previous and previous.version, snapshot.version)))
+    store.subscribe(lambda previous, snapshot: calls.append(('b', previous and previous.version, snapshot.version)))
+
+    store.publish('trains', [1])
+    store.publish('trains', [1])
+    store.publish('trains', [2])
+
+    assert calls == [('a', None, 1), ('b', None, 1), ('a', 1, 2), ('b', 1, 2)]
+
+def test_new_version_is_visible_to_listeners():
+    store = SnapshotStore()
+    seen = []
+    store.subscribe(lambda previous, snapshot: seen.append(store.get('trains').version))
+
+    store.publish('trains', [1])
+    store.publish('trains', [2])
+
+    assert seen == [1, 2]
+
+def test_failing_listener_does_not_stop_the_others():
+    store = SnapshotStore()
+    calls = []
+
+    def broken(previous, snapshot):
+        raise RuntimeError('boom')
+
+    store.subscribe(broken)
+    store.subscribe(lambda previous, snapshot: calls.append(snapshot.version))
+
+    store.publish('trains', [1])
+
+    assert calls == [1]
+
+def test_first_live_fetch_replaces_primed_snapshot_even_if_equal():
+    store = SnapshotStore()
+    calls = []
+    store.subscribe(lambda previous, snapshot: calls.append((snapshot.version, snapshot.primed)))
+
+    primed = store.publish('trains', [1], ttl=0, primed=True)
+    live = store.publish('trains', [1], ttl=10)
+    again = store.publish('trains', [1], ttl=10)
+
+    assert primed.primed and not live.primed
+    assert live.version == 2 and again.version == 2
+    assert calls == [(1, True), (2, False)]
+
+def test_snapshot_set_is_consistent_across_publishes():
+    store = SnapshotStore()
+    store.publish('trains', [1])
+    view = store.snapshot_set()
+    store.publish('weather', {'temperature': 70})
+
+    assert set(view) == {'trains'}
+    assert set(store.snapshot_set()) == {'trains', 'weather'}
+
+def test_time_to_refresh():
+    store = SnapshotStore()
+    snapshot = store.publish('trains', [1], ttl=30)
+
+    assert snapshot.time_to_refresh(snapshot.fetched_at + 10) == 20
+    assert snapshot.time_to_refresh(snapshot.fetched_at + 40) == 0
+    assert store.publish('weather', {}).time_to_refresh() == 0
@@ -0,0 +1,81 @@
+"""
+Tests for the spatial grid behind /api/buses/near and ?bbox=
+"""
+
+import random
+
+import numpy as np
+
+from utils.bus_data import VehiclePositionColumns
+from utils.spatial import SpatialGrid, haversine_m
+
+def fleet(count, seed=7):
+    """Columns of count vehicles scattered around downtown Atlanta, plus one without a position"""
+    rng = random.Random(seed)
+    entities = [
+        {'id': str(i), 'vehicle': {
+            'trip': {'routeId': str(i % 20)},
+            'position': {'latitude': 33.75 + rng.uniform(-0.1, 0.1), 'longitude': -84.39 + rng.uniform(-0.1, 0.1)}
+        }}
+        for i in range(count)
+    ]
+    entities.append({'id': 'parked', 'vehicle': {'trip': {'routeId': '1'}}})
+    return VehiclePositionColumns.from_feed_dict({'header': {}, 'entity': entities})
+
+def test_nearest_matches_a_linear_scan():
+    columns = fleet(2000)
+    grid = SpatialGrid()
+    grid.update(columns, version=3)
+    lat, lon = columns.rows['lat'], columns.rows['lon']
+
+    for point_lat, point_lon in [(33.75, -84.39), (33.70, -84.45), (33.849, -84.291)]:
+        matches, distances, version = grid.nearest(point_lat, point_lon, 800, 10)
+        expected = np.sort(haversine_m(point_lat, point_lon, lat, lon))
+        expected = expected[expected <= 800][:10]
+
+        assert version == 3
+        assert np.allclose(distances, expected)
+        assert len(matches) == len(expected)
+
+def test_within_matches_a_bbox_mask():
+    columns = fleet(2000)
+    grid = SpatialGrid()
+    grid.update(columns)
+
+    for bbox in [(-84.40, 33.74, -84.38, 33.76), (-84.5, 33.6, -84.2, 33.9), (-84.0, 33.0, -83.9, 33.1)]:
+        assert np.array_equal(grid.within(columns, bbox), np.flatnonzero(columns.bbox_mask(*bbox)))
+
+def test_other_snapshots_are_scanned():
+    grid = SpatialGrid()
+    grid.update(fleet(100))
+    other = fleet(100, seed=8)
+    bbox = (-84.40, 33.74, -84.38, 33.76)
+
+    assert np.array_equal(grid.within(other, bbox), np.flatnonzero(other.bbox_mask(*bbox)))
+
+def test_vehicles_without_a_position_are_not_indexed():
+    grid = SpatialGrid()
+
+    assert grid.update(fleet(50)) == 50
+    assert grid.stats()['vehicles'] == 50
+    assert grid.nearest(33.75, -84.39, 5000, 100)[0] is not None
+
+def test_empty_grid():
+    grid = SpatialGrid()
+
+    assert grid.nearest(33.75, -84.39, 500, 10) == (None, [], None)
+    grid.update(VehiclePositionColumns.from_feed_dict({'header': {}, 'entity': []}))
+    matches, distances, _ = grid.nearest(33.75, -84.39, 500, 10)
+    assert len(matches) == 0 and distances == []
+
+def test_near_endpoint_returns_a_since_token(app, client):
+    marta = app.extensions['marta']
+    marta['store'].publish('bus_positions', fleet(200), ttl=30)
+
+    near = client.get('/api/buses/near?lat=33.75&lon=-84.39&radius=2000&limit=5').json
+    delta = client.get(f"/api/buses/positions?since={near['version']}").json
+
+    assert len(near['vehicles']) == 5
+    assert [vehicle['distance'] for vehicle in near['vehicles']] == sorted(vehicle['distance'] for vehicle in near['vehicles'])
+    assert near['version'] == f"{marta['store'].epoch}-{marta['store'].get('bus_positions').version}"
+    assert delta['full'] is False and delta['upserted'] == []
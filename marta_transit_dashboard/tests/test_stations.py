@@ -0,0 +1,71 @@
+"""
+Tests for the station registry and per-station arrival boards
+"""
+
+from utils.snapshots import SnapshotStore
+from utils.stations import StationBoard, StationRegistry, normalize_station_name
+from utils.train_data import as_arrival_batch
+
+def arrival(station, waiting, train_id='101', line='RED'):
+    """Rail feed record as the train API returns it"""
+    return {
+        'DESTINATION': 'Airport', 'DIRECTION': 'S', 'EVENT_TIME': '04/22/2025 12:18:03 AM',
+        'IS_REALTIME': 'true', 'LINE': line, 'NEXT_ARR': '12:20:07 AM', 'STATION': station,
+        'TRAIN_ID': train_id, 'WAITING_SECONDS': str(waiting), 'WAITING_TIME': '2 min',
+        'DELAY': 'T0S', 'LATITUDE': '33.75', 'LONGITUDE': '-84.39'
+    }
+
+def test_names_aliases_and_ids_resolve_to_one_station():
+    registry = StationRegistry()
+
+    assert normalize_station_name('five-points station') == 'FIVE POINTS'
+    assert {registry.resolve(name) for name in ('FIVE POINTS STATION', 'Five Points', 'five-points')} == {'five-points'}
+    assert registry.resolve('Hartsfield-Jackson') == 'airport'
+    assert registry.resolve('Nowhere') is None
+
+def test_arrivals_are_soonest_first_and_limited():
+    board = StationBoard(StationRegistry())
+    batch = as_arrival_batch([
+        arrival('FIVE POINTS STATION', 300, '1'),
+        arrival('AIRPORT STATION', 60, '2'),
+        arrival('FIVE POINTS STATION', 60, '3'),
+        arrival('FIVE POINTS STATION', 180, '4')
+    ])
+
+    assert [record['TRAIN_ID'] for record in board.arrivals(batch, 'five-points')] == ['3', '4', '1']
+    assert [record['TRAIN_ID'] for record in board.arrivals(batch, 'five-points', limit=1)] == ['3']
+    assert board.arrivals(batch, 'decatur') == []
+
+def test_published_poll_is_served_from_its_index():
+    store = SnapshotStore()
+    board = StationBoard(StationRegistry())
+    store.subscribe(board.on_publish)
+    snapshot = store.publish('trains', as_arrival_batch([arrival('MIDTOWN STATION', 90)]))
+
+    assert board.batch is snapshot.data
+    assert set(board._index) == {'midtown'}
+    assert [record['STATION'] for record in board.arrivals(snapshot.data, 'midtown')] == ['MIDTOWN STATION']
+
+def test_unknown_feed_stations_are_skipped_without_growing_the_registry(capsys):
+    registry = StationRegistry()
+    board = StationBoard(registry)
+    known = len(registry.all())
+    batch = as_arrival_batch([arrival('MYSTERY STATION', 60), arrival('MYSTERY STATION', 90), arrival('DECATUR STATION', 60)])
+
+    index = board.build(batch)
+    board.build(batch)
+
+    assert set(index) == {'decatur'}
+    assert len(registry.all()) == known and registry.resolve('MYSTERY STATION') is None
+    assert capsys.readouterr().out.count('MYSTERY STATION') == 1
+
+def test_station_endpoints(client):
+    stations = client.get('/api/stations').json['stations']
+    board = client.get('/api/stations/five-points/arrivals?limit=2').json
+    batch = client.get('/api/stations/arrivals?ids=Five Points,five-points,AIRPORT').json
+
+    assert any(station['id'] == 'five-points' for station in stations)
+    assert board['station']['id'] == 'five-points' and len(board['arrivals']) <= 2
+    assert [entry['station']['id'] for entry in batch['stations']] == ['five-points', 'airport']
+    assert client.get('/api/stations/nowhere/arrivals').status_code == 404
+    assert client.get('/api/stations/five-points/arrivals?limit=0').status_code == 400
@@ -0,0 +1,76 @@
+"""
+Tests for rail polls parsed once into typed arrival records
+"""
+
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from config.config import ATLANTA_TIMEZONE
+from utils.train_data import ArrivalBatch, train_feed_timestamp
+
+ATLANTA = ZoneInfo(ATLANTA_TIMEZONE)
+
+def arrival(**fields):
+    """Rail feed record as the train API returns it, with fields overridden"""
+    record = {
+        'DESTINATION': 'Airport', 'DIRECTION': 'S', 'EVENT_TIME': '04/22/2025 11:58:03 PM',
+        'IS_REALTIME': 'true', 'LINE': 'RED', 'NEXT_ARR': '12:02:07 AM', 'STATION': 'FIVE POINTS STATION',
+        'TRAIN_ID': '101', 'WAITING_SECONDS': '244', 'WAITING_TIME': '4 min',
+        'DELAY': 'T146S', 'LATITUDE': '33.75', 'LONGITUDE': '-84.39'
+    }
+    record.update(fields)
+    return record
+
+def test_fields_are_parsed_to_typed_values():
+    record = ArrivalBatch([arrival()]).arrivals[0]
+
+    assert (record.line, record.station, record.direction, record.train_id) == ('RED', 'FIVE POINTS STATION', 'S', '101')
+    assert record.delay == 146 and record.waiting_seconds == 244
+    assert record.latitude == 33.75 and record.longitude == -84.39
+    assert record.is_realtime is True
+    assert record.event_time == datetime(2025, 4, 22, 23, 58, 3, tzinfo=ATLANTA).timestamp()
+    # NEXT_ARR has no date and rolls over past midnight
+    assert record.next_arrival == datetime(2025, 4, 23, 0, 2, 7, tzinfo=ATLANTA).timestamp()
+
+def test_missing_and_malformed_values_are_none():
+    record = ArrivalBatch([arrival(DELAY='late', WAITING_SECONDS=None, EVENT_TIME='', LATITUDE='', IS_REALTIME='false')]).arrivals[0]
+
+    assert record.delay is None and record.waiting_seconds is None
+    assert record.event_time is None and record.next_arrival is None
+    assert record.latitude is None and record.is_realtime is False
+
+def test_records_are_slotted_and_labels_interned():
+    batch = ArrivalBatch([arrival(STATION=''.join(['FIVE POINTS', ' STATION'])), arrival(TRAIN_ID='102')])
+
+    assert not hasattr(batch.arrivals[0], '__dict__')
+    assert batch.arrivals[0].station is batch.arrivals[1].station
+    assert batch.columns.groups == [('RED', 'S')] and batch.columns.codes.tolist() == [0, 0]
+
+def test_within_matches_a_bbox_mask():
+    rng = np.random.default_rng(5)
+    records = [
+        arrival(LATITUDE=str(33.75 + lat), LONGITUDE=str(-84.39 + lon))
+        for lat, lon in rng.uniform(-0.1, 0.1, (300, 2))
+    ] + [arrival(LATITUDE='', LONGITUDE='')]
+    batch = ArrivalBatch(records)
+    bbox = (-84.40, 33.70, -84.35, 33.76)
+
+    lat, lon = batch.latitude, batch.longitude
+    expected = np.flatnonzero((lon >= bbox[0]) & (lon <= bbox[2]) & (lat >= bbox[1]) & (lat <= bbox[3]))
+
+    assert np.array_equal(batch.within(bbox), expected)
+
+def test_payload_serves_the_raw_records():
+    records = [arrival(), arrival(TRAIN_ID='102')]
+    batch = ArrivalBatch(records)
+
+    assert batch.to_payload() is records
+    assert batch.to_payload([1], ['TRAIN_ID', 'LINE']) == [{'TRAIN_ID': '102', 'LINE': 'RED'}]
+
+def test_feed_timestamp_is_the_newest_event_time():
+    batch = ArrivalBatch([arrival(), arrival(EVENT_TIME='04/22/2025 11:59:00 PM'), arrival(EVENT_TIME='')])
+
+    assert train_feed_timestamp(batch) == datetime(2025, 4, 22, 23, 59, tzinfo=ATLANTA).timestamp()
+    assert train_feed_timestamp(ArrivalBatch([])) is None
@@ -0,0 +1,55 @@
+"""
+Tests for the vectorized train delay analytics
+"""
+
+import warnings
+
+import numpy as np
+
+from utils.train_data import as_arrival_batch
+from utils.train_status import group_statistics, parse_floats, status_from_columns
+
+def test_parse_floats_strips_markers():
+    parsed = parse_floats(['T146S', 'T-30S', None, '146', 'T12.5S'], 'T', 'S')
+
+    assert parsed[:2].tolist() == [146.0, -30.0]
+    assert np.isnan(parsed[2]) and np.isnan(parsed[3])
+    assert parsed[4] == 12.5
+    assert parse_floats([]).shape == (0,)
+
+def test_parse_floats_keeps_valid_values_around_malformed_ones():
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        parsed = parse_floats(['110', 'soon', '', '33.75'])
+
+    assert parsed[0] == 110.0 and parsed[3] == 33.75
+    assert np.isnan(parsed[1]) and np.isnan(parsed[2])
+
+def test_group_statistics_match_numpy():
+    rng = np.random.default_rng(3)
+    codes = rng.integers(0, 4, 500)
+    values = rng.normal(120, 60, 500)
+    values[::17] = np.nan
+
+    stats = group_statistics(codes, values, 5)
+
+    for group in range(4):
+        group_values = values[(codes == group) & ~np.isnan(values)]
+        assert stats['count'][group] == len(group_values)
+        assert np.isclose(stats['mean'][group], group_values.mean())
+        assert np.isclose(stats['p90'][group], np.percentile(group_values, 90))
+        assert np.isclose(stats['max'][group], group_values.max())
+    assert stats['count'][4] == 0 and np.isnan(stats['p50'][4])
+
+def test_status_names_the_delayed_lines(train_records):
+    records = [dict(record, DELAY='T0S') for record in train_records]
+    assert status_from_columns(as_arrival_batch(records).columns)['status'] == 'On Time'
+
+    for record in records:
+        if record.get('LINE') == 'RED':
+            record['DELAY'] = 'T1300S'
+    status = status_from_columns(as_arrival_batch(records).columns)
+
+    assert status['status'] == 'Major Delays'
+    assert [line['line'] for line in status['affectedLines']] == ['RED']
+    assert {group['line'] for group in status['lines']} >= {'RED'}
@@ -0,0 +1,88 @@
+"""
+Tests for the tracker-backed /api/updates and /api/status views
+"""
+
+import time
+
+from config.config import ANOMALY_UPDATE_TTL
+from utils.train_data import as_arrival_batch
+
+def delayed(records, line, seconds):
+    """Copy of a rail poll with every train of one line running late"""
+    return as_arrival_batch([
+        dict(record, DELAY=f"T{seconds}S") if record.get('LINE') == line else record
+        for record in records
+    ])
+
+def request_between_publish_and_trackers(app, client, path):
+    """
+    Make the store issue a request right after a new version becomes
+    visible, before any tracker has folded the snapshot in
+
+    Returns:
+        list: JSON bodies of the requests made during publishes
+    """
+    seen = []
+    app.extensions['marta']['store']._listeners.insert(0, lambda previous, snapshot: seen.append(client.get(path).json))
+    return seen
+
+def test_first_updates_response_after_publish_shows_new_state(app, client, train_records):
+    assert client.get('/api/updates').json[0]['type'] == 'on-time'
+    seen = request_between_publish_and_trackers(app, client, '/api/updates')
+
+    app.extensions['marta']['store'].publish('trains', delayed(train_records, 'RED', 1300), ttl=30)
+
+    assert seen[0][0]['type'] == 'on-time'
+    updates = client.get('/api/updates').json
+    assert updates[0]['type'] == 'disrupted'
+    assert any(update['message'].startswith('RED Line') for update in updates)
+
+def test_updates_etag_changes_with_detector_state(app, client, train_records):
+    first = client.get('/api/updates')
+    assert client.get('/api/updates', headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+
+    app.extensions['marta']['store'].publish('trains', delayed(train_records, 'RED', 1300), ttl=30)
+
+    response = client.get('/api/updates', headers={'If-None-Match': first.headers['ETag']})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != first.headers['ETag']
+
+def test_updates_expire_by_time_without_new_snapshots(app, client, train_records):
+    detector = app.extensions['marta']['anomalies']
+    # Last seen just under ANOMALY_UPDATE_TTL ago, so it times out in a second
+    detector.observe_trains(delayed(train_records, 'RED', 1300), time.time() - ANOMALY_UPDATE_TTL + 1)
+    assert client.get('/api/updates').json[0]['type'] == 'disrupted'
+
+    time.sleep(1.1)
+
+    assert client.get('/api/updates').json[0]['type'] == 'on-time'
+
+def test_first_status_response_after_publish_includes_the_poll(app, client, train_records):
+    assert client.get('/api/status').json['trainStatus']['trend']['windows']['15m']['arrivals'] == 0
+    seen = request_between_publish_and_trackers(app, client, '/api/status')
+
+    app.extensions['marta']['store'].publish('trains', as_arrival_batch(train_records), ttl=30)
+
+    assert seen[0]['trainStatus']['trend']['windows']['15m']['arrivals'] == 0
+    trend = client.get('/api/status').json['trainStatus']['trend']
+    assert trend['windows']['15m']['arrivals'] > 0
+
+def test_dashboard_sections_follow_tracker_state(app, client, train_records):
+    assert client.get('/api/dashboard?sections=updates').json['updates'][0]['type'] == 'on-time'
+
+    app.extensions['marta']['store'].publish('trains', delayed(train_records, 'RED', 1300), ttl=30)
+
+    assert client.get('/api/dashboard?sections=updates').json['updates'][0]['type'] == 'disrupted'
+
+def test_first_status_response_after_live_trips_includes_bus_performance(app, client):
+    assert client.get('/api/status').json['busStatus']['trips'] == 0
+    seen = request_between_publish_and_trackers(app, client, '/api/status')
+
+    trips = {
+        'header': {'timestamp': str(int(time.time()))},
+        'entity': [{'id': '1', 'tripUpdate': {'trip': {'tripId': 'T1', 'routeId': '110'}, 'delay': 420}}]
+    }
+    app.extensions['marta']['store'].publish('bus_trips', trips, ttl=30)
+
+    assert seen[0]['busStatus']['trips'] == 0
+    assert client.get('/api/status').json['busStatus']['trips'] > 0
@@ -0,0 +1,92 @@
+"""
+Tests for the pooled upstream HTTP client
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from utils.upstream import LatencyHistogram, UpstreamClient
+
+@pytest.fixture
+def server():
+    """Local keep-alive HTTP server answering with the queued status codes (200 once empty)"""
+    statuses = []
+    connections = set()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            connections.add(self.client_address)
+            body = b'{}'
+            self.send_response(statuses.pop(0) if statuses else 200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}/feed"
+    httpd.statuses = statuses
+    httpd.connections = connections
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+def test_connections_are_kept_alive_between_polls(server):
+    client = UpstreamClient(retry_backoff=0)
+
+    for _ in range(3):
+        assert client.get('trains', server.url).status_code == 200
+
+    assert len(server.connections) == 1
+    assert client.session_for(server.url) is client.session_for(server.url + '?other')
+    assert client.stats()['trains']['latency']['count'] == 3
+    client.close()
+
+def test_busy_upstream_is_retried(server):
+    client = UpstreamClient(max_retries=2, retry_backoff=0)
+    server.statuses.extend([503, 502])
+
+    response = client.get('trains', server.url)
+
+    assert response.status_code == 200
+    assert client.stats()['trains']['retries'] == 2
+    assert client.stats()['trains']['errors'] == 2
+    client.close()
+
+def test_retries_are_bounded(server):
+    client = UpstreamClient(max_retries=1, retry_backoff=0)
+    server.statuses.extend([503, 503, 503])
+
+    assert client.get('trains', server.url).status_code == 503
+    assert client.stats()['trains']['retries'] == 1
+    client.close()
+
+def test_unreachable_upstream_raises_after_the_last_attempt(server):
+    url = server.url
+    server.shutdown()
+    server.server_close()
+    client = UpstreamClient(connect_timeout=0.5, read_timeout=0.5, max_retries=1, retry_backoff=0)
+
+    with pytest.raises(requests.ConnectionError):
+        client.get('weather', url)
+
+    assert client.stats()['weather']['errors'] == 2
+
+def test_histogram_buckets_are_cumulative():
+    histogram = LatencyHistogram([0.1, 0.5])
+    for seconds in (0.05, 0.2, 0.3, 2.0):
+        histogram.observe(seconds)
+
+    snapshot = histogram.snapshot()
+
+    assert snapshot['buckets'] == {'0.1': 1, '0.5': 3, '+Inf': 4}
+    assert snapshot['count'] == 4 and snapshot['mean'] == pytest.approx(0.6375)
@@ -0,0 +1,341 @@
+"""
+Delay anomaly detection utilities for the Simple MARTA App
+
+Keeps an exponentially weighted mean and variance of the delay on every
+rail line, at every rail station and on every bus route, and of the wait
+for the next train on every line at every station. Each new snapshot is
+reduced to one observation per series and all series are scored and
+updated together with NumPy. An observation well above what its series
+usually shows becomes a service update. Until a series has a baseline,
+a delay of DELAY_MAJOR_THRESHOLD or more is reported as a disruption, so
+a problem already under way at startup is not missed. Updates are keyed
+per series, so a persisting problem stays one entry, and they expire once the problem
+has not been seen for ANOMALY_UPDATE_TTL seconds.
+"""
+
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+# Add parent directory to import path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import (
+    ANOMALY_ALPHA,
+    ANOMALY_MAX_UPDATES,
+    ANOMALY_MIN_EXCESS,
+    ANOMALY_NOISE_FLOOR,
+    ANOMALY_UPDATE_TTL,
+    ANOMALY_WARMUP,
+    ANOMALY_Z_THRESHOLD,
+    DELAY_MAJOR_THRESHOLD
+)
+from utils.bus_status import trip_delay
+from utils.snapshots import to_payload
+from utils.train_data import as_arrival_batch
+
+class EwmaSeries:
+    """
+    Exponentially weighted mean and variance of many keyed series
+    """
+
+    def __init__(self, alpha=ANOMALY_ALPHA, warmup=ANOMALY_WARMUP):
+        """
+        Args:
+            alpha (float, optional): Weight of each new observation
+            warmup (int, optional): Observations a series needs before it
+                is scored
+        """
+        self.alpha = alpha
+        self.warmup = warmup
+        self._index = {}
+        self._keys = []
+        self.mean = np.zeros(16)
+        self.var = np.zeros(16)
+        self.count = np.zeros(16, dtype=np.int64)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _indices(self, keys):
+        """Array indices of keys, adding new series as needed"""
+        indices = []
+        for key in keys:
+            index = self._index.get(key)
+            if index is None:
+                index = self._index[key] = len(self._keys)
+                self._keys.append(key)
+            indices.append(index)
+        if len(self._keys) > len(self.mean):
+            extra = len(self._keys)
+            self.mean = np.concatenate((self.mean, np.zeros(extra)))
+            self.var = np.concatenate((self.var, np.zeros(extra)))
+            self.count = np.concatenate((self.count, np.zeros(extra, dtype=np.int64)))
+        return np.array(indices, dtype=np.int64)
+
+    def observe(self, keys, values):
+        """
+        Score one observation per series, then fold them in
+
+        Args:
+            keys (list): Distinct series keys
+            values (numpy.ndarray): Observation per key
+
+        Returns:
+            tuple: (z-scores, baseline means, baseline standard deviations)
+                per key from before the update; z-scores are NaN for
+                series still warming up
+        """
+        indices = self._indices(keys)
+        fresh = self.count[indices] == 0
+        mean = np.where(fresh, values, self.mean[indices])
+        std = np.sqrt(self.var[indices])
+        z = (values - mean) / np.hypot(std, ANOMALY_NOISE_FLOOR)
+        z[self.count[indices] < self.warmup] = np.nan
+
+        deviation = values - mean
+        self.mean[indices] = mean + self.alpha * deviation
+        self.var[indices] = (1 - self.alpha) * (self.var[indices] + self.alpha * deviation * deviation)
+        self.count[indices] += 1
+        return z, mean, std
+
+def group_means(labels, values):
+    """
+    Mean value per distinct label
+
+    Args:
+        labels (list): Label per value (None labels are ignored)
+        values (numpy.ndarray): Values (NaN values are ignored)
+
+    Returns:
+        tuple: (distinct labels, numpy.ndarray of means)
+    """
+    return _grouped(labels, values, 'mean')
+
+def group_minimums(labels, values):
+    """
+    Smallest value per distinct label
+
+    Args:
+        labels (list): Label per value (None labels are ignored)
+        values (numpy.ndarray): Values (NaN values are ignored)
+
+    Returns:
+        tuple: (distinct labels, numpy.ndarray of minimums)
+    """
+    return _grouped(labels, values, 'min')
+
+def _grouped(labels, values, reduce):
+    codes = {}
+    label_codes = np.array([codes.setdefault(label, len(codes)) if label else -1 for label in labels], dtype=np.int64)
+    keep = (label_codes >= 0) & ~np.isnan(values)
+    label_codes, values = label_codes[keep], values[keep]
+    size = len(codes)
+    counts = np.bincount(label_codes, minlength=size)
+    if reduce == 'mean':
+        with np.errstate(invalid='ignore', divide='ignore'):
+            result = np.bincount(label_codes, weights=values, minlength=size) / counts
+    else:
+        result = np.full(size, np.inf)
+        np.minimum.at(result, label_codes, values)
+    present = np.flatnonzero(counts)
+    distinct = list(codes)
+    return [distinct[i] for i in present.tolist()], result[present]
+
+class AnomalyDetector:
+    """
+    Streaming delay and gap anomaly detector behind /api/updates
+    """
+
+    def __init__(self, train_feed='trains', trip_feed='bus_trips'):
+        """
+        Args:
+            train_feed (str, optional): Rail feed to watch
+            trip_feed (str, optional): Trip updates feed to watch
+        """
+        self.train_feed = train_feed
+        self.trip_feed = trip_feed
+        self._series = {kind: EwmaSeries() for kind in ('line', 'station', 'gap', 'route')}
+        self._active = {}
+        self._observations = 0
+        self._flagged = 0
+        self._updates = self._build_updates()
+        self._next_expiry = None
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def on_publish(self, previous, snapshot):
+        """
+        SnapshotStore listener: score every fetched rail or trip updates snapshot
+
+        Args:
+            previous (Snapshot): Previous snapshot of the feed, or None
+            snapshot (Snapshot): Newly published snapshot
+        """
+        if snapshot.feed not in (self.train_feed, self.trip_feed):
+            return
+        if snapshot.primed:
+            # Primed from the cache file: not a current observation
+            return
+        if snapshot.feed == self.train_feed:
+            self.observe_trains(snapshot.data, snapshot.fetched_at)
+        else:
+            self.observe_trips(to_payload(snapshot.data), snapshot.fetched_at)
+
+    def observe_trains(self, train_data, timestamp):
+        """
+        Score one rail poll: delay per line and per station, and the wait
+        for the next train per line at each station
+
+        Args:
+            train_data (ArrivalBatch or list): Rail poll
+            timestamp (float): Fetch time, Unix seconds
+        """
+        batch = as_arrival_batch(train_data)
+        arrivals = batch.arrivals
+        lines = [arrival.line for arrival in arrivals]
+        stations = [arrival.station for arrival in arrivals]
+        line_stations = [
+            (arrival.line, arrival.station) if arrival.line and arrival.station else None
+            for arrival in arrivals
+        ]
+        with self._lock:
+            self._score('line', *group_means(lines, batch.delay), timestamp)
+            self._score('station', *group_means(stations, batch.delay), timestamp)
+            self._score('gap', *group_minimums(line_stations, batch.waiting), timestamp)
+            self._finish(timestamp)
+
+    def observe_trips(self, data, timestamp):
+        """
+        Score one trip updates snapshot: mean delay per bus route
+
+        Args:
+            data (dict): Trip updates feed in GTFS-RT JSON shape
+            timestamp (float): Fetch time, Unix seconds
+        """
+        feed_time = int(data.get('header', {}).get('timestamp') or 0)
+        routes = []
+        delays = []
+        for entity in data.get('entity', []):
+            update = entity.get('tripUpdate') or {}
+            delay = trip_delay(update, feed_time)
+            if delay is None:
+                continue
+            routes.append((update.get('trip') or {}).get('routeId'))
+            delays.append(delay)
+        with self._lock:
+            self._score('route', *group_means(routes, np.array(delays, dtype=float)), timestamp)
+            self._finish(timestamp)
+
+    def _score(self, kind, keys, values, timestamp):
+        """Fold one observation per series in and record the unusual ones"""
+        if not keys:
+            return
+        z, mean, std = self._series[kind].observe(keys, values)
+        self._observations += len(keys)
+        warming = np.isnan(z)
+        with np.errstate(invalid='ignore'):
+            unusual = (z > ANOMALY_Z_THRESHOLD) & (values - mean > ANOMALY_MIN_EXCESS)
+        if kind != 'gap':
+            # No baseline yet: fall back to the absolute delay threshold
+            unusual |= warming & (values >= DELAY_MAJOR_THRESHOLD)
+        for i in np.flatnonzero(unusual).tolist():
+            key = keys[i]
+            value = float(values[i])
+            usual = None if warming[i] else float(mean[i])
+            entry = self._active.get((kind, key))
+            self._active[(kind, key)] = {
+                'type': 'disrupted' if value >= DELAY_MAJOR_THRESHOLD else 'delayed',
+                'message': _message(kind, key, value, usual),
+                'kind': kind,
+                'value': round(value),
+                'usual': round(usual) if usual is not None else None,
+                'zScore': None if warming[i] else round(float(z[i]), 1),
+                'since': entry['since'] if entry else timestamp,
+                'updated': timestamp
+            }
+            self._flagged += 1
+
+    def _finish(self, timestamp):
+        """Expire stale updates and rebuild the served list"""
+        cutoff = timestamp - ANOMALY_UPDATE_TTL
+        for key in [key for key, entry in self._active.items() if entry['updated'] < cutoff]:
+            del self._active[key]
+        self._updates = self._build_updates()
+        self._next_expiry = (
+            min(entry['updated'] for entry in self._active.values()) + ANOMALY_UPDATE_TTL
+            if self._active else None
+        )
+        self._generation += 1
+
+    def _expire(self, now):
+        """Drop updates that timed out since the last snapshot"""
+        with self._lock:
+            if self._next_expiry is not None and now > self._next_expiry:
+                self._finish(now)
+
+    @property
+    def generation(self):
+        """
+        int: Moves forward every time the served list changes, whether a
+            snapshot was scored or an update timed out; views built from
+            the updates are keyed by it
+        """
+        self._expire(time.time())
+        return self._generation
+
+    def _build_updates(self):
+        """Derive the served list from the active anomalies"""
+        if not self._active:
+            return [{'type': 'on-time', 'message': 'All lines and routes operating normally'}]
+        entries = sorted(
+            self._active.values(),
+            key=lambda entry: (entry['type'] != 'disrupted', -entry['updated'], -(entry['zScore'] or 0))
+        )
+        return entries[:ANOMALY_MAX_UPDATES]
+
+    def updates(self):
+        """
+        Get the current service updates
+
+        Returns:
+            list: {'type', 'message', 'kind', 'value', 'usual', 'zScore',
+                'since', 'updated'} per active anomaly, disruptions first
+                and most recent first ('usual' and 'zScore' are None for
+                series without a baseline yet); a single on-time entry
+                when there are none
+        """
+        self._expire(time.time())
+        return self._updates
+
+    def stats(self):
+        """
+        Get detector counters
+
+        Returns:
+            dict: Series tracked per kind, observations scored, anomalies
+                flagged and updates currently active
+        """
+        with self._lock:
+            return {
+                'series': {kind: len(series) for kind, series in self._series.items()},
+                'observations': self._observations,
+                'flagged': self._flagged,
+                'active': len(self._active)
+            }
+
+def _message(kind, key, value, usual):
+    """Service update text for one anomaly; usual is None without a baseline"""
+    minutes = round(value / 60)
+    usually = f" (usually {round(usual / 60)})" if usual is not None else ''
+    if kind == 'line':
+        return f"{key} Line trains running {minutes} minutes late{usually}"
+    if kind == 'station':
+        return f"Trains at {key} running {minutes} minutes late{usually}"
+    if kind == 'gap':
+        line, station = key
+        return f"Long wait for {line} Line trains at {station}: next train in {minutes} minutes{usually}"
+    return f"Route {key} buses running {minutes} minutes late{usually}"
@@ -0,0 +1,320 @@
+"""
+Snapshot archive utilities for the Simple MARTA App
+
+Every new train, bus position and trip update snapshot is appended to an
+on-disk archive instead of a new pretty-printed JSON file per fetch. Each
+feed gets a directory of time-partitioned segment files:
+
+    <feed>/<start ms>.seg   zlib-compressed blocks, one per snapshot
+    <feed>/<start ms>.idx   fixed-size (timestamp, block offset) entries
+
+A segment is closed once it reaches ARCHIVE_SEGMENT_MAX_BYTES or
+ARCHIVE_SEGMENT_MAX_AGE, and segments older than ARCHIVE_RETENTION are
+deleted. Readers use the index to seek straight to the first block of a
+time range and decompress one block at a time.
+"""
+
+import bisect
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+
+# Add parent directory to import path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import (
+    ARCHIVE_DIR,
+    ARCHIVE_FEEDS,
+    ARCHIVE_SEGMENT_MAX_BYTES,
+    ARCHIVE_SEGMENT_MAX_AGE,
+    ARCHIVE_RETENTION,
+    ARCHIVE_COMPRESSION_LEVEL
+)
+from utils.encoding import dumps_json
+from utils.snapshots import to_payload
+
+# Block header: fetch timestamp, compressed length, uncompressed length
+BLOCK_HEADER = struct.Struct('>dII')
+
+# Index entry: block timestamp, byte offset of the block in the segment
+INDEX_ENTRY = struct.Struct('>dQ')
+
+SEGMENT_SUFFIX = '.seg'
+INDEX_SUFFIX = '.idx'
+
+class _Segment:
+    """
+    Open segment being appended to
+    """
+
+    def __init__(self, directory, started_at):
+        base = os.path.join(directory, f"{int(started_at * 1000):013d}")
+        self.started_at = started_at
+        self.path = base + SEGMENT_SUFFIX
+        self.data = open(self.path, 'ab')
+        self.index = open(base + INDEX_SUFFIX, 'ab')
+        self.size = self.data.tell()
+
+    def append(self, timestamp, raw, level):
+        """
+        Compress and append one block, then index it
+
+        Returns:
+            int: Bytes written
+        """
+        compressed = zlib.compress(raw, level)
+        offset = self.size
+        self.data.write(BLOCK_HEADER.pack(timestamp, len(compressed), len(raw)))
+        self.data.write(compressed)
+        self.data.flush()
+        # The block is on disk before its index entry, so readers never
+        # follow an entry to a partial block
+        self.index.write(INDEX_ENTRY.pack(timestamp, offset))
+        self.index.flush()
+        written = BLOCK_HEADER.size + len(compressed)
+        self.size += written
+        return written
+
+    def close(self):
+        self.data.close()
+        self.index.close()
+
+def list_segments(directory):
+    """
+    List the segments in a feed directory, oldest first
+
+    Args:
+        directory (str): Feed archive directory
+
+    Returns:
+        list: (start timestamp, segment path) tuples
+    """
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+
+    segments = []
+    for name in names:
+        if name.endswith(SEGMENT_SUFFIX):
+            try:
+                started_at = int(name[:-len(SEGMENT_SUFFIX)]) / 1000
+            except ValueError:
+                continue
+            segments.append((started_at, os.path.join(directory, name)))
+    return sorted(segments)
+
+def read_index(segment_path):
+    """
+    Load a segment's index
+
+    A trailing partial entry (from a write in progress) is ignored.
+
+    Args:
+        segment_path (str): Path of the .seg file
+
+    Returns:
+        tuple: (list of timestamps, list of offsets)
+    """
+    index_path = segment_path[:-len(SEGMENT_SUFFIX)] + INDEX_SUFFIX
+    try:
+        with open(index_path, 'rb') as f:
+            raw = f.read()
+    except FileNotFoundError:
+        return [], []
+
+    usable = len(raw) - len(raw) % INDEX_ENTRY.size
+    timestamps, offsets = [], []
+    for timestamp, offset in INDEX_ENTRY.iter_unpack(raw[:usable]):
+        timestamps.append(timestamp)
+        offsets.append(offset)
+    return timestamps, offsets
+
+class SnapshotArchive:
+    """
+    Append-only, compressed, segmented archive of feed snapshots
+    """
+
+    def __init__(self, directory=ARCHIVE_DIR, feeds=ARCHIVE_FEEDS, bodies=None,
+                 max_segment_bytes=ARCHIVE_SEGMENT_MAX_BYTES,
+                 max_segment_age=ARCHIVE_SEGMENT_MAX_AGE,
+                 retention=ARCHIVE_RETENTION,
+                 level=ARCHIVE_COMPRESSION_LEVEL):
+        """
+        Args:
+            directory (str, optional): Root directory of the archive
+            feeds (iterable, optional): Feeds to archive
+            bodies (BodyCache, optional): Shared cache of encoded feed bodies
+            max_segment_bytes (int, optional): Rotate segments past this size
+            max_segment_age (float, optional): Rotate segments older than this (seconds)
+            retention (float, optional): Delete segments older than this (seconds)
+            level (int, optional): zlib compression level
+        """
+        self.directory = directory
+        self.feeds = frozenset(feeds)
+        self.bodies = bodies
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_age = max_segment_age
+        self.retention = retention
+        self.level = level
+        self._segments = {}
+        self._lock = threading.Lock()
+        self._blocks = 0
+        self._raw_bytes = 0
+        self._stored_bytes = 0
+
+    def feed_directory(self, feed):
+        """
+        Get the directory holding a feed's segments
+
+        Args:
+            feed (str): Feed name
+
+        Returns:
+            str: Directory path
+        """
+        return os.path.join(self.directory, feed)
+
+    def append(self, feed, raw, timestamp=None):
+        """
+        Append one encoded snapshot to a feed's archive
+
+        Args:
+            feed (str): Feed name
+            raw (bytes): Encoded snapshot
+            timestamp (float, optional): Fetch time. Defaults to now.
+        """
+        timestamp = timestamp or time.time()
+        with self._lock:
+            segment = self._segments.get(feed)
+            if segment is not None and (
+                segment.size >= self.max_segment_bytes or
+                timestamp - segment.started_at >= self.max_segment_age
+            ):
+                segment.close()
+                segment = None
+                self._expire(feed, timestamp)
+
+            if segment is None:
+                directory = self.feed_directory(feed)
+                os.makedirs(directory, exist_ok=True)
+                segment = _Segment(directory, timestamp)
+                self._segments[feed] = segment
+
+            self._stored_bytes += segment.append(timestamp, raw, self.level)
+            self._raw_bytes += len(raw)
+            self._blocks += 1
+
+    def _expire(self, feed, now):
+        """Delete closed segments that only hold data past retention"""
+        segments = list_segments(self.feed_directory(feed))
+        # A segment's data ends before the next segment starts
+        for (started_at, path), (next_start, _) in zip(segments, segments[1:]):
+            if next_start > now - self.retention:
+                break
+            for stale in (path, path[:-len(SEGMENT_SUFFIX)] + INDEX_SUFFIX):
+                try:
+                    os.remove(stale)
+                except OSError as e:
+                    print(f"Error removing archive segment {stale}: {e}")
+
+    def on_publish(self, previous, snapshot):
+        """
+        SnapshotStore listener: archive every new version of the tracked feeds
+
+        Args:
+            previous (Snapshot): Previous snapshot of the feed, or None
+            snapshot (Snapshot): Newly published snapshot
+        """
+        if snapshot.feed not in self.feeds:
+            return
+        if snapshot.primed:
+            # Primed from the cache file, which was archived when it was fetched
+            return
+        if self.bodies is not None:
+            body = self.bodies.get(snapshot.feed, (snapshot.version,), lambda: to_payload(snapshot.data))
+            raw = body.identity
+        else:
+            raw = dumps_json(to_payload(snapshot.data))
+        try:
+            self.append(snapshot.feed, raw, snapshot.fetched_at)
+        except OSError as e:
+            print(f"Error archiving {snapshot.feed} snapshot: {e}")
+
+    def read_range(self, feed, start=None, end=None):
+        """
+        Stream the archived snapshots of a feed within a time range
+
+        Only the segments overlapping the range are opened, the index is
+        used to seek to the first matching block, and blocks are
+        decompressed one at a time.
+
+        Args:
+            feed (str): Feed name
+            start (float, optional): Earliest fetch time (inclusive)
+            end (float, optional): Latest fetch time (inclusive)
+
+        Yields:
+            tuple: (timestamp, encoded snapshot bytes), oldest first
+        """
+        start = start if start is not None else float('-inf')
+        end = end if end is not None else float('inf')
+        segments = list_segments(self.feed_directory(feed))
+
+        for i, (started_at, path) in enumerate(segments):
+            next_start = segments[i + 1][0] if i + 1 < len(segments) else float('inf')
+            if started_at > end:
+                break
+            if next_start < start:
+                continue
+
+            timestamps, offsets = read_index(path)
+            first = bisect.bisect_left(timestamps, start)
+            if first == len(timestamps):
+                continue
+
+            try:
+                f = open(path, 'rb')
+            except FileNotFoundError:
+                # Expired while we were reading
+                continue
+            with f:
+                f.seek(offsets[first])
+                for timestamp in timestamps[first:]:
+                    if timestamp > end:
+                        return
+                    header = f.read(BLOCK_HEADER.size)
+                    if len(header) < BLOCK_HEADER.size:
+                        break
+                    _, compressed_size, _ = BLOCK_HEADER.unpack(header)
+                    compressed = f.read(compressed_size)
+                    if len(compressed) < compressed_size:
+                        break
+                    yield timestamp, zlib.decompress(compressed)
+
+    def close(self):
+        """
+        Close every open segment
+        """
+        with self._lock:
+            for segment in self._segments.values():
+                segment.close()
+            self._segments = {}
+
+    def stats(self):
+        """
+        Get archive counters
+
+        Returns:
+            dict: Blocks written, raw and stored bytes, and compression ratio
+        """
+        with self._lock:
+            return {
+                'blocks': self._blocks,
+                'rawBytes': self._raw_bytes,
+                'storedBytes': self._stored_bytes,
+                'ratio': round(self._raw_bytes / self._stored_bytes, 2) if self._stored_bytes else None
+            }
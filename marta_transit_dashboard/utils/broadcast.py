@@ -0,0 +1,147 @@
+"""
+Server-Sent Events broadcast utilities for the Simple MARTA App
+
+The EventBroadcaster listens to the SnapshotStore and, whenever a feed
+publishes a new version, serializes the payload once and fans the same
+bytes out to every connected /api/stream client.
+"""
+
+import os
+import queue
+import sys
+import threading
+
+# Add parent directory to import path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import SSE_QUEUE_SIZE
+from utils.encoding import dumps_json
+from utils.snapshots import to_payload
+
+def format_event(event, data, event_id=None):
+    """
+    Encode one SSE message
+
+    Args:
+        event (str): Event name
+        data (bytes): Serialized payload (must not contain newlines)
+        event_id (str, optional): Value for the id: field
+
+    Returns:
+        bytes: Wire-format message
+    """
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    header = ('\n'.join(lines) + '\ndata: ').encode('utf-8')
+    return header + data + b'\n\n'
+
+class EventBroadcaster:
+    """
+    Fan-out of snapshot events to SSE subscribers
+    """
+
+    def __init__(self, epoch=0, max_queue=SSE_QUEUE_SIZE, bodies=None):
+        """
+        Args:
+            epoch (int, optional): Store epoch, used to build event ids
+            max_queue (int, optional): Messages buffered per slow subscriber
+            bodies (BodyCache, optional): Shared cache of encoded feed bodies
+        """
+        self.epoch = epoch
+        self.bodies = bodies
+        self.max_queue = max_queue
+        self._subscribers = set()
+        self._latest = {}
+        self._lock = threading.Lock()
+        self._published = 0
+        self._dropped = 0
+
+    def subscribe(self):
+        """
+        Register a new subscriber
+
+        The queue is pre-filled with the latest event of every feed so new
+        clients can render immediately.
+
+        Returns:
+            queue.Queue: Queue of encoded messages for this subscriber
+        """
+        subscription = queue.Queue(maxsize=self.max_queue)
+        with self._lock:
+            for message in self._latest.values():
+                subscription.put_nowait(message)
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """
+        Remove a subscriber
+
+        Args:
+            subscription (queue.Queue): Queue returned by subscribe()
+        """
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, event, message):
+        """
+        Send an encoded message to every subscriber
+
+        Slow subscribers lose their oldest buffered message rather than
+        blocking the publisher.
+
+        Args:
+            event (str): Event name, used to keep the latest message per event
+            message (bytes): Encoded SSE message
+        """
+        with self._lock:
+            self._latest[event] = message
+            subscribers = list(self._subscribers)
+            self._published += 1
+
+        for subscription in subscribers:
+            try:
+                subscription.put_nowait(message)
+            except queue.Full:
+                try:
+                    subscription.get_nowait()
+                except queue.Empty:
+                    pass
+                try:
+                    subscription.put_nowait(message)
+                except queue.Full:
+                    pass
+                with self._lock:
+                    self._dropped += 1
+
+    def on_publish(self, previous, snapshot):
+        """
+        SnapshotStore listener: push the new snapshot to every subscriber
+
+        Args:
+            previous (Snapshot): Previous snapshot of the feed, or None
+            snapshot (Snapshot): Newly published snapshot
+        """
+        if self.bodies is not None:
+            body = self.bodies.get(snapshot.feed, (snapshot.version,), lambda: to_payload(snapshot.data))
+            data = body.identity
+        else:
+            data = dumps_json(to_payload(snapshot.data))
+        event_id = f"{self.epoch}-{snapshot.version}"
+        self.publish(snapshot.feed, format_event(snapshot.feed, data, event_id))
+
+    def stats(self):
+        """
+        Get subscriber and delivery counters
+
+        Returns:
+            dict: 'subscribers', 'published' and 'dropped' counts
+        """
+        with self._lock:
+            return {
+                'subscribers': len(self._subscribers),
+                'published': self._published,
+                'dropped': self._dropped
+            }
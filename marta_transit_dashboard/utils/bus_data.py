@@ -5,6 +5,9 @@ Bus data utilities for the Simple MARTA App
 import json
 import os
 import sys
+import time
+
+import numpy as np
 
 # Add parent directory to import path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -15,12 +18,14 @@ from config.config import (
     BUS_POSITIONS_CACHE_FILE,
     BUS_TRIPS_CACHE_FILE
 )
+from utils.persistence import cache_writer
+from utils.singleflight import coalesce
+from utils.ingest import FeedSource, fetch_source
+from utils.gtfs_decoder import COORDINATE_PRECISION, decode_header, decode_trip_updates
 
 # Try to import the bus API modules
 try:
     from google.transit import gtfs_realtime_pb2
-    import requests
-    from google.protobuf.json_format import MessageToJson
     
     # Flag indicating that required modules are available
     HAS_GTFS_MODULES = True
@@ -28,6 +33,529 @@ except ImportError:
     print("Warning: GTFS-RT modules not found. Will use cached data for buses.")
     HAS_GTFS_MODULES = False
 
+# Structured row layout for the columnar vehicle position store.
+# String columns hold codes into a per-snapshot StringDictionary (-1 = missing).
+VEHICLE_DTYPE = np.dtype([
+    ('entity', np.int32),
+    ('vehicle', np.int32),
+    ('label', np.int32),
+    ('route', np.int32),
+    ('trip', np.int32),
+    ('stop', np.int32),
+    ('lat', np.float64),        # NaN = no position
+    ('lon', np.float64),        # NaN = no position
+    ('timestamp', np.int64),    # 0 = missing
+    ('bearing', np.float32),    # NaN = missing
+    ('speed', np.float32),      # NaN = missing
+    ('status', np.int8),        # -1 = missing
+    ('occupancy', np.int8)      # -1 = missing
+])
+
+# Dictionary-encoded string columns, in the order used by to_payload()
+STRING_COLUMNS = ('entity', 'vehicle', 'label', 'route', 'trip', 'stop')
+
+# GTFS-RT VehicleStopStatus values, indexed by enum number
+VEHICLE_STOP_STATUSES = ('INCOMING_AT', 'STOPPED_AT', 'IN_TRANSIT_TO')
+_STOP_STATUS_CODES = {name: code for code, name in enumerate(VEHICLE_STOP_STATUSES)}
+
+# GTFS-RT OccupancyStatus values, indexed by enum number
+OCCUPANCY_STATUSES = (
+    'EMPTY',
+    'MANY_SEATS_AVAILABLE',
+    'FEW_SEATS_AVAILABLE',
+    'STANDING_ROOM_ONLY',
+    'CRUSHED_STANDING_ROOM_ONLY',
+    'FULL',
+    'NOT_ACCEPTING_PASSENGERS',
+    'NO_DATA_AVAILABLE',
+    'NOT_BOARDABLE'
+)
+_OCCUPANCY_CODES = {name: code for code, name in enumerate(OCCUPANCY_STATUSES)}
+
+# Vehicle fields that ?fields= can select (the entity id is always included)
+VEHICLE_FIELDS = ('trip', 'vehicle', 'position', 'currentStatus', 'stopId', 'timestamp', 'occupancyStatus')
+
+class StringDictionary:
+    """
+    Dictionary encoding for one string column
+    """
+    __slots__ = ('values', '_codes')
+
+    def __init__(self, values=()):
+        self.values = []
+        self._codes = {}
+        for value in values:
+            self.encode(value)
+
+    def encode(self, value):
+        """
+        Get the code for value, adding it if new
+
+        Args:
+            value (str): Value to encode. Empty/None is stored as missing.
+
+        Returns:
+            int: Code, or -1 for missing
+        """
+        if not value:
+            return -1
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self._codes[value] = code
+            self.values.append(value)
+        return code
+
+    def code_of(self, value):
+        """
+        Look up the code for value without adding it
+
+        Returns:
+            int: Code, or None if value is not in the dictionary
+        """
+        return self._codes.get(value)
+
+    def decode(self, code):
+        """
+        Get the value for a code
+
+        Returns:
+            str: Value, or None for missing
+        """
+        return self.values[code] if code >= 0 else None
+
+    def __len__(self):
+        return len(self.values)
+
+class VehiclePositionColumns:
+    """
+    Columnar snapshot of the GTFS-RT vehicle positions feed
+
+    Rows live in one NumPy structured array, so fleet-wide filters and
+    aggregates are vectorized. The nested entity dicts the frontend expects
+    are only built at the API edge by to_payload().
+    """
+
+    def __init__(self, rows, dictionaries, header=None):
+        """
+        Args:
+            rows (numpy.ndarray): Array with dtype VEHICLE_DTYPE
+            dictionaries (dict): Column name to StringDictionary for STRING_COLUMNS
+            header (dict, optional): Decoded feed header
+        """
+        self.rows = rows
+        self.dictionaries = dictionaries
+        self.header = header or {}
+
+    @classmethod
+    def from_feed(cls, feed):
+        """
+        Fill the columns directly from a parsed FeedMessage
+
+        Args:
+            feed (gtfs_realtime_pb2.FeedMessage): Parsed vehicle positions feed
+
+        Returns:
+            VehiclePositionColumns: Columnar snapshot
+        """
+        dictionaries = {name: StringDictionary() for name in STRING_COLUMNS}
+        encoders = [dictionaries[name].encode for name in STRING_COLUMNS]
+        codes = ([], [], [], [], [], [])
+        lats, lons, timestamps, bearings, speeds, statuses, occupancies = [], [], [], [], [], [], []
+
+        for entity in feed.entity:
+            if not entity.HasField('vehicle'):
+                continue
+            vehicle = entity.vehicle
+            trip = vehicle.trip
+            descriptor = vehicle.vehicle
+            values = (entity.id, descriptor.id, descriptor.label, trip.route_id, trip.trip_id, vehicle.stop_id)
+            for column, encode, value in zip(codes, encoders, values):
+                column.append(encode(value))
+
+            if vehicle.HasField('position'):
+                position = vehicle.position
+                lats.append(position.latitude)
+                lons.append(position.longitude)
+                bearings.append(position.bearing if position.HasField('bearing') else np.nan)
+                speeds.append(position.speed if position.HasField('speed') else np.nan)
+            else:
+                # Kept without coordinates, like the feed reports it
+                lats.append(np.nan)
+                lons.append(np.nan)
+                bearings.append(np.nan)
+                speeds.append(np.nan)
+            timestamps.append(vehicle.timestamp)
+            statuses.append(vehicle.current_status if vehicle.HasField('current_status') else -1)
+            occupancies.append(vehicle.occupancy_status if vehicle.HasField('occupancy_status') else -1)
+
+        rows = np.empty(len(lats), dtype=VEHICLE_DTYPE)
+        for name, column in zip(STRING_COLUMNS, codes):
+            rows[name] = column
+        rows['lat'] = lats
+        rows['lon'] = lons
+        rows['timestamp'] = timestamps
+        rows['bearing'] = bearings
+        rows['speed'] = speeds
+        rows['status'] = statuses
+        rows['occupancy'] = occupancies
+
+        return cls(rows, dictionaries, decode_header(feed))
+
+    @classmethod
+    def from_feed_dict(cls, data):
+        """
+        Build the columns from a decoded feed dict (e.g. the cache file)
+
+        Args:
+            data (dict): {'header': {...}, 'entity': [...]} in GTFS-RT JSON shape
+
+        Returns:
+            VehiclePositionColumns: Columnar snapshot
+        """
+        dictionaries = {name: StringDictionary() for name in STRING_COLUMNS}
+        records = []
+
+        for entity in data.get('entity', []):
+            vehicle = entity.get('vehicle') or {}
+            position = vehicle.get('position') or {}
+            trip = vehicle.get('trip') or {}
+            descriptor = vehicle.get('vehicle') or {}
+            records.append((
+                dictionaries['entity'].encode(entity.get('id')),
+                dictionaries['vehicle'].encode(descriptor.get('id')),
+                dictionaries['label'].encode(descriptor.get('label')),
+                dictionaries['route'].encode(trip.get('routeId')),
+                dictionaries['trip'].encode(trip.get('tripId')),
+                dictionaries['stop'].encode(vehicle.get('stopId')),
+                position.get('latitude', 0.0) if position else np.nan,
+                position.get('longitude', 0.0) if position else np.nan,
+                int(vehicle.get('timestamp', 0)),
+                position.get('bearing', np.nan),
+                position.get('speed', np.nan),
+                _STOP_STATUS_CODES.get(vehicle.get('currentStatus'), -1),
+                _OCCUPANCY_CODES.get(vehicle.get('occupancyStatus'), -1)
+            ))
+
+        rows = np.array(records, dtype=VEHICLE_DTYPE)
+        return cls(rows, dictionaries, dict(data.get('header', {})))
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __eq__(self, other):
+        if not isinstance(other, VehiclePositionColumns):
+            return NotImplemented
+        # Compare raw bytes so NaN bearings and speeds compare equal
+        return (
+            self.header == other.header
+            and self.rows.tobytes() == other.rows.tobytes()
+            and all(self.dictionaries[name].values == other.dictionaries[name].values
+                    for name in STRING_COLUMNS)
+        )
+
+    def column(self, name):
+        """
+        Get a column with string columns decoded
+
+        Args:
+            name (str): Column name from VEHICLE_DTYPE
+
+        Returns:
+            numpy.ndarray: Column values (object array for string columns)
+        """
+        values = self.rows[name]
+        if name in self.dictionaries:
+            lookup = np.array(self.dictionaries[name].values + [None], dtype=object)
+            return lookup[values]
+        return values
+
+    def route_mask(self, route_ids):
+        """
+        Vectorized membership test on the route column
+
+        Args:
+            route_ids (iterable): Route IDs to keep
+
+        Returns:
+            numpy.ndarray: Boolean mask
+        """
+        dictionary = self.dictionaries['route']
+        codes = [dictionary.code_of(route) for route in route_ids]
+        return np.isin(self.rows['route'], [code for code in codes if code is not None])
+
+    def bbox_mask(self, min_lon, min_lat, max_lon, max_lat):
+        """
+        Vectorized bounding-box test
+
+        Returns:
+            numpy.ndarray: Boolean mask of vehicles inside the box
+        """
+        lat, lon = self.rows['lat'], self.rows['lon']
+        return (lon >= min_lon) & (lon <= max_lon) & (lat >= min_lat) & (lat <= max_lat)
+
+    def filter(self, mask=None, routes=None, bbox=None):
+        """
+        Select a subset of vehicles
+
+        Args:
+            mask (numpy.ndarray, optional): Boolean row mask
+            routes (iterable, optional): Route IDs to keep
+            bbox (tuple, optional): (min_lon, min_lat, max_lon, max_lat)
+
+        Returns:
+            VehiclePositionColumns: New snapshot sharing this one's dictionaries
+        """
+        keep = np.ones(len(self.rows), dtype=bool) if mask is None else mask
+        if routes is not None:
+            keep = keep & self.route_mask(routes)
+        if bbox is not None:
+            keep = keep & self.bbox_mask(*bbox)
+        return VehiclePositionColumns(self.rows[keep], self.dictionaries, self.header)
+
+    def take(self, indices):
+        """
+        Select vehicles by row position, in the given order
+
+        Args:
+            indices (numpy.ndarray): Row indices
+
+        Returns:
+            VehiclePositionColumns: New snapshot sharing this one's dictionaries
+        """
+        return VehiclePositionColumns(self.rows[indices], self.dictionaries, self.header)
+
+    def count_by_route(self):
+        """
+        Count vehicles per route
+
+        Returns:
+            dict: Route ID to vehicle count
+        """
+        codes = self.rows['route']
+        counts = np.bincount(codes[codes >= 0], minlength=len(self.dictionaries['route']))
+        route_values = self.dictionaries['route'].values
+        return {route_values[code]: int(n) for code, n in enumerate(counts) if n}
+
+    def occupancy_counts(self):
+        """
+        Count vehicles per occupancy status
+
+        Returns:
+            dict: OccupancyStatus name to vehicle count
+        """
+        codes = self.rows['occupancy']
+        counts = np.bincount(codes[codes >= 0], minlength=len(OCCUPANCY_STATUSES))
+        return {OCCUPANCY_STATUSES[code]: int(n) for code, n in enumerate(counts) if n}
+
+    def stale_mask(self, max_age, now=None):
+        """
+        Vehicles whose last report is older than max_age seconds
+
+        Returns:
+            numpy.ndarray: Boolean mask
+        """
+        now = int(now if now is not None else time.time())
+        timestamps = self.rows['timestamp']
+        return (timestamps > 0) & (now - timestamps > max_age)
+
+    def bounds(self):
+        """
+        Bounding box of all vehicles with a position
+
+        Returns:
+            tuple: (min_lon, min_lat, max_lon, max_lat), or None if none has one
+        """
+        located = self.rows[~np.isnan(self.rows['lat'])]
+        if not len(located):
+            return None
+        lat, lon = located['lat'], located['lon']
+        return (float(lon.min()), float(lat.min()), float(lon.max()), float(lat.max()))
+
+    def entity_ids(self):
+        """
+        Get the entity id of every row
+
+        Returns:
+            numpy.ndarray: Unicode array of ids ('' where missing)
+        """
+        lookup = np.array(self.dictionaries['entity'].values + [''], dtype=str)
+        return lookup[self.rows['entity']]
+
+    def changes_since(self, previous):
+        """
+        Vehicles added, changed or removed since an earlier snapshot
+
+        Rows are matched by entity id and compared column by column (string
+        columns through each snapshot's dictionary), so only the rows that
+        changed are converted to entity dicts.
+
+        Args:
+            previous (VehiclePositionColumns): Earlier snapshot of the feed
+
+        Returns:
+            tuple: (dict of entity id to entity for added or changed
+                vehicles, list of entity ids no longer in the feed)
+        """
+        ids, previous_ids = self.entity_ids(), previous.entity_ids()
+        _, rows, previous_rows = np.intersect1d(ids, previous_ids, return_indices=True)
+
+        changed = np.zeros(len(rows), dtype=bool)
+        for name in VEHICLE_DTYPE.names[1:]:
+            new = self.rows[name][rows]
+            old = previous.rows[name][previous_rows]
+            if name in self.dictionaries:
+                # Map the earlier snapshot's codes into this one's (-2 = value not in it)
+                target = self.dictionaries[name]
+                recode = [target.code_of(value) for value in previous.dictionaries[name].values]
+                lookup = np.array([-2 if code is None else code for code in recode] + [-1], dtype=np.int64)
+                changed |= new != lookup[old]
+            elif new.dtype.kind == 'f':
+                changed |= (new != old) & ~(np.isnan(new) & np.isnan(old))
+            else:
+                changed |= new != old
+
+        upserts = np.union1d(rows[changed], np.flatnonzero(~np.isin(ids, previous_ids)))
+        upserted = {entity['id']: entity for entity in self.take(upserts).to_payload()['entity']}
+        return upserted, np.setdiff1d(previous_ids, ids).tolist()
+
+    def to_payload(self, fields=None):
+        """
+        Convert to the GTFS-RT JSON shape served by /api/buses/positions
+
+        Args:
+            fields (iterable, optional): VEHICLE_FIELDS to include in each
+                entity's vehicle. Defaults to all of them.
+
+        Returns:
+            dict: {'header': {...}, 'entity': [...]}
+        """
+        wanted = frozenset(VEHICLE_FIELDS if fields is None else fields)
+        with_trip = 'trip' in wanted
+        with_descriptor = 'vehicle' in wanted
+        with_position = 'position' in wanted
+        with_status = 'currentStatus' in wanted
+        with_stop = 'stopId' in wanted
+        with_timestamp = 'timestamp' in wanted
+        with_occupancy = 'occupancyStatus' in wanted
+
+        decoded = [self.dictionaries[name].values for name in STRING_COLUMNS]
+        entities = []
+        append = entities.append
+
+        for row in self.rows.tolist():
+            (entity_code, vehicle_code, label_code, route_code, trip_code, stop_code,
+             lat, lon, timestamp, bearing, speed, status, occupancy) = row
+            vehicle = {}
+
+            if with_trip:
+                trip = {}
+                if trip_code >= 0:
+                    trip['tripId'] = decoded[4][trip_code]
+                if route_code >= 0:
+                    trip['routeId'] = decoded[3][route_code]
+                if trip:
+                    vehicle['trip'] = trip
+
+            if with_descriptor:
+                descriptor = {}
+                if vehicle_code >= 0:
+                    descriptor['id'] = decoded[1][vehicle_code]
+                if label_code >= 0:
+                    descriptor['label'] = decoded[2][label_code]
+                if descriptor:
+                    vehicle['vehicle'] = descriptor
+
+            if with_position and lat == lat:  # not NaN
+                position = {'latitude': round(lat, COORDINATE_PRECISION), 'longitude': round(lon, COORDINATE_PRECISION)}
+                if bearing == bearing:  # not NaN
+                    position['bearing'] = round(bearing, 1)
+                if speed == speed:
+                    position['speed'] = round(speed, 2)
+                vehicle['position'] = position
+
+            if with_status and status >= 0:
+                vehicle['currentStatus'] = VEHICLE_STOP_STATUSES[status]
+            if with_stop and stop_code >= 0:
+                vehicle['stopId'] = decoded[5][stop_code]
+            if with_timestamp and timestamp:
+                vehicle['timestamp'] = str(timestamp)
+            if with_occupancy and occupancy >= 0:
+                vehicle['occupancyStatus'] = OCCUPANCY_STATUSES[occupancy]
+
+            append({'id': decoded[0][entity_code] if entity_code >= 0 else '', 'vehicle': vehicle})
+
+        return {'header': dict(self.header), 'entity': entities}
+
+def parse_vehicle_positions(content):
+    """
+    Parse a VehiclePositions response body into a columnar snapshot and cache it
+    
+    Args:
+        content (bytes): GTFS-RT protobuf response body
+        
+    Returns:
+        VehiclePositionColumns: Bus position data
+        
+    Raises:
+        ValueError: If the feed is empty
+    """
+    feed = gtfs_realtime_pb2.FeedMessage()
+    feed.ParseFromString(content)
+    if not feed.ListFields():
+        raise ValueError('empty vehicle positions feed')
+    
+    columns = VehiclePositionColumns.from_feed(feed)
+    
+    # Cache the data for future use
+    cache_writer.submit(BUS_POSITIONS_CACHE_FILE, columns.to_payload)
+    
+    return columns
+
+@coalesce('bus_positions')
+def get_bus_position_columns():
+    """
+    Get real-time bus positions from MARTA GTFS-RT API as a columnar snapshot
+    
+    Returns:
+        VehiclePositionColumns: Bus position data
+    """
+    return fetch_source(BUS_POSITIONS_SOURCE)
+
+def get_bus_position_columns_fallback():
+    """
+    Return cached bus position data as a columnar snapshot
+    
+    Returns:
+        VehiclePositionColumns: Bus position data from cache (may be empty)
+    """
+    return VehiclePositionColumns.from_feed_dict(get_bus_positions_fallback())
+
+def feed_timestamp(data):
+    """
+    When a GTFS-RT feed was produced: its header timestamp
+    
+    Args:
+        data (VehiclePositionColumns or TripUpdateIndex): Bus snapshot
+        
+    Returns:
+        float: Unix seconds, or None if the header has no timestamp
+    """
+    try:
+        return float(data.header['timestamp'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+# How the poller and get_bus_position_columns obtain the positions feed
+BUS_POSITIONS_SOURCE = FeedSource(
+    'bus_positions',
+    get_bus_position_columns_fallback,
+    url=MARTA_BUS_POSITIONS_URL,
+    parse=parse_vehicle_positions,
+    available=HAS_GTFS_MODULES,
+    timestamp=feed_timestamp
+)
+
 def get_bus_positions():
     """
     Get real-time bus position data from MARTA GTFS-RT API
@@ -35,35 +563,7 @@ def get_bus_positions():
     Returns:
         dict: Bus position data
     """
-    try:
-        # Try to use the real API if available
-        if HAS_GTFS_MODULES:
-            print("Fetching live bus position data...")
-            feed = gtfs_realtime_pb2.FeedMessage()
-            response = requests.get(MARTA_BUS_POSITIONS_URL)
-            feed.ParseFromString(response.content)
-            
-            # Convert protobuf to JSON
-            json_data = MessageToJson(feed)
-            bus_data = json.loads(json_data)
-            
-            if bus_data:
-                # Cache the data for future use
-                os.makedirs(os.path.dirname(BUS_POSITIONS_CACHE_FILE), exist_ok=True)
-                with open(BUS_POSITIONS_CACHE_FILE, 'w') as f:
-                    json.dump(bus_data, f)
-                    
-                return bus_data
-            else:
-                print("Failed to get live bus data, falling back to cache")
-        else:
-            print("Bus API modules not available, using cached data")
-            
-        # Fall back to cached data
-        return get_bus_positions_fallback()
-    except Exception as e:
-        print(f"Error getting bus positions: {e}")
-        return get_bus_positions_fallback()
+    return get_bus_position_columns().to_payload()
 
 def get_bus_positions_fallback():
     """
@@ -82,6 +582,197 @@ def get_bus_positions_fallback():
     # Return empty data structure if no data available
     return {"entity": []}
 
+class TripUpdateIndex:
+    """
+    Snapshot of the GTFS-RT trip updates feed with hash indexes
+
+    The indexes are built once when the snapshot is ingested, so looking
+    up the trips of a route, one trip, or the departures at a stop costs
+    time proportional to the result rather than to the whole feed.
+    """
+
+    def __init__(self, data):
+        """
+        Args:
+            data (dict): {'header': {...}, 'entity': [...]} in GTFS-RT JSON shape
+        """
+        self.raw = data
+        self.header = data.get('header', {})
+        self.entities = data.get('entity', [])
+
+        by_route = {}
+        by_trip = {}
+        by_stop = {}
+        for position, entity in enumerate(self.entities):
+            update = entity.get('tripUpdate') or {}
+            trip = update.get('trip') or {}
+            route_id = trip.get('routeId')
+            if route_id:
+                by_route.setdefault(route_id, []).append(position)
+            trip_id = trip.get('tripId')
+            if trip_id:
+                by_trip[trip_id] = position
+            for stop_position, stop in enumerate(update.get('stopTimeUpdate', ())):
+                stop_id = stop.get('stopId')
+                if stop_id:
+                    by_stop.setdefault(stop_id, []).append(
+                        (_stop_event_time(stop), position, stop_position)
+                    )
+
+        # Departures at each stop in predicted time order (unknown times last)
+        for departures in by_stop.values():
+            departures.sort(key=lambda departure: (departure[0] is None, departure[0] or 0))
+
+        self.by_route = by_route
+        self.by_trip = by_trip
+        self.by_stop = by_stop
+
+    def __len__(self):
+        return len(self.entities)
+
+    def __eq__(self, other):
+        if not isinstance(other, TripUpdateIndex):
+            return NotImplemented
+        return self.raw == other.raw
+
+    def route_trips(self, route_ids):
+        """
+        Trip update entities of one or more routes
+
+        Args:
+            route_ids (iterable): Route IDs
+
+        Returns:
+            list: Entities in feed order
+        """
+        positions = []
+        for route_id in route_ids:
+            positions.extend(self.by_route.get(route_id, ()))
+        return [self.entities[position] for position in sorted(set(positions))]
+
+    def trip(self, trip_id):
+        """
+        Trip update entity of one trip
+
+        Args:
+            trip_id (str): Trip ID
+
+        Returns:
+            dict: Entity, or None if the trip is not in the feed
+        """
+        position = self.by_trip.get(trip_id)
+        return self.entities[position] if position is not None else None
+
+    def departures(self, stop_id, limit=None):
+        """
+        Predicted departures at a stop, soonest first
+
+        Stop times before the feed's own timestamp have already passed and
+        are skipped.
+
+        Args:
+            stop_id (str): Stop ID
+            limit (int, optional): Maximum number of departures
+
+        Returns:
+            list: {'tripId', 'routeId', 'vehicle', 'stopSequence', 'time',
+                'delay', 'arrival', 'departure'} per departure
+        """
+        feed_time = int(self.header.get('timestamp') or 0)
+        results = []
+        for event_time, position, stop_position in self.by_stop.get(stop_id, ()):
+            if event_time is not None and event_time < feed_time:
+                continue
+            update = self.entities[position]['tripUpdate']
+            stop = update['stopTimeUpdate'][stop_position]
+            trip = update.get('trip') or {}
+            event = stop.get('departure') or stop.get('arrival') or {}
+            results.append({
+                'tripId': trip.get('tripId'),
+                'routeId': trip.get('routeId'),
+                'vehicle': (update.get('vehicle') or {}).get('id'),
+                'stopSequence': stop.get('stopSequence'),
+                'time': event_time,
+                'delay': event.get('delay', update.get('delay')),
+                'arrival': stop.get('arrival'),
+                'departure': stop.get('departure')
+            })
+            if limit is not None and len(results) >= limit:
+                break
+        return results
+
+    def to_payload(self):
+        """
+        Get the feed in the GTFS-RT JSON shape served by /api/buses/trips
+
+        Returns:
+            dict: The decoded feed this index was built from
+        """
+        return self.raw
+
+def _stop_event_time(stop):
+    """Predicted departure (else arrival) time of a stop time update, Unix seconds"""
+    event = stop.get('departure') or stop.get('arrival') or {}
+    try:
+        return int(event['time'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def parse_trip_updates(content):
+    """
+    Parse a TripUpdates response body into an indexed snapshot and cache it
+    
+    Args:
+        content (bytes): GTFS-RT protobuf response body
+        
+    Returns:
+        TripUpdateIndex: Bus trip update data
+        
+    Raises:
+        ValueError: If the feed is empty
+    """
+    feed = gtfs_realtime_pb2.FeedMessage()
+    feed.ParseFromString(content)
+    
+    # Decode only the fields the dashboard uses
+    trip_data = decode_trip_updates(feed) if feed.ListFields() else {}
+    if not trip_data:
+        raise ValueError('empty trip updates feed')
+    
+    # Cache the data for future use
+    cache_writer.submit(BUS_TRIPS_CACHE_FILE, trip_data)
+    
+    return TripUpdateIndex(trip_data)
+
+@coalesce('bus_trips')
+def get_bus_trip_index():
+    """
+    Get real-time bus trip updates from MARTA GTFS-RT API, indexed
+    
+    Returns:
+        TripUpdateIndex: Bus trip update data
+    """
+    return fetch_source(BUS_TRIPS_SOURCE)
+
+def get_bus_trip_index_fallback():
+    """
+    Return cached bus trip data as an indexed snapshot
+    
+    Returns:
+        TripUpdateIndex: Bus trip data from cache (may be empty)
+    """
+    return TripUpdateIndex(get_bus_trips_fallback())
+
+# How the poller and get_bus_trip_index obtain the trip updates feed
+BUS_TRIPS_SOURCE = FeedSource(
+    'bus_trips',
+    get_bus_trip_index_fallback,
+    url=MARTA_BUS_TRIPS_URL,
+    parse=parse_trip_updates,
+    available=HAS_GTFS_MODULES,
+    timestamp=feed_timestamp
+)
+
 def get_bus_trips():
     """
     Get real-time bus trip updates from MARTA GTFS-RT API
@@ -89,35 +780,7 @@ def get_bus_trips():
     Returns:
         dict: Bus trip update data
     """
-    try:
-        # Try to use the real API if available
-        if HAS_GTFS_MODULES:
-            print("Fetching live bus trip data...")
-            feed = gtfs_realtime_pb2.FeedMessage()
-            response = requests.get(MARTA_BUS_TRIPS_URL)
-            feed.ParseFromString(response.content)
-            
-            # Convert protobuf to JSON
-            json_data = MessageToJson(feed)
-            trip_data = json.loads(json_data)
-            
-            if trip_data:
-                # Cache the data for future use
-                os.makedirs(os.path.dirname(BUS_TRIPS_CACHE_FILE), exist_ok=True)
-                with open(BUS_TRIPS_CACHE_FILE, 'w') as f:
-                    json.dump(trip_data, f)
-                    
-                return trip_data
-            else:
-                print("Failed to get live trip data, falling back to cache")
-        else:
-            print("Trip updates API modules not available, using cached data")
-            
-        # Fall back to cached data
-        return get_bus_trips_fallback()
-    except Exception as e:
-        print(f"Error getting bus trip updates: {e}")
-        return get_bus_trips_fallback()
+    return get_bus_trip_index().to_payload()
 
 def get_bus_trips_fallback():
     """
@@ -136,19 +799,15 @@ def get_bus_trips_fallback():
     # Return empty data structure if no data available
     return {"entity": []}
 
-def get_bus_status():
+def get_bus_status(performance):
     """
     Calculate the status of MARTA bus system
     
+    Args:
+        performance (BusPerformance): Tracker fed by the snapshot store
+        
     Returns:
-        dict: Status information for buses
+        dict: On-time performance over the rolling window, system-wide and
+            per route (see BusPerformance.status)
     """
-    # For now, return a simple static status
-    # In a more complete implementation, we would analyze trip data
-    # to calculate actual on-time percentages
-    
-    return {
-        'status': 'On Time',
-        'percentage': 95,
-        'details': '95% of routes operating normally'
-    } 
\ No newline at end of file
+    return performance.status()
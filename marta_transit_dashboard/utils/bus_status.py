@@ -0,0 +1,292 @@
+"""
+Bus on-time performance utilities for the Simple MARTA App
+
+Classifies every trip in the TripUpdates feed as early, on time or late
+from its predicted delay and keeps per-route counts of the current
+classifications. Fed by the feed's DeltaLog, each new snapshot only
+re-classifies the trips that were added, changed or removed. The counts
+are sampled into fixed time
+buckets, and running sums over the buckets inside the rolling window give
+the on-time percentages served by /api/status without rescanning anything.
+"""
+
+import os
+import sys
+import threading
+from collections import deque
+
+# Add parent directory to import path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import (
+    BUS_EARLY_THRESHOLD,
+    BUS_LATE_THRESHOLD,
+    BUS_PERFORMANCE_BUCKET,
+    BUS_PERFORMANCE_WINDOW,
+    BUS_MINOR_DELAY_PERCENT,
+    BUS_MAJOR_DELAY_PERCENT
+)
+from utils.snapshots import to_payload
+
+# Classification index into each [early, on time, late] counter
+EARLY, ON_TIME, LATE = 0, 1, 2
+
+def trip_delay(update, feed_time=0):
+    """
+    Current delay of a trip in seconds
+
+    Uses the trip-level delay when the feed has one, otherwise the delay
+    predicted for the next stop that has not been passed yet. A stop's
+    arrival delay and time are preferred, each falling back to the
+    departure's.
+
+    Args:
+        update (dict): tripUpdate record
+        feed_time (int, optional): Feed header timestamp, Unix seconds
+
+    Returns:
+        int: Delay in seconds (negative = early), or None if unknown
+    """
+    if update.get('delay') is not None:
+        return update['delay']
+
+    fallback = None
+    for stop in update.get('stopTimeUpdate', ()):
+        arrival = stop.get('arrival') or {}
+        departure = stop.get('departure') or {}
+        delay = arrival.get('delay')
+        if delay is None:
+            delay = departure.get('delay')
+        if delay is None:
+            continue
+        if fallback is None:
+            fallback = delay
+        try:
+            if int(arrival.get('time') or departure.get('time') or 0) >= feed_time:
+                return delay
+        except (TypeError, ValueError):
+            continue
+    return fallback
+
+def classify_delay(delay, early=BUS_EARLY_THRESHOLD, late=BUS_LATE_THRESHOLD):
+    """
+    Classify a delay as early, on time or late
+
+    Args:
+        delay (int): Delay in seconds (negative = early)
+        early (int, optional): Seconds ahead of schedule that count as early
+        late (int, optional): Seconds behind schedule that count as late
+
+    Returns:
+        int: EARLY, ON_TIME or LATE
+    """
+    if delay < -early:
+        return EARLY
+    if delay > late:
+        return LATE
+    return ON_TIME
+
+def _percentages(counts):
+    total = sum(counts)
+    if not total:
+        return None
+    return [round(100 * count / total, 1) for count in counts]
+
+class BusPerformance:
+    """
+    Incremental, rolling-window bus on-time performance per route
+    """
+
+    def __init__(self, feed='bus_trips', window=BUS_PERFORMANCE_WINDOW, bucket=BUS_PERFORMANCE_BUCKET):
+        """
+        Args:
+            feed (str, optional): Trip updates feed to track
+            window (int, optional): Rolling window in seconds
+            bucket (int, optional): Seconds per sample bucket
+        """
+        self.feed = feed
+        self.window = window
+        self.bucket = bucket
+        self._version = None
+        self._trips = {}
+        self._current = {}
+        self._buckets = deque()
+        self._totals = {}
+        self._status = self._build_status()
+        self.generation = 0
+        self._lock = threading.RLock()
+
+    def on_diff(self, snapshot, diff):
+        """
+        DeltaLog listener: fold every fetched trip updates snapshot in
+
+        Only the trips in the diff are re-classified. Without a diff that
+        starts at the last version applied here (the first live snapshot,
+        or after a missed version) the whole snapshot is classified.
+
+        Args:
+            snapshot (Snapshot): Newly published snapshot
+            diff (Diff): Entities changed since the previous version, or None
+        """
+        if snapshot.feed != self.feed:
+            return
+        if snapshot.primed:
+            # Primed from the cache file: not a current observation
+            return
+        data = to_payload(snapshot.data)
+        feed_time = int(data.get('header', {}).get('timestamp') or 0)
+        with self._lock:
+            if diff is not None and diff.from_version == self._version:
+                self.apply(diff.upserted, diff.removed, feed_time, snapshot.fetched_at)
+            else:
+                self.update(data, snapshot.fetched_at)
+            self._version = snapshot.version
+
+    def update(self, data, timestamp):
+        """
+        Classify a whole trip updates snapshot
+
+        Args:
+            data (dict): Trip updates feed in GTFS-RT JSON shape
+            timestamp (float): Fetch time, Unix seconds
+
+        Returns:
+            int: Number of trips classified
+        """
+        feed_time = int(data.get('header', {}).get('timestamp') or 0)
+        entities = {entity.get('id'): entity for entity in data.get('entity', [])}
+        with self._lock:
+            self._trips = {}
+            self._current = {}
+            return self.apply(entities, (), feed_time, timestamp)
+
+    def apply(self, upserted, removed, feed_time, timestamp):
+        """
+        Re-classify the trips that changed since the last snapshot
+
+        Args:
+            upserted (dict): Entity id to trip update entity, for trips
+                added or changed
+            removed (iterable): Entity ids of trips no longer in the feed
+            feed_time (int): Feed header timestamp, Unix seconds
+            timestamp (float): Fetch time, Unix seconds
+
+        Returns:
+            int: Number of trips re-classified
+        """
+        with self._lock:
+            for entity_id in removed:
+                self._forget(entity_id)
+            for entity_id, entity in upserted.items():
+                self._forget(entity_id)
+                update = entity.get('tripUpdate') or {}
+                delay = trip_delay(update, feed_time)
+                if delay is None:
+                    continue
+                route = (update.get('trip') or {}).get('routeId') or ''
+                category = classify_delay(delay)
+                self._trips[entity_id] = (route, category)
+                self._current.setdefault(route, [0, 0, 0])[category] += 1
+
+            self._sample(timestamp)
+            self._status = self._build_status()
+            self.generation += 1
+        return len(upserted) + len(removed)
+
+    def _forget(self, entity_id):
+        """Remove a trip's classification from the current counts"""
+        trip = self._trips.pop(entity_id, None)
+        if trip is None:
+            return
+        route, category = trip
+        counts = self._current[route]
+        counts[category] -= 1
+        if not any(counts):
+            del self._current[route]
+
+    def _sample(self, timestamp):
+        """Record the current counts in the bucket for timestamp and expire old buckets"""
+        key = int(timestamp // self.bucket)
+        if self._buckets and self._buckets[-1][0] == key:
+            # One sample per bucket: the latest snapshot replaces earlier ones
+            self._add(self._buckets.pop()[1], -1)
+        sample = {route: list(counts) for route, counts in self._current.items()}
+        self._buckets.append((key, sample))
+        self._add(sample, 1)
+
+        oldest = key - self.window // self.bucket
+        while self._buckets and self._buckets[0][0] <= oldest:
+            self._add(self._buckets.popleft()[1], -1)
+
+    def _add(self, sample, sign):
+        """Add (or subtract) one sample to the window totals"""
+        totals = self._totals
+        for route, counts in sample.items():
+            total = totals.setdefault(route, [0, 0, 0])
+            for category in (EARLY, ON_TIME, LATE):
+                total[category] += sign * counts[category]
+            if not any(total):
+                del totals[route]
+
+    def _build_status(self):
+        """Derive the status view from the window totals"""
+        system = [sum(counts[category] for counts in self._totals.values()) for category in (EARLY, ON_TIME, LATE)]
+        percentages = _percentages(system)
+        if percentages is None:
+            return {
+                'status': 'No Data',
+                'percentage': None,
+                'details': 'No bus trip predictions available',
+                'onTime': None,
+                'early': None,
+                'late': None,
+                'trips': 0,
+                'window': self.window,
+                'routes': []
+            }
+
+        early, on_time, late = percentages
+        if on_time >= BUS_MINOR_DELAY_PERCENT:
+            status = 'On Time'
+        elif on_time >= BUS_MAJOR_DELAY_PERCENT:
+            status = 'Minor Delays'
+        else:
+            status = 'Major Delays'
+
+        routes = []
+        for route in sorted(self._totals):
+            route_early, route_on_time, route_late = _percentages(self._totals[route])
+            current = self._current.get(route)
+            routes.append({
+                'route': route,
+                'onTime': route_on_time,
+                'early': route_early,
+                'late': route_late,
+                'trips': sum(current) if current else 0
+            })
+
+        return {
+            'status': status,
+            'percentage': round(on_time),
+            'details': f"{round(on_time)}% of trips on time ({round(late)}% late, {round(early)}% early)",
+            'onTime': on_time,
+            'early': early,
+            'late': late,
+            'trips': len(self._trips),
+            'window': self.window,
+            'routes': routes
+        }
+
+    def status(self):
+        """
+        Get the current on-time performance
+
+        Views built from it are keyed by ``generation``, which moves
+        forward every time the status is rebuilt.
+
+        Returns:
+            dict: 'status', 'percentage', 'details', system-wide 'onTime',
+                'early' and 'late' percentages over the rolling window,
+                current 'trips' and the same figures per route under 'routes'
+        """
+        return self._status
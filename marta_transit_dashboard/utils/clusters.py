@@ -0,0 +1,259 @@
+"""
+Vehicle clustering utilities for the Simple MARTA App
+
+Bus positions are grouped into map-pixel grid cells for every zoom level
+from 0 to CLUSTER_MAX_ZOOM, once per positions snapshot. Cells are laid
+out in Web Mercator pixel space like map tiles, so each cell at zoom z
+is exactly four cells at zoom z + 1: the finest level is aggregated from
+the vehicles, and every coarser level from the level below it.
+"""
+
+import math
+import os
+import sys
+import threading
+
+import numpy as np
+
+# Add parent directory to import path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import CLUSTER_CELL_PIXELS, CLUSTER_MAX_ZOOM, CLUSTER_ROUTE_MIX
+from utils.gtfs_decoder import COORDINATE_PRECISION
+
+# Map tiles are 256 pixels square
+TILE_SIZE = 256
+
+# Web Mercator is undefined at the poles
+MAX_LATITUDE = 85.05112878
+
+# Cells are keyed by one int64: pixel-grid column in the high 32 bits, row in the low
+CELL_ROW_MASK = (1 << 32) - 1
+
+def mercator_pixels(lat, lon, zoom):
+    """
+    Project coordinates to Web Mercator pixels at a zoom level
+
+    Args:
+        lat (numpy.ndarray): Latitudes
+        lon (numpy.ndarray): Longitudes
+        zoom (int): Zoom level
+
+    Returns:
+        tuple: (x, y) pixel arrays
+    """
+    scale = TILE_SIZE * 2 ** zoom
+    sin_lat = np.sin(np.radians(np.clip(lat, -MAX_LATITUDE, MAX_LATITUDE)))
+    x = (lon + 180) / 360 * scale
+    y = (0.5 - np.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)) * scale
+    return x, y
+
+class _Level:
+    """
+    Clusters of one zoom level, as parallel arrays
+    """
+    __slots__ = ('cells', 'count', 'lat_sum', 'lon_sum', 'route_cluster', 'route', 'route_count', 'route_start')
+
+    def __init__(self, cells, count, lat_sum, lon_sum, route_cluster, route, route_count):
+        self.cells = cells
+        self.count = count
+        self.lat_sum = lat_sum
+        self.lon_sum = lon_sum
+        # Route mix rows, ordered by cluster then by vehicle count (largest first)
+        order = np.lexsort((route, -route_count, route_cluster))
+        self.route_cluster = route_cluster[order]
+        self.route = route[order]
+        self.route_count = route_count[order]
+        self.route_start = np.searchsorted(self.route_cluster, np.arange(len(cells) + 1))
+
+    def parent(self):
+        """
+        Aggregate this level into the next coarser one
+
+        Returns:
+            _Level: Level for zoom - 1
+        """
+        parents = ((self.cells >> 33) << 32) | ((self.cells & CELL_ROW_MASK) >> 1)
+        cells, inverse = np.unique(parents, return_inverse=True)
+        size = len(cells)
+        route_cluster, route, route_count = _sum_pairs(inverse[self.route_cluster], self.route, self.route_count)
+        return _Level(
+            cells,
+            np.bincount(inverse, weights=self.count, minlength=size).astype(np.int64),
+            np.bincount(inverse, weights=self.lat_sum, minlength=size),
+            np.bincount(inverse, weights=self.lon_sum, minlength=size),
+            route_cluster, route, route_count
+        )
+
+def _sum_pairs(cluster, route, count):
+    """
+    Sum vehicle counts per (cluster, route) pair
+
+    Returns:
+        tuple: (cluster, route, count) arrays with one row per distinct pair
+    """
+    if not len(cluster):
+        return cluster, route, count
+    stride = int(route.max()) + 1
+    pairs, inverse = np.unique(cluster * stride + route, return_inverse=True)
+    totals = np.bincount(inverse, weights=count, minlength=len(pairs)).astype(np.int64)
+    return pairs // stride, pairs % stride, totals
+
+def build_levels(columns, max_zoom=CLUSTER_MAX_ZOOM, cell_pixels=CLUSTER_CELL_PIXELS):
+    """
+    Build the cluster levels of one positions snapshot
+
+    Args:
+        columns (VehiclePositionColumns): Positions snapshot
+        max_zoom (int, optional): Finest zoom level
+        cell_pixels (int, optional): Cell edge in screen pixels (a power of two)
+
+    Returns:
+        list: _Level per zoom level, index = zoom
+    """
+    rows = columns.rows
+    rows = rows[np.isfinite(rows['lat']) & np.isfinite(rows['lon'])]
+    lat, lon = rows['lat'], rows['lon']
+    x, y = mercator_pixels(lat, lon, max_zoom)
+    cells = ((x // cell_pixels).astype(np.int64) << 32) | (y // cell_pixels).astype(np.int64)
+
+    cells, inverse = np.unique(cells, return_inverse=True)
+    size = len(cells)
+    routes = rows['route'].astype(np.int64)
+    known = routes >= 0
+    route_cluster, route, route_count = _sum_pairs(
+        inverse[known], routes[known], np.ones(int(known.sum()), dtype=np.int64)
+    )
+    level = _Level(
+        cells,
+        np.bincount(inverse, minlength=size).astype(np.int64),
+        np.bincount(inverse, weights=lat, minlength=size),
+        np.bincount(inverse, weights=lon, minlength=size),
+        route_cluster, route, route_count
+    )
+
+    levels = [level]
+    for _ in range(max_zoom):
+        level = level.parent()
+        levels.append(level)
+    levels.reverse()
+    return levels
+
+class ClusterIndex:
+    """
+    Per-zoom vehicle clusters, rebuilt once per positions snapshot
+    """
+
+    def __init__(self, feed='bus_positions', max_zoom=CLUSTER_MAX_ZOOM,
+                 cell_pixels=CLUSTER_CELL_PIXELS, route_mix=CLUSTER_ROUTE_MIX):
+        """
+        Args:
+            feed (str, optional): Feed to cluster
+            max_zoom (int, optional): Finest zoom level
+            cell_pixels (int, optional): Cell edge in screen pixels
+            route_mix (int, optional): Routes listed per cluster
+        """
+        self.feed = feed
+        self.max_zoom = max_zoom
+        self.cell_pixels = cell_pixels
+        self.route_mix = route_mix
+        self.columns = None
+        self.version = None
+        self._levels = None
+        self._lock = threading.Lock()
+        self._builds = 0
+
+    def update(self, columns, version=None):
+        """
+        Rebuild every level from a new positions snapshot
+
+        Args:
+            columns (VehiclePositionColumns): New snapshot
+            version (int, optional): Snapshot version being indexed
+        """
+        levels = build_levels(columns, self.max_zoom, self.cell_pixels)
+        with self._lock:
+            self.columns = columns
+            self.version = version
+            self._levels = levels
+            self._builds += 1
+
+    def on_publish(self, previous, snapshot):
+        """
+        SnapshotStore listener: cluster every new positions snapshot
+
+        Args:
+            previous (Snapshot): Previous snapshot of the feed, or None
+            snapshot (Snapshot): Newly published snapshot
+        """
+        if snapshot.feed == self.feed:
+            self.update(snapshot.data, snapshot.version)
+
+    def clusters(self, columns, zoom, bbox=None):
+        """
+        Clusters of a snapshot at a zoom level
+
+        Uses the prebuilt levels when columns is the indexed snapshot;
+        any other snapshot is clustered on the spot.
+
+        Args:
+            columns (VehiclePositionColumns): Snapshot to cluster
+            zoom (int): Zoom level (clamped to 0..max_zoom)
+            bbox (tuple, optional): (min_lon, min_lat, max_lon, max_lat);
+                only clusters whose centroid is inside are returned
+
+        Returns:
+            list: {'lat', 'lon', 'count', 'routes': [{'route', 'count'}]}
+                per cluster, largest first
+        """
+        zoom = min(max(int(zoom), 0), self.max_zoom)
+        with self._lock:
+            levels = self._levels if columns is self.columns else None
+        if levels is None:
+            levels = build_levels(columns, self.max_zoom, self.cell_pixels)
+        level = levels[zoom]
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            lat = level.lat_sum / level.count
+            lon = level.lon_sum / level.count
+        selected = np.arange(len(level.count))
+        if bbox is not None:
+            min_lon, min_lat, max_lon, max_lat = bbox
+            selected = np.flatnonzero((lon >= min_lon) & (lon <= max_lon) & (lat >= min_lat) & (lat <= max_lat))
+        selected = selected[np.argsort(-level.count[selected], kind='stable')]
+
+        route_values = columns.dictionaries['route'].values
+        starts = level.route_start.tolist()
+        routes = level.route.tolist()
+        route_counts = level.route_count.tolist()
+        result = []
+        for i, cluster_lat, cluster_lon, count in zip(
+            selected.tolist(), lat[selected].tolist(), lon[selected].tolist(), level.count[selected].tolist()
+        ):
+            first = starts[i]
+            last = min(starts[i + 1], first + self.route_mix)
+            result.append({
+                'lat': round(cluster_lat, COORDINATE_PRECISION),
+                'lon': round(cluster_lon, COORDINATE_PRECISION),
+                'count': count,
+                'routes': [
+                    {'route': route_values[routes[j]], 'count': route_counts[j]}
+                    for j in range(first, last)
+                ]
+            })
+        return result
+
+    def stats(self):
+        """
+        Get index counters
+
+        Returns:
+            dict: Rebuilds, indexed version and clusters per zoom level
+        """
+        with self._lock:
+            levels = self._levels or []
+            return {
+                'builds': self._builds,
+                'version': self.version,
+                'clusters': [len(level.count) for level in levels]
+            }
@@ -0,0 +1,289 @@
+"""
+Rolling train delay trend utilities for the Simple MARTA App
+
+Every fetched rail poll is reduced, in one vectorized pass, to per line
+and direction sums: arrivals, delay, squared delay, late arrivals and
+their absolute delay. The sums go into fixed time buckets, and each
+rolling window (5, 15 and 60 minutes by default) keeps running totals
+that are only ever adjusted by the bucket entering and the buckets
+leaving it. Memory is bounded by the longest window, and the trend view
+served by /api/status is rebuilt once per poll instead of per request.
+"""
+
+import math
+import os
+import sys
+import threading
+from collections import deque
+
+import numpy as np
+
+# Add parent directory to import path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import (
+    DELAY_AFFECTED_THRESHOLD,
+    DELAY_TREND_BUCKET,
+    DELAY_TREND_THRESHOLD,
+    DELAY_TREND_WINDOWS
+)
+from utils.train_data import as_arrival_batch
+from utils.train_status import describe_affected_lines
+
+# Columns of each per-group sum row
+COUNT, DELAY_SUM, DELAY_SQUARES, LATE_COUNT, LATE_SUM = range(5)
+SUM_COLUMNS = 5
+
+def poll_sums(columns, threshold=DELAY_AFFECTED_THRESHOLD):
+    """
+    Reduce one rail poll to delay sums per line and direction
+
+    Args:
+        columns (DelayColumns): Parsed rail poll
+        threshold (float, optional): Seconds of delay (either way) that
+            count an arrival as late
+
+    Returns:
+        numpy.ndarray: One row per group in columns.groups, with the
+            COUNT, DELAY_SUM, DELAY_SQUARES, LATE_COUNT and LATE_SUM columns
+    """
+    size = len(columns.groups)
+    valid = ~np.isnan(columns.delay)
+    codes, delay = columns.codes[valid], columns.delay[valid]
+    late = np.abs(delay) > threshold
+
+    sums = np.empty((size, SUM_COLUMNS))
+    sums[:, COUNT] = np.bincount(codes, minlength=size)
+    sums[:, DELAY_SUM] = np.bincount(codes, weights=delay, minlength=size)
+    sums[:, DELAY_SQUARES] = np.bincount(codes, weights=delay * delay, minlength=size)
+    sums[:, LATE_COUNT] = np.bincount(codes[late], minlength=size)
+    sums[:, LATE_SUM] = np.bincount(codes[late], weights=np.abs(delay[late]), minlength=size)
+    return sums
+
+def window_label(seconds):
+    """
+    Label of a rolling window, e.g. '15m'
+
+    Args:
+        seconds (int): Window length
+
+    Returns:
+        str: Whole minutes with an 'm' suffix
+    """
+    return f"{seconds // 60}m"
+
+class _Window:
+    """
+    Running totals over the buckets of one rolling window
+    """
+    __slots__ = ('seconds', 'buckets', 'totals')
+
+    def __init__(self, seconds, groups):
+        self.seconds = seconds
+        self.buckets = deque()
+        self.totals = np.zeros((groups, SUM_COLUMNS))
+
+    def add(self, bucket):
+        self.buckets.append(bucket)
+        self._apply(bucket, 1)
+
+    def expire(self, oldest):
+        """Drop the buckets keyed at or before oldest"""
+        while self.buckets and self.buckets[0][0] <= oldest:
+            self._apply(self.buckets.popleft(), -1)
+
+    def _apply(self, bucket, sign):
+        _, groups, sums = bucket
+        self.totals[groups] += sign * sums
+
+class DelayTrends:
+    """
+    Incremental rolling-window train delay statistics per line and direction
+    """
+
+    def __init__(self, feed='trains', windows=DELAY_TREND_WINDOWS, bucket=DELAY_TREND_BUCKET):
+        """
+        Args:
+            feed (str, optional): Rail feed to track
+            windows (tuple, optional): Rolling windows in seconds, shortest first
+            bucket (int, optional): Seconds per bucket
+        """
+        self.feed = feed
+        self.bucket = bucket
+        self._groups = {}
+        self._labels = []
+        self._windows = [_Window(seconds, 0) for seconds in sorted(windows)]
+        self._open = None
+        self._polls = 0
+        self._trend = self._build_trend()
+        self.generation = 0
+        self._lock = threading.Lock()
+
+    def on_publish(self, previous, snapshot):
+        """
+        SnapshotStore listener: fold every fetched rail poll in
+
+        Args:
+            previous (Snapshot): Previous snapshot of the feed, or None
+            snapshot (Snapshot): Newly published snapshot
+        """
+        if snapshot.feed != self.feed:
+            return
+        if snapshot.primed:
+            # Primed from the cache file: not a current observation
+            return
+        self.update(as_arrival_batch(snapshot.data).columns, snapshot.fetched_at)
+
+    def update(self, columns, timestamp):
+        """
+        Add one rail poll to every window
+
+        Polls landing in the same bucket are summed into it.
+
+        Args:
+            columns (DelayColumns): Parsed rail poll
+            timestamp (float): Fetch time, Unix seconds
+        """
+        sums = poll_sums(columns)
+        present = np.flatnonzero(sums[:, COUNT])
+        key = int(timestamp // self.bucket)
+
+        with self._lock:
+            groups = np.array([self._group(columns.groups[code]) for code in present.tolist()], dtype=np.int64)
+            sums = sums[present]
+
+            if self._open is not None and self._open[0] == key:
+                # Merge into the open bucket: only the new poll's sums move the totals
+                for window in self._windows:
+                    window.totals[groups] += sums
+                _, open_groups, open_sums = self._open
+                merged = np.zeros((len(self._labels), SUM_COLUMNS))
+                merged[open_groups] += open_sums
+                merged[groups] += sums
+                merged_groups = np.flatnonzero(merged[:, COUNT])
+                bucket = (key, merged_groups, merged[merged_groups])
+                for window in self._windows:
+                    window.buckets[-1] = bucket
+            else:
+                bucket = (key, groups, sums)
+                for window in self._windows:
+                    window.add(bucket)
+
+            self._open = bucket
+            for window in self._windows:
+                window.expire(key - window.seconds // self.bucket)
+            self._polls += 1
+            self._trend = self._build_trend()
+            self.generation += 1
+
+    def _group(self, label):
+        """Stable index of a (line, direction) group, growing the totals for new groups"""
+        index = self._groups.get(label)
+        if index is None:
+            index = self._groups[label] = len(self._labels)
+            self._labels.append(label)
+            for window in self._windows:
+                window.totals = np.vstack((window.totals, np.zeros((1, SUM_COLUMNS))))
+        return index
+
+    def _build_trend(self):
+        """Derive the trend view from the window totals"""
+        labels = [window_label(window.seconds) for window in self._windows]
+        groups = []
+        for index, (line, direction) in enumerate(self._labels):
+            if not line or not direction:
+                continue
+            stats = {
+                label: _group_stats(window.totals[index])
+                for label, window in zip(labels, self._windows)
+            }
+            groups.append({
+                'line': line,
+                'direction': direction,
+                'trend': _direction(stats[labels[0]], stats[labels[-1]]),
+                'windows': stats
+            })
+        groups.sort(key=lambda group: (group['line'], group['direction']))
+
+        return {
+            'bucket': self.bucket,
+            'windows': {
+                label: self._window_status(window)
+                for label, window in zip(labels, self._windows)
+            },
+            'lines': groups
+        }
+
+    def _window_status(self, window):
+        """Rail status over one window, by the same rule as the live status"""
+        lines = {}
+        for index, (line, _) in enumerate(self._labels):
+            if not line:
+                continue
+            totals = lines.setdefault(line, [0.0, 0.0])
+            totals[0] += window.totals[index, LATE_COUNT]
+            totals[1] += window.totals[index, LATE_SUM]
+        affected = sorted(
+            ((line, late_sum / late_count) for line, (late_count, late_sum) in lines.items()
+             if late_count > 0 and late_sum / late_count >= DELAY_AFFECTED_THRESHOLD),
+            key=lambda item: item[1], reverse=True
+        )
+        status = describe_affected_lines(affected)
+        status['seconds'] = window.seconds
+        status['arrivals'] = int(window.totals[:, COUNT].sum()) if len(window.totals) else 0
+        return status
+
+    def trend(self):
+        """
+        Get the rolling delay trend
+
+        Views built from it are keyed by ``generation``, which moves
+        forward every time the trend is rebuilt.
+
+        Returns:
+            dict: 'bucket' seconds; 'windows' with the rail status ('status',
+                'details', 'affectedLines', 'seconds', 'arrivals') per window
+                label such as '15m'; and 'lines' with the 'count', 'mean',
+                'stddev' and 'late' share of delays per window, plus whether
+                delays are 'rising', 'falling' or 'steady', per line and direction
+        """
+        return self._trend
+
+    def stats(self):
+        """
+        Get tracker counters
+
+        Returns:
+            dict: Polls folded in, groups tracked and buckets held per window
+        """
+        with self._lock:
+            return {
+                'polls': self._polls,
+                'groups': len(self._labels),
+                'buckets': {window_label(window.seconds): len(window.buckets) for window in self._windows}
+            }
+
+def _group_stats(totals):
+    """Delay statistics of one group from its window totals"""
+    count = int(totals[COUNT])
+    if not count:
+        return {'count': 0, 'mean': None, 'stddev': None, 'late': None}
+    mean = float(totals[DELAY_SUM]) / count
+    variance = max(float(totals[DELAY_SQUARES]) / count - mean * mean, 0.0)
+    return {
+        'count': count,
+        'mean': round(mean, 1),
+        'stddev': round(math.sqrt(variance), 1),
+        'late': round(100 * float(totals[LATE_COUNT]) / count, 1)
+    }
+
+def _direction(short, long):
+    """Compare the shortest window's mean delay against the longest's"""
+    if short['mean'] is None or long['mean'] is None:
+        return 'steady'
+    change = short['mean'] - long['mean']
+    if change > DELAY_TREND_THRESHOLD:
+        return 'rising'
+    if change < -DELAY_TREND_THRESHOLD:
+        return 'falling'
+    return 'steady'
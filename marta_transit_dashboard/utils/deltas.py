@@ -0,0 +1,158 @@
+"""
+Snapshot delta utilities for the Simple MARTA App
+
+A DeltaLog listens to one GTFS-RT feed in the SnapshotStore and keeps a
+bounded ring of entity-level diffs between consecutive versions, so clients
+can ask for only what changed since the version they already have.
+Columnar snapshots are diffed on their arrays, so only the changed rows are
+converted to entity dicts. Trackers that only need the changed entities
+subscribe to the log itself.
+"""
+
+import os
+import sys
+import threading
+from collections import deque, namedtuple
+
+# Add parent directory to import path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import DELTA_HISTORY
+from utils.snapshots import to_payload
+
+# Entities added or changed (id -> entity) and ids removed between two versions
+Diff = namedtuple('Diff', ['from_version', 'to_version', 'upserted', 'removed'])
+
+class DeltaLog:
+    """
+    Bounded history of entity diffs for one feed
+    """
+
+    def __init__(self, feed, max_diffs=DELTA_HISTORY):
+        """
+        Args:
+            feed (str): Feed name to track, e.g. 'bus_positions'
+            max_diffs (int, optional): Number of consecutive diffs to keep
+        """
+        self.feed = feed
+        self._diffs = deque(maxlen=max_diffs)
+        self._state = {}
+        self._version = None
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def on_publish(self, previous, snapshot):
+        """
+        SnapshotStore listener: record the diff from the previous version
+
+        Args:
+            previous (Snapshot): Previous snapshot of the feed, or None
+            snapshot (Snapshot): Newly published snapshot
+        """
+        if snapshot.feed != self.feed:
+            return
+
+        state = _diff_state(snapshot.data)
+
+        diff = None
+        with self._lock:
+            if previous is not None and previous.version == self._version:
+                upserted, removed = _changes(self._state, state)
+                diff = Diff(previous.version, snapshot.version, upserted, removed)
+                self._diffs.append(diff)
+            else:
+                # We missed a version, so older diffs can no longer be chained
+                self._diffs.clear()
+            self._state = state
+            self._version = snapshot.version
+
+        for listener in list(self._listeners):
+            try:
+                listener(snapshot, diff)
+            except Exception as e:
+                print(f"Error in delta listener for {self.feed}: {e}")
+
+    def subscribe(self, listener):
+        """
+        Register a callback for recorded versions
+
+        Args:
+            listener (callable): Called as listener(snapshot, diff) after
+                each new version is recorded. ``diff`` is the Diff from the
+                previous version, or None when there is no previous version
+                to diff against.
+        """
+        self._listeners.append(listener)
+
+    @property
+    def generation(self):
+        """
+        int: Version of the last snapshot recorded (0 before the first);
+            ?since= bodies are keyed by it, because a request can see a
+            new version before this listener has recorded its diff
+        """
+        return self._version or 0
+
+    def since(self, version, to_version):
+        """
+        Merge every diff from version up to to_version
+
+        Args:
+            version (int): Version the client already has
+            to_version (int): Version being served
+
+        Returns:
+            dict: {'upserted': [entities], 'removed': [ids]}, or None if the
+                client is too far behind (or ahead) and needs a full snapshot
+        """
+        with self._lock:
+            if version == to_version:
+                return {'upserted': [], 'removed': []}
+
+            chain = [
+                diff for diff in self._diffs
+                if diff.from_version >= version and diff.to_version <= to_version
+            ]
+            if not chain or chain[0].from_version != version or chain[-1].to_version != to_version:
+                return None
+
+            upserted = {}
+            removed = set()
+            for diff in chain:
+                for entity_id in diff.removed:
+                    upserted.pop(entity_id, None)
+                    removed.add(entity_id)
+                for entity_id, entity in diff.upserted.items():
+                    removed.discard(entity_id)
+                    upserted[entity_id] = entity
+            current_size = len(self._state)
+
+        # A delta touching most of the feed is no cheaper than a full snapshot
+        if current_size and len(upserted) > current_size // 2:
+            return None
+
+        return {'upserted': list(upserted.values()), 'removed': sorted(removed, key=str)}
+
+def _diff_state(data):
+    """What the next diff needs: columnar snapshots as-is, others as id -> entity"""
+    if hasattr(data, 'changes_since'):
+        return data
+    return {entity.get('id'): entity for entity in to_payload(data).get('entity', [])}
+
+def _changes(old, new):
+    """
+    Entities upserted and ids removed between two diff states
+
+    Returns:
+        tuple: (dict of entity id to entity, list of removed ids)
+    """
+    if hasattr(old, 'changes_since') and hasattr(new, 'changes_since'):
+        return new.changes_since(old)
+    # Mixed representations (e.g. a dict primed from cache) fall back to entity dicts
+    if hasattr(old, 'changes_since'):
+        old = _diff_state(to_payload(old))
+    if hasattr(new, 'changes_since'):
+        new = _diff_state(to_payload(new))
+    upserted = {entity_id: entity for entity_id, entity in new.items() if old.get(entity_id) != entity}
+    removed = [entity_id for entity_id in old if entity_id not in new]
+    return upserted, removed
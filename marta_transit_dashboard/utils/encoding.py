@@ -0,0 +1,181 @@
+"""
+Response body encoding utilities for the Simple MARTA App
+
+Every view of a snapshot is serialized to JSON bytes once and compressed
+once, then the stored bytes are served to every request for that snapshot
+version. orjson and brotli are used when installed; otherwise the stdlib
+json encoder is used and only gzip is offered.
+"""
+
+import gzip
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+try:
+    import brotli
+    HAS_BROTLI = True
+except ImportError:
+    HAS_BROTLI = False
+
+# Add parent directory to import path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import (
+    BODY_CACHE_SIZE,
+    COMPRESS_MIN_SIZE,
+    GZIP_LEVEL,
+    BROTLI_QUALITY
+)
+from utils.snapshots import to_payload
+
+def dumps_json(payload):
+    """
+    Serialize a payload to compact UTF-8 JSON
+
+    Args:
+        payload: JSON-serializable data
+
+    Returns:
+        bytes: Encoded JSON (never contains newlines)
+    """
+    if HAS_ORJSON:
+        return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, separators=(',', ':')).encode('utf-8')
+
+class EncodedBody:
+    """
+    One JSON body in every content coding we serve
+    """
+    __slots__ = ('identity', 'gzip', 'br')
+
+    def __init__(self, identity):
+        """
+        Args:
+            identity (bytes): Uncompressed JSON body
+        """
+        self.identity = identity
+        self.gzip = None
+        self.br = None
+
+        # Tiny bodies grow when compressed, so only the identity form is kept
+        if len(identity) >= COMPRESS_MIN_SIZE:
+            self.gzip = gzip.compress(identity, compresslevel=GZIP_LEVEL, mtime=0)
+            if HAS_BROTLI:
+                self.br = brotli.compress(identity, quality=BROTLI_QUALITY)
+
+    @classmethod
+    def from_payload(cls, payload):
+        """
+        Encode a payload
+
+        Args:
+            payload: JSON-serializable data
+
+        Returns:
+            EncodedBody: Encoded body
+        """
+        return cls(dumps_json(payload))
+
+    def encodings(self):
+        """
+        Get the content codings available for this body, best first
+
+        Returns:
+            list: Coding names, always ending with 'identity'
+        """
+        available = [name for name in ('br', 'gzip') if getattr(self, name) is not None]
+        return available + ['identity']
+
+    def get(self, encoding):
+        """
+        Get the body bytes for a content coding
+
+        Args:
+            encoding (str): 'br', 'gzip' or 'identity'
+
+        Returns:
+            bytes: Encoded body
+        """
+        return getattr(self, encoding)
+
+class BodyCache:
+    """
+    Bounded cache of encoded view bodies keyed by snapshot versions
+    """
+
+    def __init__(self, max_size=BODY_CACHE_SIZE):
+        """
+        Args:
+            max_size (int, optional): Number of bodies kept (least recently
+                used are evicted first)
+        """
+        self.max_size = max_size
+        self._bodies = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, name, versions, build):
+        """
+        Get the encoded body of a view, encoding it on first use
+
+        Args:
+            name (str): View name
+            versions (tuple): Snapshot versions the view is built from
+            build (callable): Returns the payload if it is not cached yet
+
+        Returns:
+            EncodedBody: Encoded body
+        """
+        key = (name, versions)
+        with self._lock:
+            body = self._bodies.get(key)
+            if body is not None:
+                self._bodies.move_to_end(key)
+                self._hits += 1
+                return body
+            self._misses += 1
+
+        body = EncodedBody.from_payload(build())
+
+        with self._lock:
+            self._bodies[key] = body
+            self._bodies.move_to_end(key)
+            while len(self._bodies) > self.max_size:
+                self._bodies.popitem(last=False)
+        return body
+
+    def on_publish(self, previous, snapshot):
+        """
+        SnapshotStore listener: encode the plain feed view eagerly
+
+        Args:
+            previous (Snapshot): Previous snapshot of the feed, or None
+            snapshot (Snapshot): Newly published snapshot
+        """
+        self.get(snapshot.feed, (snapshot.version,), lambda: to_payload(snapshot.data))
+
+    def stats(self):
+        """
+        Get cache counters
+
+        Returns:
+            dict: 'size', 'hits', 'misses' and the encoders in use
+        """
+        with self._lock:
+            return {
+                'size': len(self._bodies),
+                'hits': self._hits,
+                'misses': self._misses,
+                'json': 'orjson' if HAS_ORJSON else 'json',
+                'brotli': HAS_BROTLI
+            }
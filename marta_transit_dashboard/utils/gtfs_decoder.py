@@ -0,0 +1,122 @@
+"""
+GTFS-RT decoding utilities for the Simple MARTA App
+
+Walks a parsed gtfs_realtime_pb2.FeedMessage once and builds compact dicts
+holding only the fields the dashboard uses. The output keeps the same
+camelCase shape that MessageToJson produces (including int64 timestamps as
+strings), so the /api/buses/* payloads stay compatible, but it skips the
+MessageToJson -> json.loads round trip. Vehicle positions are decoded
+straight into columns by VehiclePositionColumns.from_feed instead.
+"""
+
+try:
+    from google.transit import gtfs_realtime_pb2
+
+    def _enum_names(enum_type):
+        return {value.number: value.name for value in enum_type.values}
+
+    _INCREMENTALITY = _enum_names(gtfs_realtime_pb2.FeedHeader.DESCRIPTOR.enum_types_by_name['Incrementality'])
+    _TRIP_RELATIONSHIP = _enum_names(gtfs_realtime_pb2.TripDescriptor.DESCRIPTOR.enum_types_by_name['ScheduleRelationship'])
+    _STOP_RELATIONSHIP = _enum_names(
+        gtfs_realtime_pb2.TripUpdate.StopTimeUpdate.DESCRIPTOR.enum_types_by_name['ScheduleRelationship']
+    )
+except ImportError:
+    gtfs_realtime_pb2 = None
+
+# Float32 coordinates carry ~7 significant digits; 6 decimals is ~0.1 m
+COORDINATE_PRECISION = 6
+
+def decode_header(feed):
+    """
+    Decode the feed header
+
+    Args:
+        feed (gtfs_realtime_pb2.FeedMessage): Parsed feed
+
+    Returns:
+        dict: Header fields that are set
+    """
+    header = feed.header
+    result = {'gtfsRealtimeVersion': header.gtfs_realtime_version}
+    if header.HasField('incrementality'):
+        result['incrementality'] = _INCREMENTALITY.get(header.incrementality, header.incrementality)
+    if header.HasField('timestamp'):
+        result['timestamp'] = str(header.timestamp)
+    return result
+
+def _decode_trip(trip):
+    result = {}
+    if trip.HasField('trip_id'):
+        result['tripId'] = trip.trip_id
+    if trip.HasField('route_id'):
+        result['routeId'] = trip.route_id
+    if trip.HasField('direction_id'):
+        result['directionId'] = trip.direction_id
+    if trip.HasField('schedule_relationship'):
+        result['scheduleRelationship'] = _TRIP_RELATIONSHIP.get(trip.schedule_relationship, trip.schedule_relationship)
+    return result
+
+def _decode_vehicle_descriptor(vehicle):
+    result = {}
+    if vehicle.HasField('id'):
+        result['id'] = vehicle.id
+    if vehicle.HasField('label'):
+        result['label'] = vehicle.label
+    return result
+
+def _decode_stop_time_event(event):
+    result = {}
+    if event.HasField('delay'):
+        result['delay'] = event.delay
+    if event.HasField('time'):
+        result['time'] = str(event.time)
+    return result
+
+def decode_trip_updates(feed):
+    """
+    Decode a TripUpdates feed into compact records
+
+    Args:
+        feed (gtfs_realtime_pb2.FeedMessage): Parsed trip updates feed
+
+    Returns:
+        dict: {'header': {...}, 'entity': [{'id', 'tripUpdate': {...}}, ...]}
+    """
+    entities = []
+    append = entities.append
+
+    for entity in feed.entity:
+        if not entity.HasField('trip_update'):
+            continue
+        update = entity.trip_update
+        record = {'trip': _decode_trip(update.trip)}
+
+        stop_time_updates = []
+        for stop_time in update.stop_time_update:
+            stop = {}
+            if stop_time.HasField('stop_sequence'):
+                stop['stopSequence'] = stop_time.stop_sequence
+            if stop_time.HasField('stop_id'):
+                stop['stopId'] = stop_time.stop_id
+            if stop_time.HasField('arrival'):
+                stop['arrival'] = _decode_stop_time_event(stop_time.arrival)
+            if stop_time.HasField('departure'):
+                stop['departure'] = _decode_stop_time_event(stop_time.departure)
+            if stop_time.HasField('schedule_relationship'):
+                stop['scheduleRelationship'] = _STOP_RELATIONSHIP.get(
+                    stop_time.schedule_relationship, stop_time.schedule_relationship
+                )
+            stop_time_updates.append(stop)
+        if stop_time_updates:
+            record['stopTimeUpdate'] = stop_time_updates
+
+        if update.HasField('vehicle'):
+            record['vehicle'] = _decode_vehicle_descriptor(update.vehicle)
+        if update.HasField('timestamp'):
+            record['timestamp'] = str(update.timestamp)
+        if update.HasField('delay'):
+            record['delay'] = update.delay
+
+        append({'id': entity.id, 'tripUpdate': record})
+
+    return {'header': decode_header(feed), 'entity': entities}
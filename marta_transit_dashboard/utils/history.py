@@ -0,0 +1,380 @@
+"""
+Columnar history utilities for the Simple MARTA App
+
+Each poll of the rail feed and of the bus vehicle positions feed is turned
+into typed, dictionary-encoded Arrow columns and buffered. Buffers are
+flushed to date-partitioned Parquet files:
+
+    <dataset>/date=YYYY-MM-DD/part-<first poll ms>.parquet
+
+Rows are sorted by line (or route) and poll time before writing, so the
+per-row-group min/max statistics let filtered scans skip row groups for
+other lines, routes or times. pyarrow is optional; without it the history
+store is disabled.
+"""
+
+import os
+import sys
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+    # Flag indicating that Parquet history can be written and scanned
+    HAS_PYARROW = True
+except ImportError:
+    print("Warning: pyarrow not found. Parquet history is disabled.")
+    HAS_PYARROW = False
+
+# Add parent directory to import path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import (
+    ATLANTA_TIMEZONE,
+    HISTORY_DIR,
+    HISTORY_FLUSH_INTERVAL,
+    HISTORY_ROW_GROUP_SIZE
+)
+
+# Snapshot feed -> (history dataset, sort columns)
+HISTORY_DATASETS = {
+    'trains': ('train_arrivals', ['line', 'poll_time']),
+    'bus_positions': ('bus_positions', ['route', 'poll_time'])
+}
+
+if HAS_PYARROW:
+    _STRING = pa.dictionary(pa.int32(), pa.string())
+
+    TRAIN_SCHEMA = pa.schema([
+        ('poll_time', pa.timestamp('ms', tz='UTC')),
+        ('line', _STRING),
+        ('station', _STRING),
+        ('destination', _STRING),
+        ('direction', _STRING),
+        ('train_id', _STRING),
+        ('delay', pa.int32()),              # Seconds, from DELAY ("T146S")
+        ('waiting_seconds', pa.int32()),
+        ('event_time', pa.timestamp('s', tz='UTC')),
+        ('latitude', pa.float64()),
+        ('longitude', pa.float64())
+    ])
+
+    VEHICLE_SCHEMA = pa.schema([
+        ('poll_time', pa.timestamp('ms', tz='UTC')),
+        ('vehicle', _STRING),
+        ('route', _STRING),
+        ('trip', _STRING),
+        ('latitude', pa.float64()),
+        ('longitude', pa.float64()),
+        ('bearing', pa.float32()),
+        ('timestamp', pa.timestamp('s', tz='UTC')),
+        ('occupancy', pa.int8())
+    ])
+
+def _dictionary_column(values):
+    """Dictionary-encode a sequence of strings (None/'' = null)"""
+    array = pa.array([value or None for value in values], type=pa.string())
+    return array.dictionary_encode()
+
+def _poll_time_column(poll_time, length):
+    """Repeat one poll timestamp (seconds) as a millisecond column"""
+    return pa.array(np.full(length, int(poll_time * 1000), dtype=np.int64)).cast(pa.timestamp('ms', tz='UTC'))
+
+def train_table(batch, poll_time):
+    """
+    Convert one poll of the rail feed to typed columns
+
+    Reuses the values parsed when the poll was ingested.
+
+    Args:
+        batch (ArrivalBatch): Parsed rail poll
+        poll_time (float): When the feed was fetched, Unix seconds
+
+    Returns:
+        pyarrow.Table: Table with TRAIN_SCHEMA
+    """
+    arrivals = batch.arrivals
+    event_time = batch.event_time.copy()
+    missing = np.isnan(event_time)
+    event_time[missing] = 0
+
+    def seconds(values):
+        return pa.array(np.nan_to_num(values).astype(np.int32), mask=np.isnan(values))
+
+    return pa.Table.from_arrays([
+        _poll_time_column(poll_time, len(arrivals)),
+        _dictionary_column([arrival.line for arrival in arrivals]),
+        _dictionary_column([arrival.station for arrival in arrivals]),
+        _dictionary_column([arrival.destination for arrival in arrivals]),
+        _dictionary_column([arrival.direction for arrival in arrivals]),
+        _dictionary_column([arrival.train_id for arrival in arrivals]),
+        seconds(batch.delay),
+        seconds(batch.waiting),
+        pa.array(event_time.astype(np.int64), mask=missing).cast(pa.timestamp('s', tz='UTC')),
+        pa.array(batch.latitude, from_pandas=True),
+        pa.array(batch.longitude, from_pandas=True)
+    ], schema=TRAIN_SCHEMA)
+
+def vehicle_table(columns, poll_time):
+    """
+    Convert one bus positions snapshot to typed columns
+
+    The string columns are already dictionary-encoded in the snapshot, so
+    their codes are reused as Arrow dictionary indices.
+
+    Args:
+        columns (VehiclePositionColumns): Columnar positions snapshot
+        poll_time (float): When the feed was fetched, Unix seconds
+
+    Returns:
+        pyarrow.Table: Table with VEHICLE_SCHEMA
+    """
+    rows = columns.rows
+
+    def strings(name):
+        codes = rows[name]
+        return pa.DictionaryArray.from_arrays(
+            pa.array(codes, mask=codes < 0, type=pa.int32()),
+            pa.array(columns.dictionaries[name].values, type=pa.string())
+        )
+
+    timestamps = rows['timestamp']
+    occupancy = rows['occupancy']
+    return pa.Table.from_arrays([
+        _poll_time_column(poll_time, len(rows)),
+        strings('vehicle'),
+        strings('route'),
+        strings('trip'),
+        pa.array(rows['lat'], from_pandas=True),
+        pa.array(rows['lon'], from_pandas=True),
+        pa.array(rows['bearing'], from_pandas=True),
+        pa.array(timestamps, mask=timestamps == 0).cast(pa.timestamp('s', tz='UTC')),
+        pa.array(occupancy, mask=occupancy < 0)
+    ], schema=VEHICLE_SCHEMA)
+
+class HistoryStore:
+    """
+    Buffered, date-partitioned Parquet history of train arrivals and bus positions
+    """
+
+    def __init__(self, directory=HISTORY_DIR, flush_interval=HISTORY_FLUSH_INTERVAL,
+                 row_group_size=HISTORY_ROW_GROUP_SIZE):
+        """
+        Args:
+            directory (str, optional): Root directory of the datasets
+            flush_interval (float, optional): Seconds of polls per Parquet file
+            row_group_size (int, optional): Maximum rows per row group
+        """
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.row_group_size = row_group_size
+        self._buffers = {}
+        self._lock = threading.Lock()
+        self._files = 0
+        self._rows = 0
+
+    def append(self, dataset, table, poll_time):
+        """
+        Buffer one poll, flushing the buffer first if it is due
+
+        A buffer is flushed once it spans flush_interval seconds, and
+        whenever the UTC date changes so files never straddle partitions.
+        The due buffer is swapped out under the lock and written after it
+        is released, so other polls are not held up by Parquet encoding.
+
+        Args:
+            dataset (str): Dataset name, e.g. 'train_arrivals'
+            table (pyarrow.Table): Rows of this poll
+            poll_time (float): When the feed was fetched, Unix seconds
+        """
+        date = _partition_date(poll_time)
+        due = None
+        with self._lock:
+            buffer = self._buffers.get(dataset)
+            if buffer is not None and (
+                buffer['date'] != date or poll_time - buffer['first'] >= self.flush_interval
+            ):
+                due = self._buffers.pop(dataset)
+                buffer = None
+            if buffer is None:
+                buffer = {'date': date, 'first': poll_time, 'tables': []}
+                self._buffers[dataset] = buffer
+            buffer['tables'].append(table)
+
+        if due is not None:
+            self._write(dataset, due)
+
+    def on_publish(self, previous, snapshot):
+        """
+        SnapshotStore listener: ingest every new rail and bus positions poll
+
+        Args:
+            previous (Snapshot): Previous snapshot of the feed, or None
+            snapshot (Snapshot): Newly published snapshot
+        """
+        if snapshot.feed not in HISTORY_DATASETS:
+            return
+        if snapshot.primed:
+            # Primed from the cache file, which was ingested when it was fetched
+            return
+
+        dataset = HISTORY_DATASETS[snapshot.feed][0]
+        try:
+            if snapshot.feed == 'trains':
+                table = train_table(snapshot.data, snapshot.fetched_at)
+            else:
+                table = vehicle_table(snapshot.data, snapshot.fetched_at)
+            if table.num_rows:
+                self.append(dataset, table, snapshot.fetched_at)
+        except Exception as e:
+            print(f"Error ingesting {snapshot.feed} history: {e}")
+
+    def flush(self):
+        """
+        Write every buffered poll to disk now
+        """
+        with self._lock:
+            buffers, self._buffers = self._buffers, {}
+        for dataset, buffer in buffers.items():
+            self._write(dataset, buffer)
+
+    def close(self):
+        """
+        Flush buffered polls before shutdown
+        """
+        self.flush()
+
+    def _write(self, dataset, buffer):
+        """Write one buffer as a Parquet file (called without the lock held)"""
+        sort_keys = dict(HISTORY_DATASETS.values())[dataset]
+        table = pa.concat_tables(buffer['tables'])
+
+        # Arrow cannot sort dictionary columns directly, so sort on their values
+        keys = pa.table({
+            key: table[key].cast(pa.string()) if pa.types.is_dictionary(table.schema.field(key).type) else table[key]
+            for key in sort_keys
+        })
+        table = table.take(pc.sort_indices(keys, sort_keys=[(key, 'ascending') for key in sort_keys]))
+
+        partition = os.path.join(self.directory, dataset, f"date={buffer['date']}")
+        os.makedirs(partition, exist_ok=True)
+        name = f"part-{int(buffer['first'] * 1000):013d}.parquet"
+        # Dot-prefixed temp files are ignored by dataset discovery
+        temp_path = os.path.join(partition, f".{name}.tmp")
+        try:
+            pq.write_table(
+                table,
+                temp_path,
+                row_group_size=self.row_group_size,
+                compression='zstd',
+                write_statistics=True
+            )
+            os.replace(temp_path, os.path.join(partition, name))
+        except Exception as e:
+            print(f"Error writing {dataset} history: {e}")
+            return
+        with self._lock:
+            self._files += 1
+            self._rows += table.num_rows
+
+    def scan(self, dataset, start=None, end=None, where=None, columns=None):
+        """
+        Read history rows, skipping partitions and row groups that cannot match
+
+        Args:
+            dataset (str): 'train_arrivals' or 'bus_positions'
+            start (float, optional): Earliest poll time, Unix seconds
+            end (float, optional): Latest poll time, Unix seconds
+            where (dict, optional): Column name to a value or list of values,
+                e.g. {'line': 'BLUE'} or {'route': ['110', '39']}
+            columns (list, optional): Columns to read. Defaults to all.
+
+        Returns:
+            pyarrow.Table: Matching rows (empty if nothing was written yet)
+        """
+        root = os.path.join(self.directory, dataset)
+        schema = TRAIN_SCHEMA if dataset == 'train_arrivals' else VEHICLE_SCHEMA
+        if not os.path.isdir(root):
+            return schema.empty_table().select(columns or schema.names)
+
+        expression = None
+        conditions = []
+        if start is not None:
+            conditions.append(ds.field('date') >= _partition_date(start))
+            conditions.append(ds.field('poll_time') >= pa.scalar(int(start * 1000), pa.timestamp('ms', tz='UTC')))
+        if end is not None:
+            conditions.append(ds.field('date') <= _partition_date(end))
+            conditions.append(ds.field('poll_time') <= pa.scalar(int(end * 1000), pa.timestamp('ms', tz='UTC')))
+        for name, value in (where or {}).items():
+            if isinstance(value, (list, tuple, set)):
+                conditions.append(ds.field(name).isin(list(value)))
+            else:
+                conditions.append(ds.field(name) == value)
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+
+        partitioning = ds.partitioning(pa.schema([('date', pa.string())]), flavor='hive')
+        dataset = ds.dataset(
+            root,
+            schema=schema.append(pa.field('date', pa.string())),
+            format='parquet',
+            partitioning=partitioning
+        )
+        return dataset.to_table(columns=columns or schema.names, filter=expression)
+
+    def delay_by_hour(self, line=None, start=None, end=None):
+        """
+        Average train delay per hour of the day
+
+        Args:
+            line (str, optional): Rail line, e.g. 'BLUE'. Defaults to all lines.
+            start (float, optional): Earliest poll time, Unix seconds
+            end (float, optional): Latest poll time, Unix seconds
+
+        Returns:
+            list: {'hour', 'meanDelay', 'count'} per hour with data (Atlanta
+                local hour of EVENT_TIME, delays in seconds)
+        """
+        table = self.scan(
+            'train_arrivals',
+            start,
+            end,
+            where={'line': line} if line else None,
+            columns=['event_time', 'delay']
+        )
+        frame = table.to_pandas().dropna()
+        if frame.empty:
+            return []
+        hours = frame['event_time'].dt.tz_convert(ATLANTA_TIMEZONE).dt.hour
+        grouped = frame.groupby(hours)['delay'].agg(['mean', 'count'])
+        return [
+            {'hour': int(hour), 'meanDelay': round(float(row['mean']), 1), 'count': int(row['count'])}
+            for hour, row in grouped.iterrows()
+        ]
+
+    def stats(self):
+        """
+        Get ingest counters
+
+        Returns:
+            dict: Buffered and written row counts, files written
+        """
+        with self._lock:
+            return {
+                'bufferedRows': sum(
+                    sum(table.num_rows for table in buffer['tables'])
+                    for buffer in self._buffers.values()
+                ),
+                'filesWritten': self._files,
+                'rowsWritten': self._rows
+            }
+
+def _partition_date(timestamp):
+    """UTC date partition value for a Unix timestamp"""
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m-%d')
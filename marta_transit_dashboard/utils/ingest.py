@@ -0,0 +1,78 @@
+"""
+Feed ingest utilities for the Simple MARTA App
+
+A FeedSource describes how one upstream feed is obtained: either an HTTP
+request whose body is turned into snapshot data by a parse function, or
+a blocking load function for feeds fetched through a client library.
+The same description drives both paths into the snapshot store: the
+asyncio FeedPoller, which fetches every feed concurrently and parses in
+a worker pool, and fetch_source, the blocking path behind the get_*
+functions in utils/.
+"""
+
+import os
+import sys
+
+# Add parent directory to import path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.upstream import upstream
+
+class FeedSource:
+    """
+    How to fetch, parse and fall back for one upstream feed
+    """
+
+    def __init__(self, feed, fallback, url=None, parse=None, load=None,
+                 params=None, headers=None, available=True, timestamp=None):
+        """
+        Args:
+            feed (str): Feed name, used for the snapshot store and upstream stats
+            fallback (callable): Returns cached data when the feed can't be fetched
+            url (str, optional): Upstream URL for HTTP sources
+            parse (callable, optional): Turns the response body (bytes)
+                into snapshot data; raises if the body is unusable
+            load (callable, optional): Blocking fetch for sources that use
+                a client library instead of url/parse; raises on failure
+            params (dict, optional): Query parameters
+            headers (dict, optional): Request headers
+            available (bool, optional): False when the modules needed to
+                fetch the feed are missing; only the fallback is used then
+            timestamp (callable, optional): Returns when the upstream
+                produced a snapshot's data (Unix seconds, or None); lets the
+                poller learn the feed's publish cadence
+        """
+        if (url is None or parse is None) and load is None:
+            raise ValueError(f"{feed}: a source needs url and parse, or load")
+        self.feed = feed
+        self.fallback = fallback
+        self.url = url
+        self.parse = parse
+        self.load = load
+        self.params = params or {}
+        self.headers = headers or {}
+        self.available = available
+        self.timestamp = timestamp
+
+def fetch_source(source):
+    """
+    Fetch and parse one feed, blocking
+
+    Args:
+        source (FeedSource): Feed to fetch
+
+    Returns:
+        Snapshot data for the feed, or its fallback data if the feed
+        can't be fetched
+    """
+    if not source.available:
+        return source.fallback()
+    try:
+        if source.load is not None:
+            return source.load()
+        response = upstream.get(source.feed, source.url, params=source.params, headers=source.headers)
+        response.raise_for_status()
+        return source.parse(response.content)
+    except Exception as e:
+        print(f"Error fetching {source.feed}: {e}")
+        return source.fallback()
@@ -4,7 +4,6 @@ Map utilities for the Simple MARTA App
 
 import os
 import sys
-import requests
 import shutil
 from PIL import Image
 import io
@@ -18,6 +17,7 @@ from config.config import (
     MAP_FILE_PATH,
     STATIC_DIR
 )
+from utils.upstream import upstream
 
 def download_marta_map():
     """
@@ -31,7 +31,7 @@ def download_marta_map():
     try:
         print("Downloading MARTA train map...")
         # First try to get the map from MARTA website
-        response = requests.get(MARTA_MAP_URL, stream=True)
+        response = upstream.get('map', MARTA_MAP_URL, stream=True)
         
         if response.status_code == 200:
             with open(MAP_FILE_PATH, 'wb') as f:
@@ -42,7 +42,7 @@ def download_marta_map():
         else:
             # If that fails, use a backup source
             print("Failed to download from primary source, trying backup...")
-            response = requests.get(MAP_BACKUP_URL, stream=True)
+            response = upstream.get('map', MAP_BACKUP_URL, stream=True)
             
             if response.status_code == 200:
                 with open(MAP_FILE_PATH, 'wb') as f:
@@ -0,0 +1,156 @@
+"""
+Cache persistence utilities for the Simple MARTA App
+
+Feed fetchers hand their latest data to a write-behind CacheWriter instead
+of writing JSON files inline. A background thread writes each file through
+a temporary file and an atomic rename, so readers of the cache never see a
+half-written file, and a burst of updates to the same file is coalesced
+into a single write of the newest data.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Add parent directory to import path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import PERSISTENCE_LATENCY_BUCKETS
+from utils.encoding import dumps_json
+from utils.upstream import LatencyHistogram
+
+def write_atomic(path, data):
+    """
+    Replace a file's contents atomically
+
+    The data is written and fsynced to a temporary file in the same
+    directory, which is then renamed over the target.
+
+    Args:
+        path (str): Destination file
+        data (bytes): New contents
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+class CacheWriter:
+    """
+    Write-behind JSON file writer with per-path coalescing
+    """
+
+    def __init__(self):
+        self._pending = {}
+        self._cond = threading.Condition()
+        self._thread = None
+        self._busy = False
+        self._latency = LatencyHistogram(PERSISTENCE_LATENCY_BUCKETS)
+        self._submitted = 0
+        self._coalesced = 0
+        self._written = 0
+        self._errors = 0
+
+    def submit(self, path, payload):
+        """
+        Queue data to be written to a cache file
+
+        If a write for the same path is still queued, it is replaced, so
+        only the newest data is ever written.
+
+        Args:
+            path (str): Cache file path
+            payload: JSON-serializable data, or a callable returning it.
+                Callables are only invoked by the writer thread, so
+                superseded payloads are never serialized.
+        """
+        with self._cond:
+            if path in self._pending:
+                self._coalesced += 1
+            self._pending[path] = payload
+            self._submitted += 1
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='marta-cache-writer', daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def flush(self, timeout=5):
+        """
+        Wait until every queued write has been written
+
+        Args:
+            timeout (float, optional): Seconds to wait
+
+        Returns:
+            bool: True if the queue drained in time
+        """
+        deadline = time.time() + timeout
+        with self._cond:
+            while self._pending or self._busy:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                batch = self._pending
+                self._pending = {}
+                self._busy = True
+
+            for path, payload in batch.items():
+                start = time.perf_counter()
+                try:
+                    data = payload() if callable(payload) else payload
+                    write_atomic(path, dumps_json(data))
+                except Exception as e:
+                    print(f"Error writing cache file {path}: {e}")
+                    with self._cond:
+                        self._errors += 1
+                    continue
+                self._latency.observe(time.perf_counter() - start)
+                with self._cond:
+                    self._written += 1
+
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
+
+    def stats(self):
+        """
+        Get queue and write counters
+
+        Returns:
+            dict: Queue depth, submitted/coalesced/written/error counts and
+                the write latency histogram
+        """
+        with self._cond:
+            counters = {
+                'queueDepth': len(self._pending),
+                'submitted': self._submitted,
+                'coalesced': self._coalesced,
+                'written': self._written,
+                'errors': self._errors
+            }
+        counters['latency'] = self._latency.snapshot()
+        return counters
+
+# Shared writer used by all feed fetchers
+cache_writer = CacheWriter()
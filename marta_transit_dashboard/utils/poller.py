@@ -0,0 +1,255 @@
+"""
+Background feed poller for the Simple MARTA App
+
+Runs an asyncio event loop in a background thread with one task per
+upstream feed, so every feed is fetched concurrently on its own schedule
+and a slow upstream only delays itself. Feeds that carry a production
+timestamp are fetched just after their learned publish time (see
+utils/schedule.py); the others on their static TTL. Responses are fetched with aiohttp
+when it is installed (otherwise the blocking client runs in the loop's
+default executor); parsing and publishing into the SnapshotStore, which
+runs the store's listeners, happen in a small worker pool so the loop
+stays free for I/O. API requests never call the upstream services
+directly.
+"""
+
+import asyncio
+import functools
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add parent directory to import path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import FEED_TTLS, INGEST_WORKERS, POLLER_ERROR_BACKOFF
+from utils.ingest import fetch_source
+from utils.schedule import FeedSchedule
+from utils.upstream import HAS_AIOHTTP, AsyncUpstreamClient, upstream
+from utils.weather import WEATHER_SOURCE
+from utils.train_data import TRAIN_SOURCE
+from utils.bus_data import BUS_POSITIONS_SOURCE, BUS_TRIPS_SOURCE
+
+# How each feed is fetched, parsed and loaded from cache
+FEED_SOURCES = {
+    'trains': TRAIN_SOURCE,
+    'bus_positions': BUS_POSITIONS_SOURCE,
+    'bus_trips': BUS_TRIPS_SOURCE,
+    'weather': WEATHER_SOURCE
+}
+
+# Cache-only loaders, used to warm the store before the first live fetch
+FEED_FALLBACKS = {feed: source.fallback for feed, source in FEED_SOURCES.items()}
+
+class FeedPoller:
+    """
+    Managed asyncio ingest engine that keeps a SnapshotStore fresh
+    """
+
+    def __init__(self, store, sources=None, ttls=None, workers=INGEST_WORKERS):
+        """
+        Args:
+            store (SnapshotStore): Store to publish snapshots into
+            sources (dict, optional): Feed name to FeedSource
+            ttls (dict, optional): Feed name to static refresh interval in
+                seconds, also the longest wait while a feed keeps publishing
+            workers (int, optional): Threads parsing and publishing snapshots
+        """
+        self.store = store
+        self.sources = dict(sources or FEED_SOURCES)
+        self.ttls = dict(ttls or FEED_TTLS)
+        self.workers = workers
+        self._stats = {feed: {'fetches': 0, 'errors': 0, 'lastDuration': None, 'lastSuccess': None}
+                       for feed in self.sources}
+        self._schedules = {
+            feed: FeedSchedule(self.ttls.get(feed, POLLER_ERROR_BACKOFF)) for feed in self.sources
+        }
+        self._stats_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._loop = None
+        self._wake = None
+
+    @property
+    def running(self):
+        """bool: True while the background thread is alive"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def prime(self, loaders=None):
+        """
+        Seed the store from cached data so handlers have something to serve
+
+        Primed snapshots are flagged as such and published as already
+        expired, so the first poll cycle still fetches every feed live and
+        listeners that only track live observations can skip them.
+
+        Args:
+            loaders (dict, optional): Feed name to cache loader function
+        """
+        loaders = loaders or {feed: source.fallback for feed, source in self.sources.items()}
+        for feed, loader in loaders.items():
+            if feed not in self.sources or self.store.get(feed) is not None:
+                continue
+            try:
+                self.store.publish(feed, loader(), ttl=0, primed=True)
+            except Exception as e:
+                print(f"Error priming {feed} snapshot: {e}")
+
+    def refresh(self, feed):
+        """
+        Fetch one feed now, blocking, and publish the result
+
+        Args:
+            feed (str): Feed name
+
+        Returns:
+            Snapshot: The snapshot now current for the feed
+        """
+        data = fetch_source(self.sources[feed])
+        return self.store.publish(feed, data, ttl=self._schedule(feed, data))
+
+    def start(self):
+        """
+        Start the background event loop (no-op if already running)
+        """
+        if self.running:
+            return
+        self.prime()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='marta-feed-poller', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        """
+        Cancel every feed task and wait for the background thread
+
+        Args:
+            timeout (float, optional): Seconds to wait for the thread to join
+        """
+        self._stop_event.set()
+        loop, wake = self._loop, self._wake
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(wake.set)
+            except RuntimeError:
+                # The loop has already closed
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self):
+        """
+        Get ingest counters
+
+        Returns:
+            dict: 'asyncHttp' (True when aiohttp is used), 'workers' and
+                per-feed 'fetches', 'errors', 'lastDuration' seconds,
+                'lastSuccess' Unix time and the learned 'schedule' (publish
+                interval and freshness, see FeedSchedule.stats) under 'feeds'
+        """
+        with self._stats_lock:
+            feeds = {feed: dict(stats) for feed, stats in self._stats.items()}
+        for feed, schedule in self._schedules.items():
+            feeds.setdefault(feed, {})['schedule'] = schedule.stats()
+        return {'asyncHttp': HAS_AIOHTTP, 'workers': self.workers, 'feeds': feeds}
+
+    def _run(self):
+        asyncio.run(self._main())
+
+    async def _main(self):
+        self._wake = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        if self._stop_event.is_set():
+            return
+
+        pool = ThreadPoolExecutor(self.workers, thread_name_prefix='marta-ingest')
+        http = AsyncUpstreamClient() if HAS_AIOHTTP else None
+        if http is not None:
+            await http.open()
+        tasks = [asyncio.create_task(self._poll_feed(feed, pool, http)) for feed in self.sources]
+        try:
+            await self._wake.wait()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if http is not None:
+                await http.close()
+            pool.shutdown(wait=False)
+            self._loop = None
+
+    async def _poll_feed(self, feed, pool, http):
+        """Fetch one feed on its TTL until cancelled"""
+        loop = asyncio.get_running_loop()
+        source = self.sources[feed]
+        while True:
+            start = time.perf_counter()
+            try:
+                data = await self._fetch(source, loop, pool, http)
+                delay = self._schedule(feed, data)
+                await loop.run_in_executor(pool, functools.partial(self.store.publish, feed, data, ttl=delay))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Keep serving the last good snapshot and try again later
+                print(f"Error polling {feed}: {e}")
+                self._record(feed, time.perf_counter() - start, error=True)
+                await asyncio.sleep(POLLER_ERROR_BACKOFF)
+                continue
+            self._record(feed, time.perf_counter() - start)
+            await asyncio.sleep(delay)
+
+    async def _fetch(self, source, loop, pool, http):
+        """
+        Fetch and parse one feed without blocking the event loop
+
+        Raises:
+            Exception: If the feed can't be fetched or parsed
+        """
+        if not source.available:
+            return await loop.run_in_executor(pool, source.fallback)
+        if source.load is not None:
+            return await loop.run_in_executor(pool, source.load)
+
+        if http is not None:
+            content = await http.get(source.feed, source.url, params=source.params, headers=source.headers)
+        else:
+            content = await loop.run_in_executor(None, _get_content, source)
+        return await loop.run_in_executor(pool, source.parse, content)
+
+    def _schedule(self, feed, data):
+        """
+        Learn from a fetched snapshot and pick the wait before the next fetch
+
+        The wait is also the snapshot's TTL, so Cache-Control max-age
+        matches the next expected refresh.
+        """
+        source = self.sources[feed]
+        source_time = None
+        if source.available and source.timestamp is not None:
+            try:
+                source_time = source.timestamp(data)
+            except Exception as e:
+                print(f"Error reading {feed} timestamp: {e}")
+        return self._schedules[feed].observe(source_time)
+
+    def _record(self, feed, seconds, error=False):
+        with self._stats_lock:
+            stats = self._stats.setdefault(
+                feed, {'fetches': 0, 'errors': 0, 'lastDuration': None, 'lastSuccess': None}
+            )
+            stats['fetches'] += 1
+            stats['lastDuration'] = round(seconds, 3)
+            if error:
+                stats['errors'] += 1
+            else:
+                stats['lastSuccess'] = time.time()
+
+def _get_content(source):
+    """Blocking GET through the shared upstream client; returns the response body"""
+    response = upstream.get(source.feed, source.url, params=source.params, headers=source.headers)
+    response.raise_for_status()
+    return response.content
@@ -0,0 +1,128 @@
+"""
+Adaptive poll scheduling utilities for the Simple MARTA App
+
+Each upstream feed says when it was produced: the GTFS-RT header
+timestamp for the bus feeds and the newest EVENT_TIME for the rail feed.
+A FeedSchedule learns the feed's publish interval from the changes in
+that timestamp and times the next fetch for just after the next expected
+publish. A fetch that finds nothing new is retried after a short delay
+that doubles while the feed stays unchanged, so a stalled feed is asked
+less and less often; the same doubling probe finds the first publish
+interval. Feeds without a timestamp keep their static TTL.
+"""
+
+import os
+import sys
+import threading
+import time
+
+# Add parent directory to import path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import (
+    SCHEDULE_ALPHA,
+    SCHEDULE_MARGIN,
+    SCHEDULE_MAX_BACKOFF,
+    SCHEDULE_MIN_DELAY,
+    SCHEDULE_RETRY_DELAY
+)
+
+class FeedSchedule:
+    """
+    Learned publish cadence and next-fetch delay of one feed
+    """
+
+    def __init__(self, ttl, alpha=SCHEDULE_ALPHA, margin=SCHEDULE_MARGIN):
+        """
+        Args:
+            ttl (float): Static refresh interval; used for feeds without
+                timestamps, and as the longest wait while the feed keeps
+                publishing
+            alpha (float, optional): EWMA weight of each observed interval
+            margin (float, optional): Seconds after the expected publish to fetch
+        """
+        self.ttl = ttl
+        self.alpha = alpha
+        self.margin = margin
+        self.interval = None
+        self.source_time = None
+        self.freshness = None
+        self.mean_freshness = None
+        self.unchanged = 0
+        self.delay = ttl
+        self._lock = threading.Lock()
+
+    def observe(self, source_time, now=None):
+        """
+        Fold in one successful fetch and schedule the next one
+
+        Args:
+            source_time (float): When the upstream produced the fetched
+                data, Unix seconds, or None if the feed has no timestamp
+            now (float, optional): Fetch time, Unix seconds
+
+        Returns:
+            float: Seconds to wait before the next fetch
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            if source_time is None:
+                self.delay = self.ttl
+                return self.delay
+
+            if self.source_time is not None and source_time <= self.source_time:
+                # Nothing new yet: retry soon, then back off while the feed stalls
+                self.unchanged += 1
+                self.delay = min(SCHEDULE_RETRY_DELAY * 2 ** (self.unchanged - 1), SCHEDULE_MAX_BACKOFF)
+                return self.delay
+
+            if self.source_time is not None:
+                observed = source_time - self.source_time
+                if self.interval is None:
+                    self.interval = observed
+                else:
+                    # A gap spanning a stall would inflate the estimate, so one
+                    # observation can at most double it
+                    observed = min(observed, 2 * self.interval)
+                    self.interval += self.alpha * (observed - self.interval)
+            self.source_time = source_time
+            self.unchanged = 0
+
+            self.freshness = now - source_time
+            self.mean_freshness = self.freshness if self.mean_freshness is None else (
+                self.mean_freshness + self.alpha * (self.freshness - self.mean_freshness)
+            )
+
+            if self.interval is None:
+                # Probe until the next change: polling on the TTL would only
+                # ever see multiples of a faster cadence
+                self.delay = SCHEDULE_RETRY_DELAY
+            else:
+                expected = source_time + self.interval + self.margin
+                self.delay = min(max(expected - now, SCHEDULE_MIN_DELAY), self.ttl)
+            return self.delay
+
+    def stats(self):
+        """
+        Get the learned cadence
+
+        Returns:
+            dict: 'interval' (learned publish interval), 'sourceTime' (last
+                upstream timestamp), 'freshness' and 'meanFreshness' (seconds
+                from upstream publish to our fetch), 'age' (seconds since
+                the upstream produced the data now served), 'unchanged'
+                (fetches in a row without new data) and 'nextDelay', in seconds
+        """
+        with self._lock:
+            return {
+                'interval': _rounded(self.interval),
+                'sourceTime': self.source_time,
+                'age': _rounded(time.time() - self.source_time) if self.source_time is not None else None,
+                'freshness': _rounded(self.freshness),
+                'meanFreshness': _rounded(self.mean_freshness),
+                'unchanged': self.unchanged,
+                'nextDelay': _rounded(self.delay)
+            }
+
+def _rounded(value):
+    return round(value, 1) if value is not None else None
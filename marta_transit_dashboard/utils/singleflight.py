@@ -0,0 +1,105 @@
+"""
+Request coalescing utilities for the Simple MARTA App
+
+Concurrent callers asking for the same upstream feed share a single
+in-flight fetch and its result instead of each hitting the upstream API.
+"""
+
+import functools
+import threading
+
+class _Call:
+    """
+    One in-flight fetch shared by every caller of the same key
+    """
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one execution
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._stats = {}
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Run fn once for all concurrent callers of key
+
+        Args:
+            key (str): Coalescing key, e.g. the feed name
+            fn (callable): Function to run if no call for key is in flight
+            *args, **kwargs: Arguments passed to fn
+
+        Returns:
+            The result of the shared call. Callers must not mutate it.
+        """
+        with self._lock:
+            stats = self._stats.setdefault(key, {'calls': 0, 'executions': 0, 'coalesced': 0})
+            stats['calls'] += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                stats['executions'] += 1
+            else:
+                stats['coalesced'] += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    def stats(self):
+        """
+        Get per-key hit and coalesce counters
+
+        Returns:
+            dict: Key to {'calls', 'executions', 'coalesced', 'inFlight'}.
+                'executions' is the number of upstream fetches actually made.
+        """
+        with self._lock:
+            return {
+                key: dict(counts, inFlight=key in self._calls)
+                for key, counts in self._stats.items()
+            }
+
+# Shared coalescing group for all upstream feed fetches
+upstream_flights = SingleFlight()
+
+def coalesce(key):
+    """
+    Decorator that routes calls through the shared upstream SingleFlight
+
+    Args:
+        key (str): Coalescing key for the decorated fetch function
+
+    Returns:
+        callable: Decorator
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            return upstream_flights.do(key, fn, *args, **kwargs)
+        return wrapper
+    return decorator
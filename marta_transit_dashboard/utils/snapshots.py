@@ -0,0 +1,160 @@
+"""
+Snapshot store utilities for the Simple MARTA App
+
+The background poller publishes each upstream feed into a SnapshotStore.
+Request handlers only ever read from the store, so they never wait on the
+network.
+"""
+
+import threading
+import time
+from collections import namedtuple
+
+class Snapshot(namedtuple('Snapshot', ['feed', 'version', 'data', 'fetched_at', 'expires_at', 'primed'],
+                          defaults=(False,))):
+    """
+    Immutable, versioned view of one upstream feed
+
+    The version only moves forward when the feed content changes or live
+    data replaces a primed snapshot, so two snapshots with the same version
+    always carry the same data. ``primed`` is True for snapshots seeded
+    from the cache files before the first live fetch; they are not current
+    observations. Consumers must treat ``data`` as read-only.
+    """
+    __slots__ = ()
+
+    def age(self, now=None):
+        """
+        Seconds since the feed was last fetched
+
+        Args:
+            now (float, optional): Reference time. Defaults to time.time().
+
+        Returns:
+            float: Age of the snapshot in seconds
+        """
+        return (now or time.time()) - self.fetched_at
+
+    def time_to_refresh(self, now=None):
+        """
+        Seconds left until the poller is expected to refresh this feed
+
+        Args:
+            now (float, optional): Reference time. Defaults to time.time().
+
+        Returns:
+            float: Remaining seconds (never negative), or 0 if unknown
+        """
+        if self.expires_at is None:
+            return 0
+        return max(0.0, self.expires_at - (now or time.time()))
+
+def to_payload(data):
+    """
+    Convert snapshot data to its JSON-ready form at the API edge
+    
+    Feeds stored in a richer in-memory form (e.g. columnar bus positions)
+    provide a to_payload() method; plain dicts and lists pass through.
+    
+    Args:
+        data: Snapshot data
+        
+    Returns:
+        JSON-serializable payload
+    """
+    convert = getattr(data, 'to_payload', None)
+    return convert() if convert is not None else data
+
+class SnapshotStore:
+    """
+    Thread-safe holder of the latest snapshot for each feed
+
+    Publishing swaps in a new dict (copy-on-write), so readers get O(1)
+    lock-free lookups and ``snapshot_set`` always returns a consistent view
+    across feeds.
+    """
+
+    def __init__(self):
+        self._snapshots = {}
+        self._lock = threading.Lock()
+        self._listeners = []
+        self.epoch = int(time.time())
+
+    def get(self, feed):
+        """
+        Get the latest snapshot for a feed
+
+        Args:
+            feed (str): Feed name, e.g. 'trains'
+
+        Returns:
+            Snapshot: Latest snapshot, or None if nothing was published yet
+        """
+        return self._snapshots.get(feed)
+
+    def snapshot_set(self):
+        """
+        Get a consistent view of every feed at once
+
+        Returns:
+            dict: Feed name to Snapshot
+        """
+        return self._snapshots
+
+    def publish(self, feed, data, ttl=None, primed=False):
+        """
+        Publish new data for a feed
+
+        Args:
+            feed (str): Feed name
+            data: Feed payload. Must not be mutated after publishing.
+            ttl (float, optional): Seconds until the next expected refresh
+            primed (bool, optional): True when data was loaded from a cache
+                file rather than fetched
+
+        Returns:
+            Snapshot: The snapshot now current for the feed
+        """
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+
+        with self._lock:
+            previous = self._snapshots.get(feed)
+            # The first live fetch always makes a new version, even when it
+            # matches the primed data, so listeners see a live observation
+            changed = (
+                previous is None
+                or (previous.primed and not primed)
+                or previous.data != data
+            )
+
+            if changed:
+                version = previous.version + 1 if previous else 1
+                snapshot = Snapshot(feed, version, data, now, expires_at, primed)
+            else:
+                # Same content: keep the version, just record the fresh fetch
+                snapshot = previous._replace(fetched_at=now, expires_at=expires_at)
+
+            snapshots = dict(self._snapshots)
+            snapshots[feed] = snapshot
+            self._snapshots = snapshots
+
+        if changed:
+            for listener in list(self._listeners):
+                try:
+                    listener(previous, snapshot)
+                except Exception as e:
+                    print(f"Error in snapshot listener for {feed}: {e}")
+
+        return snapshot
+
+    def subscribe(self, listener):
+        """
+        Register a callback for new snapshot versions
+
+        Args:
+            listener (callable): Called as listener(previous, snapshot) each
+                time a feed publishes a new version. ``previous`` is None for
+                the first snapshot of a feed.
+        """
+        self._listeners.append(listener)
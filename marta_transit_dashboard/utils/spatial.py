@@ -0,0 +1,237 @@
+"""
+Spatial index utilities for the Simple MARTA App
+
+A uniform lat/lon grid over the live bus positions. Each vehicle
+positions snapshot is binned in one vectorized pass: every vehicle gets
+the key of its cell and the rows are sorted by key. Nearest-vehicle and
+bounding-box queries binary-search the runs of the cells overlapping the
+search area, so their cost depends on local density, not fleet size.
+"""
+
+import math
+import os
+import sys
+import threading
+
+import numpy as np
+
+# Add parent directory to import path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import SPATIAL_CELL_SIZE
+
+# Mean Earth radius in meters, for haversine distances
+EARTH_RADIUS_M = 6371008.8
+
+# Meters per degree of latitude
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_M / 180
+
+# Added to grid rows so they fit the low 32 bits of a cell key
+CELL_ROW_OFFSET = 1 << 31
+
+def haversine_m(lat, lon, lats, lons):
+    """
+    Great-circle distance from one point to many
+
+    Args:
+        lat (float): Origin latitude
+        lon (float): Origin longitude
+        lats (numpy.ndarray): Target latitudes
+        lons (numpy.ndarray): Target longitudes
+
+    Returns:
+        numpy.ndarray: Distances in meters
+    """
+    lat1, lat2 = np.radians(lat), np.radians(lats)
+    dlat = lat2 - lat1
+    dlon = np.radians(lons - lon)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+def cell_key(cell_x, cell_y):
+    """
+    Sortable int64 key of grid cells
+
+    Args:
+        cell_x (numpy.ndarray or int): Grid columns
+        cell_y (numpy.ndarray or int): Grid rows
+
+    Returns:
+        numpy.ndarray or int: Column in the high 32 bits, row (offset to be
+            non-negative) in the low 32 bits, so keys sort by column, then row
+    """
+    return (cell_x << 32) + (cell_y + CELL_ROW_OFFSET)
+
+class SpatialGrid:
+    """
+    Grid index over one vehicle positions feed, rebuilt per snapshot
+    """
+
+    def __init__(self, feed='bus_positions', cell_size=SPATIAL_CELL_SIZE):
+        """
+        Args:
+            feed (str, optional): Feed to index
+            cell_size (float, optional): Cell edge in degrees
+        """
+        self.feed = feed
+        self.cell_size = cell_size
+        self.columns = None
+        self.version = None
+        self._keys = np.empty(0, dtype=np.int64)
+        self._rows = np.empty(0, dtype=np.int64)
+        self._cells = 0
+        self._lock = threading.Lock()
+
+    def cell_of(self, lat, lon):
+        """
+        Grid cell containing a point
+
+        Returns:
+            tuple: (column, row) cell coordinates
+        """
+        return (math.floor(lon / self.cell_size), math.floor(lat / self.cell_size))
+
+    def update(self, columns, version=None):
+        """
+        Index a new positions snapshot
+
+        Every located vehicle gets the int64 key of its cell, and the rows
+        are sorted by key, so each grid column's cells are one contiguous
+        run that queries find by binary search.
+
+        Args:
+            columns (VehiclePositionColumns): New snapshot
+            version (int, optional): Snapshot version being indexed
+
+        Returns:
+            int: Number of vehicles indexed
+        """
+        lat, lon = columns.rows['lat'], columns.rows['lon']
+        # Vehicles reported without a position are not indexed
+        located = np.flatnonzero(np.isfinite(lat) & np.isfinite(lon))
+        cell_x = np.floor(lon[located] / self.cell_size).astype(np.int64)
+        cell_y = np.floor(lat[located] / self.cell_size).astype(np.int64)
+        keys = cell_key(cell_x, cell_y)
+
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        cells = int(np.count_nonzero(np.diff(keys))) + 1 if len(keys) else 0
+
+        with self._lock:
+            self._keys = keys
+            self._rows = located[order]
+            self._cells = cells
+            self.columns = columns
+            self.version = version
+        return len(keys)
+
+    def on_publish(self, previous, snapshot):
+        """
+        SnapshotStore listener: index every new positions snapshot
+
+        Args:
+            previous (Snapshot): Previous snapshot of the feed, or None
+            snapshot (Snapshot): Newly published snapshot
+        """
+        if snapshot.feed == self.feed:
+            self.update(snapshot.data, snapshot.version)
+
+    def nearest(self, lat, lon, radius, limit):
+        """
+        Find the vehicles closest to a point
+
+        Args:
+            lat (float): Latitude of the point
+            lon (float): Longitude of the point
+            radius (float): Search radius in meters
+            limit (int): Maximum number of vehicles to return
+
+        Returns:
+            tuple: (VehiclePositionColumns of the matches, nearest first,
+                distances in meters, indexed version), or (None, [], None)
+                if nothing was indexed yet
+        """
+        lat_span = radius / METERS_PER_DEGREE
+        lon_span = radius / (METERS_PER_DEGREE * max(math.cos(math.radians(lat)), 1e-6))
+        min_x, min_y = self.cell_of(lat - lat_span, lon - lon_span)
+        max_x, max_y = self.cell_of(lat + lat_span, lon + lon_span)
+
+        with self._lock:
+            columns, version = self.columns, self.version
+            if columns is None:
+                return None, [], None
+            candidates = self._candidates(min_x, min_y, max_x, max_y)
+
+        distances = haversine_m(lat, lon, columns.rows['lat'][candidates], columns.rows['lon'][candidates])
+        inside = distances <= radius
+        candidates, distances = candidates[inside], distances[inside]
+
+        if len(candidates) > limit:
+            keep = np.argpartition(distances, limit)[:limit]
+            candidates, distances = candidates[keep], distances[keep]
+        order = np.argsort(distances, kind='stable')
+        return columns.take(candidates[order]), distances[order].tolist(), version
+
+    def _candidates(self, min_x, min_y, max_x, max_y):
+        """
+        Rows of the indexed snapshot in a range of cells (lock held)
+
+        Returns:
+            numpy.ndarray: Row indices, in no particular order
+        """
+        keys = self._keys
+        if not len(keys):
+            return np.empty(0, dtype=np.int64)
+        # Only grid columns that hold vehicles can contribute
+        min_x = max(min_x, int(keys[0] >> 32))
+        max_x = min(max_x, int(keys[-1] >> 32))
+        if min_x > max_x:
+            return np.empty(0, dtype=np.int64)
+
+        grid_columns = np.arange(min_x, max_x + 1, dtype=np.int64)
+        starts = np.searchsorted(keys, cell_key(grid_columns, min_y), side='left')
+        lengths = np.searchsorted(keys, cell_key(grid_columns, max_y), side='right') - starts
+        # Concatenate the runs [start, start + length) without a Python loop
+        skips = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        return self._rows[np.arange(int(lengths.sum())) + skips]
+
+    def within(self, columns, bbox):
+        """
+        Rows of a snapshot inside a bounding box
+
+        Served from the grid when columns is the indexed snapshot; any
+        other snapshot (e.g. one replaced mid-request) is scanned instead.
+
+        Args:
+            columns (VehiclePositionColumns): Snapshot to select from
+            bbox (tuple): (min_lon, min_lat, max_lon, max_lat)
+
+        Returns:
+            numpy.ndarray: Row indices in feed order
+        """
+        min_lon, min_lat, max_lon, max_lat = bbox
+        min_x, min_y = self.cell_of(min_lat, min_lon)
+        max_x, max_y = self.cell_of(max_lat, max_lon)
+
+        with self._lock:
+            if columns is not self.columns:
+                return np.flatnonzero(columns.bbox_mask(*bbox))
+            candidates = self._candidates(min_x, min_y, max_x, max_y)
+
+        lat, lon = columns.rows['lat'][candidates], columns.rows['lon'][candidates]
+        inside = (lon >= min_lon) & (lon <= max_lon) & (lat >= min_lat) & (lat <= max_lat)
+        return np.sort(candidates[inside])
+
+    def stats(self):
+        """
+        Get index counters
+
+        Returns:
+            dict: Indexed vehicles, occupied cells and indexed version
+        """
+        with self._lock:
+            return {
+                'vehicles': len(self._keys),
+                'cells': self._cells,
+                'version': self.version
+            }
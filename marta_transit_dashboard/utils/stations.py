@@ -0,0 +1,256 @@
+"""
+Rail station utilities for the Simple MARTA App
+
+A registry of MARTA rail stations with stable ids, the canonical names
+used by the rail feed, the short names used on the dashboard map, common
+aliases and coordinates. Names are normalized before lookup, so "FIVE
+POINTS STATION", "Five Points" and "five-points" all resolve to the same
+station.
+
+Each rail poll is indexed once by station: every station maps to its
+predicted arrivals, soonest first, so arrival boards are answered in time
+proportional to the result.
+"""
+
+import os
+import re
+import sys
+import threading
+
+import numpy as np
+
+# Add parent directory to import path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.train_data import as_arrival_batch
+
+# (id, feed name, map name, lines, latitude, longitude, aliases)
+STATIONS = (
+    ('north-springs', 'NORTH SPRINGS STATION', 'NORTH SPRINGS', ('RED',), 33.9455, -84.3561, ()),
+    ('sandy-springs', 'SANDY SPRINGS STATION', 'SANDY SPRINGS', ('RED',), 33.9321, -84.3513, ()),
+    ('dunwoody', 'DUNWOODY STATION', 'DUNWOODY', ('RED',), 33.9212, -84.3437, ()),
+    ('medical-center', 'MEDICAL CENTER STATION', 'MEDICAL CENTER', ('RED',), 33.9103, -84.3515, ()),
+    ('buckhead', 'BUCKHEAD STATION', 'BUCKHEAD', ('RED',), 33.8465, -84.3671, ()),
+    ('doraville', 'DORAVILLE STATION', 'DORAVILLE', ('GOLD',), 33.9028, -84.2799, ()),
+    ('chamblee', 'CHAMBLEE STATION', 'CHAMBLEE', ('GOLD',), 33.8879, -84.3062, ()),
+    ('brookhaven', 'BROOKHAVEN STATION', 'BROOKHAVEN', ('GOLD',), 33.8600, -84.3390,
+     ('BROOKHAVEN/OGLETHORPE', 'OGLETHORPE')),
+    ('lenox', 'LENOX STATION', 'LENOX', ('GOLD',), 33.8465, -84.3566, ('LENOX SQUARE',)),
+    ('lindbergh-center', 'LINDBERGH STATION', 'LINDBERGH CENTER', ('RED', 'GOLD'), 33.8231, -84.3692,
+     ('LINDBERGH',)),
+    ('arts-center', 'ARTS CENTER STATION', 'ARTS CENTER', ('RED', 'GOLD'), 33.7893, -84.3871,
+     ('WOODRUFF ARTS CENTER',)),
+    ('midtown', 'MIDTOWN STATION', 'MIDTOWN', ('RED', 'GOLD'), 33.7812, -84.3862, ()),
+    ('north-avenue', 'NORTH AVE STATION', 'NORTH AVENUE', ('RED', 'GOLD'), 33.7712, -84.3869,
+     ('NORTH AVE',)),
+    ('civic-center', 'CIVIC CENTER STATION', 'CIVIC CENTER', ('RED', 'GOLD'), 33.7663, -84.3872, ()),
+    ('peachtree-center', 'PEACHTREE CENTER STATION', 'PEACHTREE CENTER', ('RED', 'GOLD'), 33.7590, -84.3876,
+     ('PEACHTREE CTR',)),
+    ('five-points', 'FIVE POINTS STATION', 'FIVE POINTS', ('RED', 'GOLD', 'GREEN', 'BLUE'), 33.7542, -84.3919, ()),
+    ('garnett', 'GARNETT STATION', 'GARNETT', ('RED', 'GOLD'), 33.7480, -84.3952, ()),
+    ('west-end', 'WEST END STATION', 'WEST END', ('RED', 'GOLD'), 33.7352, -84.4132, ()),
+    ('oakland-city', 'OAKLAND CITY STATION', 'OAKLAND CITY', ('RED', 'GOLD'), 33.7163, -84.4255, ()),
+    ('lakewood', 'LAKEWOOD STATION', 'LAKEWOOD', ('RED', 'GOLD'), 33.7002, -84.4297,
+     ('LAKEWOOD/FT. MCPHERSON', 'FORT MCPHERSON')),
+    ('east-point', 'EAST POINT STATION', 'EAST POINT', ('RED', 'GOLD'), 33.6768, -84.4408, ()),
+    ('college-park', 'COLLEGE PARK STATION', 'COLLEGE PARK', ('RED', 'GOLD'), 33.6513, -84.4488, ()),
+    ('airport', 'AIRPORT STATION', 'AIRPORT', ('RED', 'GOLD'), 33.6407, -84.4444,
+     ('HARTSFIELD', 'HARTSFIELD-JACKSON', 'ATL AIRPORT')),
+    ('bankhead', 'BANKHEAD STATION', 'BANKHEAD', ('GREEN',), 33.7723, -84.4289, ()),
+    ('hamilton-e-holmes', 'HAMILTON E HOLMES STATION', 'HAMILTON E HOLMES', ('BLUE',), 33.7547, -84.4697,
+     ('H.E. HOLMES', 'HE HOLMES')),
+    ('west-lake', 'WEST LAKE STATION', 'WEST LAKE', ('BLUE',), 33.7536, -84.4452, ()),
+    ('ashby', 'ASHBY STATION', 'ASHBY', ('GREEN', 'BLUE'), 33.7562, -84.4170, ()),
+    ('vine-city', 'VINE CITY STATION', 'VINE CITY', ('GREEN', 'BLUE'), 33.7563, -84.4044, ()),
+    ('omni', 'OMNI DOME STATION', 'OMNI', ('GREEN', 'BLUE'), 33.7592, -84.3977,
+     ('OMNI DOME', 'CNN CENTER', 'STATE FARM ARENA', 'MERCEDES-BENZ STADIUM')),
+    ('georgia-state', 'GEORGIA STATE STATION', 'GEORGIA STATE', ('GREEN', 'BLUE'), 33.7502, -84.3863, ('GSU',)),
+    ('king-memorial', 'KING MEMORIAL STATION', 'KING MEMORIAL', ('GREEN', 'BLUE'), 33.7501, -84.3755, ('MLK',)),
+    ('inman-park', 'INMAN PARK STATION', 'INMAN PARK', ('GREEN', 'BLUE'), 33.7570, -84.3524,
+     ('INMAN PARK/REYNOLDSTOWN', 'REYNOLDSTOWN')),
+    ('edgewood-candler-park', 'EDGEWOOD CANDLER PARK STATION', 'EDGEWOOD', ('GREEN', 'BLUE'), 33.7619, -84.3398,
+     ('EDGEWOOD/CANDLER PARK', 'CANDLER PARK')),
+    ('east-lake', 'EAST LAKE STATION', 'EAST LAKE', ('BLUE',), 33.7650, -84.3121, ()),
+    ('decatur', 'DECATUR STATION', 'DECATUR', ('BLUE',), 33.7748, -84.2952, ()),
+    ('avondale', 'AVONDALE STATION', 'AVONDALE', ('BLUE',), 33.7753, -84.2808, ()),
+    ('kensington', 'KENSINGTON STATION', 'KENSINGTON', ('BLUE',), 33.7720, -84.2499, ()),
+    ('indian-creek', 'INDIAN CREEK STATION', 'INDIAN CREEK', ('BLUE',), 33.7699, -84.2291, ())
+)
+
+def normalize_station_name(name):
+    """
+    Normalize a station name or id for lookup
+
+    Args:
+        name (str): Station name, alias or id, in any case
+
+    Returns:
+        str: Upper-case words separated by single spaces, without a
+            trailing "STATION"
+    """
+    words = re.sub(r'[^A-Z0-9]+', ' ', name.upper()).split()
+    if len(words) > 1 and words[-1] == 'STATION':
+        words.pop()
+    return ' '.join(words)
+
+class StationRegistry:
+    """
+    Stations by id, with every name and alias resolvable to an id
+
+    The registry is fixed at construction; feed names it cannot resolve
+    are never added, so it is safe to share between apps.
+    """
+
+    def __init__(self, stations=STATIONS):
+        """
+        Args:
+            stations (iterable, optional): (id, feed name, map name, lines,
+                latitude, longitude, aliases) tuples
+        """
+        self._stations = {}
+        self._names = {}
+        for station_id, name, map_name, lines, lat, lon, aliases in stations:
+            self._add({
+                'id': station_id,
+                'name': name,
+                'mapName': map_name,
+                'lines': list(lines),
+                'lat': lat,
+                'lon': lon,
+                'aliases': list(aliases)
+            })
+
+    def _add(self, station):
+        self._stations[station['id']] = station
+        for name in [station['id'], station['name'], station['mapName']] + station['aliases']:
+            self._names.setdefault(normalize_station_name(name), station['id'])
+
+    def resolve(self, name):
+        """
+        Find the station id for a name, alias or id
+
+        Args:
+            name (str): Station name, alias or id
+
+        Returns:
+            str: Station id, or None if unknown
+        """
+        if not name:
+            return None
+        return self._names.get(normalize_station_name(name))
+
+    def get(self, station_id):
+        """
+        Get one station
+
+        Returns:
+            dict: 'id', 'name', 'mapName', 'lines', 'lat', 'lon' and 'aliases',
+                or None if unknown
+        """
+        return self._stations.get(station_id)
+
+    def all(self):
+        """
+        Get every station
+
+        Returns:
+            list: Station dicts in registry order
+        """
+        return list(self._stations.values())
+
+class StationBoard:
+    """
+    Per-poll index of rail arrivals by station
+    """
+
+    def __init__(self, registry=None, feed='trains'):
+        """
+        Args:
+            registry (StationRegistry, optional): Station registry. Defaults
+                to the shared one.
+            feed (str, optional): Rail feed to index
+        """
+        self.registry = registry or stations
+        self.feed = feed
+        self.batch = None
+        self._index = {}
+        self._unknown = set()
+        self._lock = threading.Lock()
+
+    def build(self, batch):
+        """
+        Index one rail poll by station
+
+        Arrivals at stations the registry cannot resolve are left out,
+        and each such name is logged once.
+
+        Args:
+            batch (ArrivalBatch): Parsed rail poll
+
+        Returns:
+            dict: Station id to row indices, soonest arrival first
+        """
+        # Soonest first; arrivals without a waiting time go last
+        order = np.lexsort((batch.waiting, np.isnan(batch.waiting)))
+
+        index = {}
+        resolved = {}
+        arrivals = batch.arrivals
+        for row in order.tolist():
+            arrival = arrivals[row]
+            name = arrival.station
+            if not name:
+                continue
+            if name not in resolved:
+                resolved[name] = self.registry.resolve(name)
+                if resolved[name] is None and name not in self._unknown:
+                    self._unknown.add(name)
+                    print(f"Unknown station in rail feed: {name}")
+            station_id = resolved[name]
+            if station_id is not None:
+                index.setdefault(station_id, []).append(row)
+        return {station_id: tuple(rows) for station_id, rows in index.items()}
+
+    def on_publish(self, previous, snapshot):
+        """
+        SnapshotStore listener: index every new rail poll
+
+        Args:
+            previous (Snapshot): Previous snapshot of the feed, or None
+            snapshot (Snapshot): Newly published snapshot
+        """
+        if snapshot.feed != self.feed:
+            return
+        batch = as_arrival_batch(snapshot.data)
+        index = self.build(batch)
+        with self._lock:
+            self.batch = batch
+            self._index = index
+
+    def arrivals(self, train_data, station_id, limit=None):
+        """
+        Predicted arrivals at one station, soonest first
+
+        Served from the index when train_data is the indexed poll; any
+        other poll is indexed on the spot.
+
+        Args:
+            train_data (ArrivalBatch or list): Rail poll
+            station_id (str): Station id
+            limit (int, optional): Maximum number of arrivals
+
+        Returns:
+            list: Raw /traindata records
+        """
+        with self._lock:
+            index = self._index if train_data is self.batch else None
+        batch = as_arrival_batch(train_data)
+        if index is None:
+            index = self.build(batch)
+        rows = index.get(station_id, ())
+        if limit is not None:
+            rows = rows[:limit]
+        return [batch.raw[row] for row in rows]
+
+# Shared registry of MARTA rail stations
+stations = StationRegistry()
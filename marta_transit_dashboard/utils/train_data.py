@@ -4,75 +4,351 @@ Train data utilities for the Simple MARTA App
 
 import json
 import os
-import requests
 import sys
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import numpy as np
 
 # Add parent directory to import path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from config.config import (
+    ATLANTA_TIMEZONE,
     MARTA_TRAIN_API_URL,
     MARTA_TRAIN_API_KEY,
     TRAIN_CACHE_FILE
 )
+from utils.ingest import FeedSource, fetch_source
+from utils.persistence import cache_writer
+from utils.singleflight import coalesce
+from utils.train_status import DelayColumns, parse_floats, status_from_columns
+
+# Formats of the rail feed's local timestamps
+EVENT_TIME_FORMAT = '%m/%d/%Y %I:%M:%S %p'
+NEXT_ARR_FORMAT = '%m/%d/%Y %I:%M:%S %p'
+
+_TIMEZONE = ZoneInfo(ATLANTA_TIMEZONE)
+
+# Record fields of the /traindata API that ?fields= can select
+TRAIN_FIELDS = (
+    'DESTINATION', 'DIRECTION', 'EVENT_TIME', 'IS_REALTIME', 'LINE', 'NEXT_ARR',
+    'STATION', 'TRAIN_ID', 'WAITING_SECONDS', 'WAITING_TIME', 'DELAY',
+    'LATITUDE', 'LONGITUDE'
+)
+
+class Arrival:
+    """
+    One predicted train arrival at one station, with typed fields
+    """
+    __slots__ = (
+        'line', 'station', 'destination', 'direction', 'train_id',
+        'delay', 'waiting_seconds', 'event_time', 'next_arrival',
+        'latitude', 'longitude', 'is_realtime'
+    )
+
+    def __init__(self, line, station, destination, direction, train_id,
+                 delay, waiting_seconds, event_time, next_arrival,
+                 latitude, longitude, is_realtime):
+        """
+        Args:
+            line, station, destination, direction, train_id (str): Interned labels
+            delay (int): Seconds late (negative = early), or None
+            waiting_seconds (int): Seconds until arrival, or None
+            event_time (float): Prediction time, Unix seconds, or None
+            next_arrival (float): Predicted arrival, Unix seconds, or None
+            latitude, longitude (float): Train position, or None
+            is_realtime (bool): True for live (not scheduled) predictions
+        """
+        self.line = line
+        self.station = station
+        self.destination = destination
+        self.direction = direction
+        self.train_id = train_id
+        self.delay = delay
+        self.waiting_seconds = waiting_seconds
+        self.event_time = event_time
+        self.next_arrival = next_arrival
+        self.latitude = latitude
+        self.longitude = longitude
+        self.is_realtime = is_realtime
+
+class ArrivalBatch:
+    """
+    One poll of the rail feed, parsed once
+
+    Holds the typed Arrival records, NumPy columns for vectorized analytics
+    and the raw records, which are what the API serves, so nothing
+    downstream parses the feed's strings again.
+    """
+
+    def __init__(self, records):
+        """
+        Args:
+            records (list): Train arrival dicts from the /traindata API
+        """
+        self.raw = records
+        self._by_longitude = None
+
+        interned = {}
+        def intern(value):
+            return interned.setdefault(value, value) if value else None
+
+        groups = {}
+        codes = []
+        labels = []
+        delays, waits, latitudes, longitudes, event_texts, next_texts = [], [], [], [], [], []
+        for record in records:
+            line = intern(record.get('LINE'))
+            direction = intern(record.get('DIRECTION'))
+            key = (line, direction)
+            code = groups.get(key)
+            if code is None:
+                code = groups[key] = len(groups)
+            codes.append(code)
+            labels.append((
+                line,
+                intern(record.get('STATION')),
+                intern(record.get('DESTINATION')),
+                direction,
+                intern(record.get('TRAIN_ID')),
+                record.get('IS_REALTIME') == 'true'
+            ))
+            delays.append(record.get('DELAY'))
+            waits.append(record.get('WAITING_SECONDS'))
+            latitudes.append(record.get('LATITUDE'))
+            longitudes.append(record.get('LONGITUDE'))
+            event_texts.append(record.get('EVENT_TIME'))
+            next_texts.append(record.get('NEXT_ARR'))
+
+        self.groups = list(groups)
+        self.codes = np.array(codes, dtype=np.int32)
+        self.delay = parse_floats(delays, 'T', 'S')
+        self.waiting = parse_floats(waits)
+        self.latitude = parse_floats(latitudes)
+        self.longitude = parse_floats(longitudes)
+        self.event_time, self.next_arrival = _parse_times(event_texts, next_texts)
+
+        self.arrivals = tuple(
+            Arrival(
+                line, station, destination, direction, train_id,
+                _optional_int(delay), _optional_int(waiting), _optional(event_time),
+                _optional(next_arrival), _optional(latitude), _optional(longitude),
+                is_realtime
+            )
+            for (line, station, destination, direction, train_id, is_realtime),
+                delay, waiting, event_time, next_arrival, latitude, longitude
+            in zip(
+                labels, self.delay.tolist(), self.waiting.tolist(), self.event_time.tolist(),
+                self.next_arrival.tolist(), self.latitude.tolist(), self.longitude.tolist()
+            )
+        )
+
+    @property
+    def columns(self):
+        """DelayColumns: Delay columns for the train status engine"""
+        return DelayColumns(self.groups, self.codes, self.delay, self.waiting)
+
+    def __len__(self):
+        return len(self.arrivals)
+
+    def __iter__(self):
+        return iter(self.arrivals)
+
+    def __eq__(self, other):
+        if not isinstance(other, ArrivalBatch):
+            return NotImplemented
+        return self.raw == other.raw
+
+    def within(self, bbox):
+        """
+        Arrivals whose train position is inside a bounding box
+
+        Positions are indexed by longitude on first use, so each query is
+        a binary search plus a latitude test on the matching slice.
+
+        Args:
+            bbox (tuple): (min_lon, min_lat, max_lon, max_lat)
+
+        Returns:
+            numpy.ndarray: Row indices in feed order
+        """
+        if self._by_longitude is None:
+            # NaN (missing) positions sort last and never match
+            order = np.argsort(self.longitude, kind='stable')
+            self._by_longitude = (order, self.longitude[order])
+        order, ordered = self._by_longitude
+        min_lon, min_lat, max_lon, max_lat = bbox
+        first = np.searchsorted(ordered, min_lon, side='left')
+        last = np.searchsorted(ordered, max_lon, side='right')
+        candidates = order[first:last]
+        lat = self.latitude[candidates]
+        return np.sort(candidates[(lat >= min_lat) & (lat <= max_lat)])
+
+    def to_payload(self, rows=None, fields=None):
+        """
+        Get the records in the /traindata JSON shape served by the API
+
+        Args:
+            rows (iterable, optional): Row indices to include. Defaults to all.
+            fields (iterable, optional): TRAIN_FIELDS to keep in each record.
+                Defaults to every field.
+
+        Returns:
+            list: The raw records this batch was parsed from
+        """
+        records = self.raw if rows is None else [self.raw[row] for row in rows]
+        if fields is None:
+            return records
+        return [{field: record[field] for field in fields if field in record} for record in records]
+
+def as_arrival_batch(train_data):
+    """
+    Wrap raw train records in an ArrivalBatch (batches pass through)
+
+    Args:
+        train_data (list or ArrivalBatch): Train data
+
+    Returns:
+        ArrivalBatch: Parsed batch
+    """
+    if isinstance(train_data, ArrivalBatch):
+        return train_data
+    return ArrivalBatch(train_data)
+
+def _optional(value):
+    return None if value != value else value
+
+def _optional_int(value):
+    return None if value != value else int(value)
+
+def _parse_times(event_texts, next_texts):
+    """
+    Parse EVENT_TIME and NEXT_ARR strings to Unix seconds
 
+    A poll only has a handful of distinct timestamps, so each distinct
+    string is parsed once. NEXT_ARR has no date; it takes the date of
+    EVENT_TIME and rolls over to the next day when it would be more than
+    12 hours in the past.
+
+    Returns:
+        tuple: (event times, next arrivals) as float arrays, NaN if missing
+    """
+    parsed_events = {}
+    parsed_next = {}
+    events = np.full(len(event_texts), np.nan)
+    arrivals = np.full(len(event_texts), np.nan)
+
+    for i, (event_text, next_text) in enumerate(zip(event_texts, next_texts)):
+        if not event_text:
+            continue
+        event = parsed_events.get(event_text)
+        if event is None:
+            try:
+                event = datetime.strptime(event_text, EVENT_TIME_FORMAT).replace(tzinfo=_TIMEZONE)
+            except ValueError:
+                event = False
+            parsed_events[event_text] = event
+        if event is False:
+            continue
+        events[i] = event.timestamp()
+
+        if not next_text:
+            continue
+        key = (event.date(), next_text)
+        arrival = parsed_next.get(key)
+        if arrival is None:
+            try:
+                arrival = datetime.strptime(
+                    f"{event:%m/%d/%Y} {next_text}", NEXT_ARR_FORMAT
+                ).replace(tzinfo=_TIMEZONE)
+                if arrival < event - timedelta(hours=12):
+                    arrival += timedelta(days=1)
+                arrival = arrival.timestamp()
+            except ValueError:
+                arrival = np.nan
+            parsed_next[key] = arrival
+        arrivals[i] = arrival
+
+    return events, arrivals
+
+def parse_train_response(content):
+    """
+    Parse a /traindata response body and cache it
+    
+    Args:
+        content (bytes): JSON response body
+        
+    Returns:
+        ArrivalBatch: Parsed train data
+    """
+    data = json.loads(content)
+    
+    # Cache the data for future use (written in the background)
+    cache_writer.submit(TRAIN_CACHE_FILE, data)
+    
+    return ArrivalBatch(data)
+
+@coalesce('trains')
 def get_marta_train_data():
     """
     Get real-time MARTA train data
     
     Returns:
-        list: Train data with position, status, etc.
+        ArrivalBatch: Parsed train data with position, status, etc.
     """
-    try:
-        headers = {'accept': 'application/json'}
-        params = {'apiKey': MARTA_TRAIN_API_KEY}
-        
-        response = requests.get(
-            MARTA_TRAIN_API_URL, 
-            headers=headers, 
-            params=params, 
-            verify=True
-        )
-        
-        if response.status_code == 200:
-            data = response.json()
-            
-            # Cache the data for future use
-            os.makedirs(os.path.dirname(TRAIN_CACHE_FILE), exist_ok=True)
-            with open(TRAIN_CACHE_FILE, 'w') as f:
-                json.dump(data, f)
-                
-            return data
-        else:
-            print(f"Failed to get train data: {response.status_code}")
-            return get_train_data_fallback()
-    except Exception as e:
-        print(f"Error fetching train data: {e}")
-        return get_train_data_fallback()
+    return fetch_source(TRAIN_SOURCE)
 
 def get_train_data_fallback():
     """
     Return cached train data if the API is unavailable
     
     Returns:
-        list: Train data from cache, or empty list if no cache
+        ArrivalBatch: Train data from cache, or an empty batch if no cache
     """
     try:
         if os.path.exists(TRAIN_CACHE_FILE):
             with open(TRAIN_CACHE_FILE, 'r') as f:
-                return json.load(f)
+                return ArrivalBatch(json.load(f))
     except Exception as e:
         print(f"Error reading train cache: {e}")
     
     # If all else fails, return empty array
-    return []
+    return ArrivalBatch([])
+
+def train_feed_timestamp(train_data):
+    """
+    When the rail feed produced a poll: its newest EVENT_TIME
+    
+    Args:
+        train_data (ArrivalBatch): Rail poll
+        
+    Returns:
+        float: Unix seconds, or None if no arrival has an event time
+    """
+    event_time = as_arrival_batch(train_data).event_time
+    event_time = event_time[~np.isnan(event_time)]
+    return float(event_time.max()) if len(event_time) else None
 
-def get_train_status(train_data=None):
+# How the poller and get_marta_train_data obtain the rail feed
+TRAIN_SOURCE = FeedSource(
+    'trains',
+    get_train_data_fallback,
+    url=MARTA_TRAIN_API_URL,
+    parse=parse_train_response,
+    params={'apiKey': MARTA_TRAIN_API_KEY},
+    headers={'accept': 'application/json'},
+    timestamp=train_feed_timestamp
+)
+
+def get_train_status(train_data=None, trends=None):
     """
     Calculate the status of MARTA train lines based on delays
     
     Args:
-        train_data (list, optional): Train data to analyze. If None, fetches new data.
+        train_data (ArrivalBatch, optional): Train data to analyze. If None, fetches new data.
+        trends (DelayTrends, optional): Tracker fed by the snapshot store;
+            its rolling delays are added as 'trend' when given
         
     Returns:
         dict: Status information for train lines
@@ -80,51 +356,10 @@ def get_train_status(train_data=None):
     if train_data is None:
         train_data = get_marta_train_data()
     
-    # Default status
-    train_status = {
-        'status': 'On Time',
-        'details': 'All lines operating normally',
-        'affectedLines': []
-    }
-    
-    # Count delays by line
-    delays_by_line = {}
-    for train in train_data:
-        if 'DELAY' in train and train['DELAY'].startswith('T'):
-            line = train['LINE']
-            try:
-                delay_seconds = train['DELAY'][1:-1]  # Remove 'T' prefix and 'S' suffix
-                delay_value = int(delay_seconds)
-                if abs(delay_value) > 300:  # More than 5 minutes
-                    if line not in delays_by_line:
-                        delays_by_line[line] = []
-                    delays_by_line[line].append(abs(delay_value))
-            except ValueError:
-                pass
-    
-    # Check if any line has delays
-    if delays_by_line:
-        affected_lines = []
-        details = []
-        
-        for line, delays in delays_by_line.items():
-            avg_delay = sum(delays) / len(delays)
-            minutes = round(avg_delay / 60)
-            
-            if minutes >= 5:
-                affected_lines.append({
-                    'line': line,
-                    'delay': f'{minutes} minutes'
-                })
-                details.append(f"{line} Line: {minutes} minute delays")
-        
-        if affected_lines:
-            if any(d['delay'].startswith(('10', '11', '12', '13', '14', '15')) for d in affected_lines):
-                train_status['status'] = 'Major Delays'
-            else:
-                train_status['status'] = 'Minor Delays'
-            
-            train_status['details'] = ', '.join(details)
-            train_status['affectedLines'] = affected_lines
+    # Reuse the columns parsed when the poll was ingested
+    train_status = status_from_columns(as_arrival_batch(train_data).columns)
     
-    return train_status 
\ No newline at end of file
+    # Rolling windows are maintained as polls land; this is just a reference
+    if trends is not None:
+        train_status['trend'] = trends.trend()
+    return train_status
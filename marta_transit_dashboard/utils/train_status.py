@@ -0,0 +1,211 @@
+"""
+Train delay analytics utilities for the Simple MARTA App
+
+Parses numeric rail feed fields such as DELAY and WAITING_SECONDS into
+NumPy arrays in one call, computes per-line and per-direction delay
+distributions with vectorized group statistics, and derives the system
+status from numeric thresholds.
+"""
+
+import os
+import sys
+from collections import namedtuple
+
+import numpy as np
+
+# Add parent directory to import path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import DELAY_AFFECTED_THRESHOLD, DELAY_MAJOR_THRESHOLD
+
+# One rail snapshot as columns: group labels per (line, direction) plus
+# delay and waiting seconds (NaN where missing or malformed)
+DelayColumns = namedtuple('DelayColumns', ['groups', 'codes', 'delay', 'waiting'])
+
+def parse_floats(values, prefix='', suffix=''):
+    """
+    Parse numeric strings such as "T146S", "110" or "33.75" to floats
+
+    The values are converted by NumPy in one call; only if that fails (a
+    malformed value) is each value parsed individually.
+
+    Args:
+        values (list): Raw strings (None allowed)
+        prefix (str, optional): Required leading marker, e.g. 'T'
+        suffix (str, optional): Required trailing marker, e.g. 'S'
+
+    Returns:
+        numpy.ndarray: Floats, NaN where missing or malformed
+    """
+    start, end = len(prefix), -len(suffix) or None
+    texts = [
+        value[start:end] if value and value.startswith(prefix) and value.endswith(suffix) else 'nan'
+        for value in values
+    ]
+    if not texts:
+        return np.empty(0)
+
+    try:
+        return np.array(texts, dtype=float)
+    except ValueError:
+        pass
+
+    parsed = np.full(len(texts), np.nan)
+    for i, text in enumerate(texts):
+        try:
+            parsed[i] = float(text)
+        except ValueError:
+            pass
+    return parsed
+
+def group_statistics(codes, values, group_count):
+    """
+    Count, mean, median, p90 and max of values per group
+
+    Values are sorted once by (group, value); quantiles are then read at
+    interpolated positions inside each group's slice.
+
+    Args:
+        codes (numpy.ndarray): Group code per value
+        values (numpy.ndarray): Values (NaN values are ignored)
+        group_count (int): Number of groups
+
+    Returns:
+        dict: Arrays of length group_count under 'count', 'mean', 'p50',
+            'p90' and 'max' (NaN for empty groups)
+    """
+    valid = ~np.isnan(values)
+    codes, values = codes[valid], values[valid]
+    counts = np.bincount(codes, minlength=group_count)
+    sums = np.bincount(codes, weights=values, minlength=group_count)
+
+    order = np.lexsort((values, codes))
+    ordered = values[order]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    def quantile(q):
+        result = np.full(group_count, np.nan)
+        present = counts > 0
+        position = starts[present] + q * (counts[present] - 1)
+        lower = np.floor(position).astype(np.int64)
+        upper = np.ceil(position).astype(np.int64)
+        weight = position - lower
+        result[present] = ordered[lower] * (1 - weight) + ordered[upper] * weight
+        return result
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = sums / counts
+
+    return {
+        'count': counts,
+        'mean': mean,
+        'p50': quantile(0.5),
+        'p90': quantile(0.9),
+        'max': quantile(1.0)
+    }
+
+def delay_distribution(columns):
+    """
+    Delay distribution per line and direction
+
+    Args:
+        columns (DelayColumns): Columns from ArrivalBatch.columns
+
+    Returns:
+        list: {'line', 'direction', 'count', 'mean', 'p50', 'p90', 'max'}
+            per group with delay data, delays in seconds
+    """
+    stats = group_statistics(columns.codes, columns.delay, len(columns.groups))
+    distribution = []
+    for code, (line, direction) in enumerate(columns.groups):
+        if not line or not direction or not stats['count'][code]:
+            continue
+        distribution.append({
+            'line': line,
+            'direction': direction,
+            'count': int(stats['count'][code]),
+            'mean': round(float(stats['mean'][code]), 1),
+            'p50': round(float(stats['p50'][code]), 1),
+            'p90': round(float(stats['p90'][code]), 1),
+            'max': int(stats['max'][code])
+        })
+    return sorted(distribution, key=lambda group: (group['line'], group['direction']))
+
+def late_line_delays(columns, threshold=DELAY_AFFECTED_THRESHOLD):
+    """
+    Average delay of the late arrivals on each line
+
+    Args:
+        columns (DelayColumns): Columns from ArrivalBatch.columns
+        threshold (float, optional): Seconds of delay (either way) that
+            count an arrival as late
+
+    Returns:
+        list: (line, mean absolute delay in seconds) for lines with late
+            arrivals, largest delay first
+    """
+    late = np.abs(columns.delay) > threshold
+    if not late.any():
+        return []
+
+    # Fold (line, direction) groups into lines
+    lines = sorted({line for line, _ in columns.groups if line})
+    line_index = {line: i for i, line in enumerate(lines)}
+    group_line = np.array([line_index.get(line, -1) for line, _ in columns.groups], dtype=np.int64)
+    arrival_line = group_line[columns.codes[late]]
+    known = arrival_line >= 0
+
+    counts = np.bincount(arrival_line[known], minlength=len(lines))
+    sums = np.bincount(arrival_line[known], weights=np.abs(columns.delay[late][known]), minlength=len(lines))
+    delays = [(lines[i], sums[i] / counts[i]) for i in np.flatnonzero(counts)]
+    return sorted(delays, key=lambda item: item[1], reverse=True)
+
+def describe_affected_lines(affected):
+    """
+    Summarize the delayed lines as a rail status
+
+    Args:
+        affected (list): (line, mean absolute delay in seconds) per line
+            whose late arrivals average at least DELAY_AFFECTED_THRESHOLD
+            seconds, largest delay first
+
+    Returns:
+        dict: 'status', 'details' and 'affectedLines'
+    """
+    if not affected:
+        return {
+            'status': 'On Time',
+            'details': 'All lines operating normally',
+            'affectedLines': []
+        }
+
+    return {
+        'status': 'Major Delays' if affected[0][1] >= DELAY_MAJOR_THRESHOLD else 'Minor Delays',
+        'details': ', '.join(
+            f"{line} Line: {round(delay / 60)} minute delays" for line, delay in affected
+        ),
+        'affectedLines': [
+            {'line': line, 'delay': f'{round(delay / 60)} minutes'}
+            for line, delay in affected
+        ]
+    }
+
+def status_from_columns(columns):
+    """
+    Derive the rail status from parsed delay columns
+
+    A line is affected when its late arrivals average at least
+    DELAY_AFFECTED_THRESHOLD seconds; the status is Major Delays once any
+    line reaches DELAY_MAJOR_THRESHOLD.
+
+    Args:
+        columns (DelayColumns): Columns from ArrivalBatch.columns
+
+    Returns:
+        dict: 'status', 'details', 'affectedLines' and the per line and
+            direction delay distribution under 'lines'
+    """
+    affected = [(line, delay) for line, delay in late_line_delays(columns) if delay >= DELAY_AFFECTED_THRESHOLD]
+    train_status = describe_affected_lines(affected)
+    train_status['lines'] = delay_distribution(columns)
+    return train_status
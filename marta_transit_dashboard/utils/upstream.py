@@ -0,0 +1,359 @@
+"""
+Upstream HTTP client for the Simple MARTA App
+
+All outbound requests go through one UpstreamClient so that connections to
+each upstream host are pooled and kept alive between polls, every request
+has a connect/read deadline, transient failures are retried a bounded
+number of times, and per-feed latency is recorded. AsyncUpstreamClient
+does the same for the asyncio poller when aiohttp is installed, and
+records into the same per-feed statistics.
+"""
+
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Add parent directory to import path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import (
+    UPSTREAM_CONNECT_TIMEOUT,
+    UPSTREAM_READ_TIMEOUT,
+    UPSTREAM_MAX_RETRIES,
+    UPSTREAM_RETRY_BACKOFF,
+    UPSTREAM_POOL_MAXSIZE,
+    UPSTREAM_LATENCY_BUCKETS
+)
+
+# Try to import aiohttp for the asyncio poller
+try:
+    import aiohttp
+    
+    # Flag indicating that async HTTP is available
+    HAS_AIOHTTP = True
+except ImportError:
+    HAS_AIOHTTP = False
+
+# Status codes worth retrying: the upstream is busy or briefly unavailable
+RETRY_STATUS_CODES = frozenset([429, 500, 502, 503, 504])
+
+class LatencyHistogram:
+    """
+    Thread-safe cumulative latency histogram
+    """
+
+    def __init__(self, buckets=UPSTREAM_LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        """
+        Record one observation
+
+        Args:
+            seconds (float): Observed latency
+        """
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                index = i
+                break
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += seconds
+            self._count += 1
+
+    def snapshot(self):
+        """
+        Get the histogram as plain data
+
+        Returns:
+            dict: 'count', 'sum' and cumulative 'buckets' keyed by upper
+                bound ('+Inf' for the overflow bucket)
+        """
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+
+        buckets = {}
+        running = 0
+        for bound, n in zip(self.buckets, counts):
+            running += n
+            buckets[str(bound)] = running
+        buckets['+Inf'] = running + counts[-1]
+
+        return {
+            'count': count,
+            'sum': round(total, 6),
+            'mean': round(total / count, 6) if count else None,
+            'buckets': buckets
+        }
+
+class UpstreamClient:
+    """
+    Pooled, keep-alive HTTP client shared by every feed fetcher
+    """
+
+    def __init__(self,
+                 connect_timeout=UPSTREAM_CONNECT_TIMEOUT,
+                 read_timeout=UPSTREAM_READ_TIMEOUT,
+                 max_retries=UPSTREAM_MAX_RETRIES,
+                 retry_backoff=UPSTREAM_RETRY_BACKOFF,
+                 pool_maxsize=UPSTREAM_POOL_MAXSIZE):
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.pool_maxsize = pool_maxsize
+        self._sessions = {}
+        self._histograms = {}
+        self._errors = {}
+        self._retries = {}
+        self._lock = threading.Lock()
+
+    def session_for(self, url):
+        """
+        Get the keep-alive session for the host serving url
+
+        Args:
+            url (str): Request URL
+
+        Returns:
+            requests.Session: Session with its own connection pool
+        """
+        parts = urlsplit(url)
+        host = f"{parts.scheme}://{parts.netloc}"
+        session = self._sessions.get(host)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(host)
+                if session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize, max_retries=0)
+                    session.mount(f"{parts.scheme}://", adapter)
+                    self._sessions[host] = session
+        return session
+
+    def request(self, feed, method, url, **kwargs):
+        """
+        Send a request with deadlines and bounded, jittered retries
+
+        Args:
+            feed (str): Feed name used for latency and error accounting
+            method (str): HTTP method
+            url (str): Request URL
+            **kwargs: Passed to requests. ``timeout`` defaults to the
+                configured (connect, read) deadlines.
+
+        Returns:
+            requests.Response: Final response (which may still be an error status)
+
+        Raises:
+            requests.RequestException: If every attempt failed to connect or timed out
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        session = self.session_for(url)
+
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            start = time.perf_counter()
+            try:
+                response = session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                self.record(feed, time.perf_counter() - start, error=True)
+                if last_attempt:
+                    raise
+            else:
+                self.record(feed, time.perf_counter() - start, error=response.status_code >= 400)
+                if last_attempt or response.status_code not in RETRY_STATUS_CODES:
+                    return response
+                response.close()
+
+            self.record_retry(feed)
+            # Full jitter keeps many clients from retrying in lockstep
+            time.sleep(random.uniform(0, self.retry_backoff * (2 ** attempt)))
+
+    def get(self, feed, url, **kwargs):
+        """
+        Send a GET request for a feed
+
+        Args:
+            feed (str): Feed name used for latency and error accounting
+            url (str): Request URL
+            **kwargs: Passed to requests
+
+        Returns:
+            requests.Response: Final response
+        """
+        return self.request(feed, 'GET', url, **kwargs)
+
+    def feed_session(self, feed):
+        """
+        Get a Session-like adapter for libraries that take a session object
+
+        Args:
+            feed (str): Feed name used for latency and error accounting
+
+        Returns:
+            FeedSession: Object with get/post methods routed through this client
+        """
+        return FeedSession(self, feed)
+
+    def record(self, feed, seconds, error=False):
+        """
+        Record one request attempt
+
+        Args:
+            feed (str): Feed name
+            seconds (float): Attempt latency
+            error (bool, optional): True if the attempt failed
+        """
+        histogram = self._histograms.get(feed)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(feed, LatencyHistogram())
+        histogram.observe(seconds)
+        if error:
+            with self._lock:
+                self._errors[feed] = self._errors.get(feed, 0) + 1
+
+    def record_retry(self, feed):
+        """
+        Count one retried request
+
+        Args:
+            feed (str): Feed name
+        """
+        with self._lock:
+            self._retries[feed] = self._retries.get(feed, 0) + 1
+
+    def stats(self):
+        """
+        Get per-feed latency histograms and error/retry counts
+
+        Returns:
+            dict: Feed name to {'latency', 'errors', 'retries'}
+        """
+        with self._lock:
+            feeds = list(self._histograms.items())
+            errors = dict(self._errors)
+            retries = dict(self._retries)
+        return {
+            feed: {
+                'latency': histogram.snapshot(),
+                'errors': errors.get(feed, 0),
+                'retries': retries.get(feed, 0)
+            }
+            for feed, histogram in feeds
+        }
+
+    def close(self):
+        """
+        Close every pooled connection
+        """
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions = {}
+        for session in sessions:
+            session.close()
+
+class FeedSession:
+    """
+    Minimal requests.Session stand-in bound to one feed
+    """
+
+    def __init__(self, client, feed):
+        self.client = client
+        self.feed = feed
+
+    def get(self, url, **kwargs):
+        return self.client.request(self.feed, 'GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.client.request(self.feed, 'POST', url, **kwargs)
+
+    def close(self):
+        # Connections belong to the shared client
+        pass
+
+class AsyncUpstreamClient:
+    """
+    aiohttp counterpart of UpstreamClient for use inside one event loop
+    """
+
+    def __init__(self, client=None):
+        """
+        Args:
+            client (UpstreamClient, optional): Client whose deadlines, retry
+                policy and statistics are shared. Defaults to the shared one.
+        """
+        self.client = client or upstream
+        self._session = None
+
+    async def open(self):
+        """
+        Create the pooled session; must run inside the event loop that uses it
+        """
+        connect, read = self.client.timeout
+        self._session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(sock_connect=connect, sock_read=read),
+            connector=aiohttp.TCPConnector(limit_per_host=self.client.pool_maxsize)
+        )
+
+    async def close(self):
+        """
+        Close every pooled connection
+        """
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def get(self, feed, url, params=None, headers=None):
+        """
+        Send a GET request with deadlines and bounded, jittered retries
+
+        Args:
+            feed (str): Feed name used for latency and error accounting
+            url (str): Request URL
+            params (dict, optional): Query parameters
+            headers (dict, optional): Request headers
+
+        Returns:
+            bytes: Response body
+
+        Raises:
+            aiohttp.ClientError: If the final attempt failed or returned an error status
+            asyncio.TimeoutError: If the final attempt timed out
+        """
+        client = self.client
+        for attempt in range(client.max_retries + 1):
+            last_attempt = attempt == client.max_retries
+            start = time.perf_counter()
+            try:
+                async with self._session.get(url, params=params, headers=headers) as response:
+                    body = await response.read()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                client.record(feed, time.perf_counter() - start, error=True)
+                if last_attempt:
+                    raise
+            else:
+                client.record(feed, time.perf_counter() - start, error=response.status >= 400)
+                if last_attempt or response.status not in RETRY_STATUS_CODES:
+                    response.raise_for_status()
+                    return body
+
+            client.record_retry(feed)
+            # Full jitter keeps many clients from retrying in lockstep
+            await asyncio.sleep(random.uniform(0, client.retry_backoff * (2 ** attempt)))
+
+# Shared client used by every fetcher in utils/
+upstream = UpstreamClient()
@@ -15,21 +15,77 @@ from config.config import (
     ATLANTA_LONGITUDE,
     WEATHER_CACHE_FILE
 )
+from utils.ingest import FeedSource, fetch_source
+from utils.persistence import cache_writer
+from utils.singleflight import coalesce
+from utils.upstream import upstream
 
 # Try to import OpenMeteo
 try:
     import openmeteo_requests
-    import requests_cache
-    from retry_requests import retry
     
-    # Create OpenMeteo client
-    cache_session = requests_cache.CachedSession('.cache', expire_after=3600)
-    retry_session = retry(cache_session, retries=5, backoff_factor=0.2)
-    openmeteo = openmeteo_requests.Client(session=retry_session)
+    # Create OpenMeteo client on top of the shared pooled upstream client,
+    # which handles deadlines and retries
+    openmeteo = openmeteo_requests.Client(session=upstream.feed_session('weather'))
 except ImportError:
     print("Warning: Weather API dependencies missing. Will use fallback data.")
     openmeteo = None
 
+def fetch_weather():
+    """
+    Fetch current Atlanta weather data from Open-Meteo API and cache it
+    
+    Returns:
+        dict: Weather data including temperature, condition, etc.
+        
+    Raises:
+        Exception: If the request or the response fails
+    """
+    # Set up API request parameters
+    params = {
+        "latitude": ATLANTA_LATITUDE,
+        "longitude": ATLANTA_LONGITUDE,
+        "current": [
+            "temperature_2m", 
+            "apparent_temperature", 
+            "precipitation", 
+            "weather_code", 
+            "relative_humidity_2m"
+        ],
+        "temperature_unit": "fahrenheit",
+        "timezone": "America/New_York"
+    }
+    
+    # Make the API request
+    responses = openmeteo.weather_api(WEATHER_API_URL, params=params)
+    response = responses[0]
+    
+    # Process current values
+    current = response.Current()
+    current_temperature = current.Variables(0).Value()
+    current_apparent_temp = current.Variables(1).Value()
+    current_precipitation = current.Variables(2).Value()
+    current_weather_code = current.Variables(3).Value()
+    current_humidity = current.Variables(4).Value()
+    
+    # Get weather condition description based on WMO code
+    condition = get_weather_description(current_weather_code)
+    
+    # Prepare the result
+    result = {
+        'temperature': round(current_temperature),
+        'condition': condition,
+        'humidity': round(current_humidity),
+        'feels_like': round(current_apparent_temp),
+        'city': 'Atlanta'
+    }
+    
+    # Cache the data for future use (written in the background)
+    cache_writer.submit(WEATHER_CACHE_FILE, result)
+        
+    return result
+
+@coalesce('weather')
 def get_weather_data():
     """
     Get current Atlanta weather data from Open-Meteo API
@@ -37,58 +93,7 @@ def get_weather_data():
     Returns:
         dict: Weather data including temperature, condition, etc.
     """
-    try:
-        # If we can't use the API, fall back to cached data
-        if openmeteo is None:
-            return get_weather_fallback()
-            
-        # Set up API request parameters
-        params = {
-            "latitude": ATLANTA_LATITUDE,
-            "longitude": ATLANTA_LONGITUDE,
-            "current": [
-                "temperature_2m", 
-                "apparent_temperature", 
-                "precipitation", 
-                "weather_code", 
-                "relative_humidity_2m"
-            ],
-            "temperature_unit": "fahrenheit",
-            "timezone": "America/New_York"
-        }
-        
-        # Make the API request
-        responses = openmeteo.weather_api(WEATHER_API_URL, params=params)
-        response = responses[0]
-        
-        # Process current values
-        current = response.Current()
-        current_temperature = current.Variables(0).Value()
-        current_apparent_temp = current.Variables(1).Value()
-        current_precipitation = current.Variables(2).Value()
-        current_weather_code = current.Variables(3).Value()
-        current_humidity = current.Variables(4).Value()
-        
-        # Get weather condition description based on WMO code
-        condition = get_weather_description(current_weather_code)
-        
-        # Prepare the result
-        result = {
-            'temperature': round(current_temperature),
-            'condition': condition,
-            'humidity': round(current_humidity),
-            'feels_like': round(current_apparent_temp),
-            'city': 'Atlanta'
-        }
-        
-        # Cache the data for future use
-        with open(WEATHER_CACHE_FILE, 'w') as f:
-            json.dump(result, f)
-            
-        return result
-    except Exception as e:
-        print(f"Error getting weather data: {e}")
-        return get_weather_fallback()
+    return fetch_source(WEATHER_SOURCE)
 
 def get_weather_description(weather_code):
     """
@@ -148,8 +153,15 @@ def get_weather_fallback():
     }
     
     # Cache this data for future use
-    os.makedirs(os.path.dirname(WEATHER_CACHE_FILE), exist_ok=True)
-    with open(WEATHER_CACHE_FILE, 'w') as f:
-        json.dump(mock_data, f)
+    cache_writer.submit(WEATHER_CACHE_FILE, mock_data)
         
-    return mock_data 
\ No newline at end of file
+    return mock_data 
+
+# How the poller and get_weather_data obtain the weather; the Open-Meteo
+# client decodes its own responses, so the source loads rather than parses
+WEATHER_SOURCE = FeedSource(
+    'weather',
+    get_weather_fallback,
+    load=fetch_weather,
+    available=openmeteo is not None
+)